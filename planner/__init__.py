@@ -1,6 +1,18 @@
 # project/__init__.py
-from .drone import connect_vehicle, set_geofence, upload_mission
+from .drone import connect_vehicle, set_geofence, set_parameter, upload_mission, hover, resume_mission
+from .mission_upload import MissionUploader, UploadResult
 from .kml_parser import KMLParser
-from .geometry_utils import random_point_in_polygon
+from .geometry_utils import random_point_in_polygon, random_points_in_polygon, fence_polygon
 from .path_planner import PathPlanner
+from .grid_cache import GridCache, MemoryGridCache
+from .visibility_planner import VisibilityGraphPlanner
+from .quadtree_planner import QuadtreePlanner, QuadtreeOccupancy
+from .dstar_lite_planner import DStarLitePlanner
+from .return_home_field import ReturnHomeField
+from .survey_parameters import SurveyParameters
+from .waypoint_compaction import compact_waypoints
+from .processing_scheduler import ProcessingBudget, schedule_processing_stops
+from .mission_compiler import compile_mission, compile_fleet, load_mission_artifact
+from .fleet_planner import partition_survey, plan_fleet
 from .map_generator import MapGenerator
+from .planning_service import PlanningService, PlanningClient, InProcessClient
@@ -0,0 +1,98 @@
+# benchmark_a_star.py
+"""
+Benchmarks `PathPlanner.a_star_search` against the original list-scanning implementation
+on synthetic grids of 10^5 to 10^7 cells.
+
+Usage:
+    python benchmark_a_star.py [--sizes 100000 1000000 10000000] [--legacy-max-cells 100000]
+"""
+import argparse
+import heapq
+import math
+import time
+import numpy as np
+from shapely.geometry import Polygon, box
+from path_planner import PathPlanner
+
+
+def legacy_a_star_search(grid, start, goal):
+    """The original search: dict-backed scores and an O(open set) membership scan per edge."""
+    def heuristic(a, b):
+        return math.sqrt((a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2)
+
+    rows, cols = grid.shape
+    open_set = []
+    heapq.heappush(open_set, (0, start))
+    came_from = {}
+    g_score = {start: 0}
+    f_score = {start: heuristic(start, goal)}
+    directions = [(-1, 0), (1, 0), (0, -1), (0, 1),
+                  (-1, -1), (-1, 1), (1, -1), (1, 1)]
+    while open_set:
+        _, current = heapq.heappop(open_set)
+        if current == goal:
+            path = []
+            while current in came_from:
+                path.append(current)
+                current = came_from[current]
+            path.append(start)
+            return path[::-1]
+        for dx, dy in directions:
+            neighbor = (current[0] + dx, current[1] + dy)
+            if 0 <= neighbor[0] < rows and 0 <= neighbor[1] < cols:
+                if grid[neighbor] == 0:
+                    tentative_g = g_score[current] + 1
+                    if neighbor not in g_score or tentative_g < g_score[neighbor]:
+                        came_from[neighbor] = current
+                        g_score[neighbor] = tentative_g
+                        f_score[neighbor] = tentative_g + heuristic(neighbor, goal)
+                        if neighbor not in [item[1] for item in open_set]:
+                            heapq.heappush(open_set, (f_score[neighbor], neighbor))
+    return None
+
+
+def make_grid(n_cells, seed=0):
+    """
+    Square-ish grid with a wall across the middle (one gap near the far edge) and
+    5% random obstacles, so the search has to detour instead of running straight to the goal.
+    """
+    rng = np.random.default_rng(seed)
+    rows = int(math.sqrt(n_cells))
+    cols = n_cells // rows
+    grid = (rng.random((rows, cols)) < 0.05).astype(np.uint8)
+    grid[rows // 2, : cols - cols // 10] = 1
+    start, goal = (0, 0), (rows - 1, 0)
+    grid[start] = grid[goal] = 0
+    return grid, start, goal
+
+
+def time_call(fn, *args):
+    t0 = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - t0, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10 ** 5, 10 ** 6, 10 ** 7])
+    parser.add_argument('--legacy-max-cells', type=int, default=10 ** 5,
+                        help="skip the legacy search above this many cells (it is quadratic)")
+    args = parser.parse_args()
+
+    # The geometry is unused: the search runs on the synthetic grids directly.
+    planner = PathPlanner(box(0, 0, 1, 1), Polygon())
+    print(f"{'cells':>10} {'array A* [s]':>14} {'legacy A* [s]':>14} {'speedup':>9} {'path len':>9}")
+    for n_cells in args.sizes:
+        grid, start, goal = make_grid(n_cells)
+        new_time, path = time_call(planner.a_star_search, grid, start, goal)
+        if n_cells <= args.legacy_max_cells:
+            legacy_time, _ = time_call(legacy_a_star_search, grid, start, goal)
+            legacy_col, speedup_col = f"{legacy_time:14.3f}", f"{legacy_time / new_time:8.1f}x"
+        else:
+            legacy_col, speedup_col = f"{'skipped':>14}", f"{'-':>9}"
+        path_len = len(path) if path else 0
+        print(f"{grid.size:>10} {new_time:14.3f} {legacy_col} {speedup_col} {path_len:>9}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+# benchmark_map.py
+"""
+Benchmarks `MapGenerator` in its default mode (one folium object per feature) against bulk
+mode (GeoJSON layers, decimated polylines, clustered markers), inline and with a separate
+data file, for growing numbers of detection markers on a dense coverage path.
+
+Usage:
+    python benchmark_map.py [--detections 100 1000 10000] [--path-points 20000]
+"""
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+from map_generator import MapGenerator
+
+CENTER = (51.4255, -2.6690)
+
+
+def make_path(n_points):
+    """Zigzag of 20 sweep lines over ~300 m, sampled at `n_points` points (mostly collinear)."""
+    t = np.linspace(0.0, 20.0, n_points)
+    sweep, along = np.floor(t), t % 1.0
+    along = np.where(sweep % 2 == 0, along, 1.0 - along)
+    return np.column_stack((CENTER[0] - 0.0015 + 0.003 * along, CENTER[1] - 0.002 + 0.0002 * t))
+
+
+def build_and_save(path, detections, file_name, bulk, data_file):
+    t0 = time.perf_counter()
+    map_gen = MapGenerator(CENTER, zoom_start=16, bulk=bulk)
+    map_gen.add_polyline(path, color="darkblue", tooltip="Zigzag Coverage Path")
+    map_gen.add_markers(detections, [f"Zebra #{k}" for k in range(len(detections))], "orange")
+    map_gen.fit_bounds()
+    if bulk:
+        map_gen.save(file_name, data_file=data_file)
+    else:
+        map_gen.save(file_name)
+    elapsed = time.perf_counter() - t0
+    html_size = os.path.getsize(file_name)
+    data_path = os.path.splitext(file_name)[0] + ".data.js"
+    data_size = os.path.getsize(data_path) if bulk and data_file else 0
+    return elapsed, html_size, data_size, (map_gen.points_in, map_gen.points_out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--detections', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--path-points', type=int, default=20000)
+    args = parser.parse_args()
+
+    path = make_path(args.path_points)
+    rng = np.random.default_rng(0)
+    print(f"{'detections':>10} {'mode':>12} {'time [s]':>9} {'html [kB]':>10} {'data [kB]':>10} {'vertices kept':>16}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.detections:
+            detections = np.column_stack((CENTER[0] + rng.uniform(-0.0015, 0.0015, n),
+                                          CENTER[1] + rng.uniform(-0.002, 0.002, n)))
+            for mode, bulk, data_file in (("default", False, False), ("bulk", True, False),
+                                          ("bulk + file", True, True)):
+                file_name = os.path.join(tmp, f"map_{n}_{mode.replace(' + ', '_')}.html")
+                elapsed, html_size, data_size, (points_in, points_out) = build_and_save(
+                    path, detections, file_name, bulk, data_file)
+                # Polyline and polygon vertices left after decimation (bulk mode only)
+                kept = f"{points_out}/{points_in}" if bulk else "all"
+                print(f"{n:>10} {mode:>12} {elapsed:9.2f} {html_size / 1e3:10.1f} {data_size / 1e3:10.1f} {kept:>16}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+# benchmark_upload.py
+"""
+Benchmarks `MissionUploader` against the original one-item-at-a-time upload on a local
+`MockAutopilot` with simulated packet loss and latency.
+
+Usage:
+    python benchmark_upload.py [--items 50 200] [--loss 0 0.05 0.2] [--latency 0.05] [--window 1 4]
+"""
+import argparse
+import time
+from pymavlink import mavutil
+from mock_autopilot import MockAutopilot
+from mission_upload import MissionUploader, mavlink2_connection
+
+
+def legacy_upload_mission(mav, waypoints_3d):
+    """The original upload: a blocking 10 s wait per request and no retries. Returns True on ACK."""
+    count = len(waypoints_3d)
+    mav.mav.mission_count_send(mav.target_system, mav.target_component, count)
+    for lat, lon, alt in waypoints_3d:
+        msg = mav.recv_match(type='MISSION_REQUEST_INT', blocking=True, timeout=10)
+        if msg is None:
+            return False
+        mav.mav.mission_item_int_send(
+            mav.target_system, mav.target_component, msg.seq,
+            mavutil.mavlink.MAV_FRAME_GLOBAL_RELATIVE_ALT, mavutil.mavlink.MAV_CMD_NAV_WAYPOINT,
+            0, 1, 0, 0, 0, 0, int(lat * 1e7), int(lon * 1e7), alt)
+    ack = mav.recv_match(type='MISSION_ACK', blocking=True, timeout=10)
+    return ack is not None and ack.type == mavutil.mavlink.MAV_MISSION_ACCEPTED
+
+
+def make_waypoints(n_items):
+    return [(51.4234 + 1e-5 * k, -2.6715 + 1e-5 * (k % 7), 25.0) for k in range(n_items)]
+
+
+def drain(mav):
+    while mav.recv_match(blocking=False) is not None:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, nargs='+', default=[50, 200])
+    parser.add_argument('--loss', type=float, nargs='+', default=[0.0, 0.05, 0.2])
+    parser.add_argument('--latency', type=float, default=0.05, help="one-way latency in seconds")
+    parser.add_argument('--window', type=int, nargs='+', default=[1, 4],
+                        help="item requests the mock autopilot keeps in flight")
+    parser.add_argument('--port', type=int, default=14560)
+    parser.add_argument('--skip-legacy', action='store_true')
+    args = parser.parse_args()
+
+    print(f"{'items':>6} {'loss':>5} {'window':>6} {'engine [s]':>11} {'items/s':>8} {'retx':>5} "
+          f"{'legacy [s]':>11} {'verified':>9}")
+    port = args.port
+    for n_items in args.items:
+        waypoints = make_waypoints(n_items)
+        for loss in args.loss:
+            for window in args.window:
+                port += 1
+                mav = mavlink2_connection(f'udpin:127.0.0.1:{port}')
+                with MockAutopilot(f'udpout:127.0.0.1:{port}', loss=loss, latency=args.latency,
+                                   jitter=args.latency / 2, window=window, seed=n_items) as autopilot:
+                    mav.wait_heartbeat()
+                    uploader = MissionUploader(mav, waypoints)
+                    result = uploader.upload()
+                    for _ in range(2):
+                        if result.success:
+                            break
+                        result = uploader.upload(resume=True)
+                    verified = result.success and [wp[1:] for wp in autopilot.mission] == [
+                        (int(lat * 1e7) / 1e7, int(lon * 1e7) / 1e7, alt) for lat, lon, alt in waypoints]
+                    legacy_col = f"{'skipped':>11}"
+                    if not args.skip_legacy and window == 1:
+                        time.sleep(0.2)
+                        drain(mav)
+                        t0 = time.monotonic()
+                        ok = legacy_upload_mission(mav, waypoints)
+                        legacy_col = f"{time.monotonic() - t0:11.2f}" if ok else f"{'failed':>11}"
+                mav.close()
+                engine_col = f"{result.elapsed:11.2f}" if result.success else f"{'failed':>11}"
+                print(f"{n_items:>6} {loss:>5.2f} {window:>6} {engine_col} {result.throughput:8.1f} "
+                      f"{result.retransmissions:>5} {legacy_col} {str(verified):>9}")
+
+
+if __name__ == '__main__':
+    main()
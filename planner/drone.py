@@ -1,5 +1,16 @@
+import time
 from pymavlink import mavutil
 
+try:
+    from .mission_upload import MissionUploader, mavlink2_connection
+    from .geometry_utils import fence_polygon
+except ImportError:
+    from mission_upload import MissionUploader, mavlink2_connection
+    from geometry_utils import fence_polygon
+
+# FENCE_TYPE bits: maximum altitude (1) and polygons (4)
+FENCE_TYPE_ALT_MAX_POLYGON = 1 | 4
+
 
 def connect_vehicle(connection_string=None):
     """
@@ -11,14 +22,15 @@ def connect_vehicle(connection_string=None):
     if connection_string is None:
         connection_string = 'udp:127.0.0.1:14551'
     print(f"[Connecting to vehicle on: {connection_string}]")
-    mav = mavutil.mavlink_connection(connection_string)
+    # MAVLink 2, for the geofence upload
+    mav = mavlink2_connection(connection_string)
     mav.wait_heartbeat()
     print("Heartbeat received from system (system %u component %u)" %
           (mav.target_system, mav.target_component))
     return mav
 
 
-def upload_mission(mav, waypoints_3d):
+def upload_mission(mav, waypoints_3d, resume_attempts=2, **uploader_options):
     """
     Uploads a mission to the vehicle using pymavlink.
 
@@ -26,56 +38,130 @@ def upload_mission(mav, waypoints_3d):
       - lat, lon are in degrees,
       - alt is in meters (relative altitude).
 
-    The function clears any existing mission, sends the mission count,
-    then waits for MISSION_REQUEST_INT messages to send each waypoint.
+    Requests are answered as they arrive and retried on timeouts by `MissionUploader`
+    (`uploader_options` are passed on to it); a stalled upload is resumed up to
+    `resume_attempts` times. Returns the final `UploadResult`.
     """
     count = len(waypoints_3d)
     print(f"[Uploading mission with {count} waypoints]")
+    # No MISSION_CLEAR_ALL first: MISSION_COUNT already replaces the stored mission, and the
+    # clear's own MISSION_ACK (ACCEPTED) could arrive late and be taken for the upload's
+    uploader = MissionUploader(mav, waypoints_3d, **uploader_options)
+    result = uploader.upload()
+    for _ in range(resume_attempts):
+        if result.success:
+            break
+        print("Mission upload stalled; resuming.")
+        result = uploader.upload(resume=True)
 
-    # Clear any existing mission
-    mav.mav.mission_clear_all_send(mav.target_system, mav.target_component)
-    # Optionally wait for ACK (omitted for brevity)
-
-    # Send the mission count
-    mav.mav.mission_count_send(mav.target_system, mav.target_component, count)
-
-    for i, (lat, lon, alt) in enumerate(waypoints_3d):
-        lat_int = int(lat * 1e7)
-        lon_int = int(lon * 1e7)
-        # Wait for the autopilot to request a mission item
-        msg = mav.recv_match(type='MISSION_REQUEST_INT',
-                             blocking=True, timeout=10)
-        if msg is None:
-            print("Timeout waiting for MISSION_REQUEST_INT; aborting mission upload.")
-            return
-        seq = msg.seq
-        mav.mav.mission_item_int_send(
-            mav.target_system,
-            mav.target_component,
-            seq,
-            mavutil.mavlink.MAV_FRAME_GLOBAL_RELATIVE_ALT,
-            mavutil.mavlink.MAV_CMD_NAV_WAYPOINT,
-            0, 1,     # current, autocontinue
-            0, 0, 0, 0,  # params 1-4 (not used)
-            lat_int, lon_int, alt
-        )
-        print(f"Sent waypoint {seq+1}/{count}")
-
-    # Wait for mission acknowledgment
-    ack = mav.recv_match(type='MISSION_ACK', blocking=True, timeout=10)
-    if ack is None:
-        print("No mission ack received.")
+    if result.success:
+        print(f"Mission uploaded successfully ({result.elapsed:.1f} s, {result.throughput:.1f} items/s, "
+              f"{result.retransmissions} retransmissions).")
     else:
-        print("Mission uploaded successfully.")
+        print("Mission upload failed:", result)
+    return result
+
+def set_parameter(mav, name, value, timeout=3, retries=3):
+    """Sets the autopilot parameter `name` to the float `value`; returns True once the autopilot echoes it."""
+    for _ in range(retries):
+        mav.mav.param_set_send(mav.target_system, mav.target_component, name.encode(), float(value),
+                               mavutil.mavlink.MAV_PARAM_TYPE_REAL32)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            msg = mav.recv_match(type='PARAM_VALUE', blocking=True, timeout=deadline - time.monotonic())
+            if msg is not None and msg.param_id == name:
+                if abs(msg.param_value - float(value)) <= 1e-6 * max(1.0, abs(float(value))):
+                    return True
+                break
+    return False
+
+
+def set_geofence(mav, flight_coords, fence_altitude=10, exclusion_coords=(), max_vertices=70, enable=True):
+    """
+    Uploads the (lat, lon) polygon `flight_coords` as an inclusion geofence, any polygons in
+    `exclusion_coords` (e.g. the Sensitive Area) as exclusion fences, and `fence_altitude`
+    (m) as the maximum altitude, then enables the fence.
+
+    The autopilot stores at most `max_vertices` fence points in total, so polygons that do
+    not fit are simplified with `fence_polygon` (inclusion fences shrink, exclusion fences
+    grow); each exclusion fence gets an equal share and the inclusion fence the rest.
+    Returns the uploaded polygons as (inclusion, exclusions), or None if the upload failed.
+    """
+    exclusion_coords = list(exclusion_coords)
+    share = max_vertices // (len(exclusion_coords) + 1)
+    exclusions = [fence_polygon(coords, share, inclusion=False) for coords in exclusion_coords]
+    if any(fence is None for fence in exclusions):
+        print("Could not fit the exclusion fences in the vertex budget.")
+        return None
+    inclusion = fence_polygon(flight_coords, max_vertices - sum(len(fence) for fence in exclusions))
+    if inclusion is None:
+        print("Could not fit the inclusion fence in the vertex budget.")
+        return None
+    print(f"[Uploading geofence: {len(inclusion)} inclusion vertices (from {len(flight_coords)}), "
+          f"{len(exclusions)} exclusion polygons]")
 
-# TODO: Implement set_geofence
-def set_geofence(mav, flight_coords, fence_altitude=10):
-    pass
+    items = []
+    fences = [(inclusion, mavutil.mavlink.MAV_CMD_NAV_FENCE_POLYGON_VERTEX_INCLUSION)]
+    fences += [(fence, mavutil.mavlink.MAV_CMD_NAV_FENCE_POLYGON_VERTEX_EXCLUSION) for fence in exclusions]
+    for vertices, command in fences:
+        for lat, lon in vertices:
+            items.append(mav.mav.mission_item_int_encode(
+                mav.target_system, mav.target_component, len(items),
+                mavutil.mavlink.MAV_FRAME_GLOBAL, command,
+                0, 1,
+                len(vertices), 0, 0, 0,  # param1: vertices in this polygon
+                int(lat * 1e7), int(lon * 1e7), 0,
+                mission_type=mavutil.mavlink.MAV_MISSION_TYPE_FENCE))
+    result = MissionUploader.from_items(mav, items, mavutil.mavlink.MAV_MISSION_TYPE_FENCE).upload()
+    if not result.success:
+        print("Geofence upload failed:", result)
+        return None
+
+    settings = [("FENCE_ALT_MAX", fence_altitude), ("FENCE_TYPE", FENCE_TYPE_ALT_MAX_POLYGON)]
+    if enable:
+        settings.append(("FENCE_ENABLE", 1))
+    for name, value in settings:
+        if not set_parameter(mav, name, value):
+            print(f"Failed to set {name}.")
+            return None
+    print("Geofence uploaded and enabled." if enable else "Geofence uploaded.")
+    return inclusion, exclusions
+
+def _pause_continue(mav, resume):
+    """Sends MAV_CMD_DO_PAUSE_CONTINUE (0 = hold position, 1 = continue the mission); returns True if accepted."""
+    mav.mav.command_long_send(
+        mav.target_system, mav.target_component,
+        mavutil.mavlink.MAV_CMD_DO_PAUSE_CONTINUE, 0,
+        1 if resume else 0, 0, 0, 0, 0, 0, 0)
+    ack = mav.recv_match(type='COMMAND_ACK', blocking=True, timeout=5)
+    return ack is not None and ack.result == mavutil.mavlink.MAV_RESULT_ACCEPTED
+
+
+def hover(mav, duration=10, done=None):
+    """
+    Pauses the mission so the vehicle holds its position while the images are processed.
+
+    Waits `duration` seconds (the hover time scheduled for this processing spot), or until
+    the optional `done()` callback returns True if that happens first. The mission stays
+    paused afterwards; call `resume_mission` to continue it. Returns False if the autopilot
+    rejected the pause.
+    """
+    if not _pause_continue(mav, resume=False):
+        print("Autopilot rejected the pause; not hovering.")
+        return False
+    print(f"[Hovering for up to {duration:.1f} s]")
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        if done is not None and done():
+            break
+        time.sleep(0.1)
+    return True
 
-# TODO: Implement hover to make the drone hover in place for a given duration while processing the images
-def hover(mav, duration=10):
-    pass
 
-# TODO: Implement resume_mission to resume the mission after processing the images
 def resume_mission(mav):
-    pass
+    """Continues the mission paused by `hover`. Returns False if the autopilot rejected it."""
+    if not _pause_continue(mav, resume=True):
+        print("Autopilot rejected the resume command.")
+        return False
+    print("Mission resumed.")
+    return True
@@ -0,0 +1,287 @@
+import heapq, math, itertools, numpy as np
+from shapely.geometry import LineString
+from shapely.ops import unary_union
+from shapely.prepared import prep
+
+try:
+    from shapely import intersects
+except ImportError:
+    intersects = None
+
+try:
+    from .path_planner import PathPlanner, linestrings
+    from .geometry_utils import rasterize_polygon
+except ImportError:
+    from path_planner import PathPlanner, linestrings
+    from geometry_utils import rasterize_polygon
+
+# Integer move costs (1000 per cell, 1414 per diagonal). D* Lite stops on key comparisons
+# against the start, and rounding in float path costs can make equal keys compare unequal.
+STEP, DIAGONAL_STEP = 1000, 1414
+INT_MOVES = [(-1, 0, STEP), (1, 0, STEP), (0, -1, STEP), (0, 1, STEP),
+             (-1, -1, DIAGONAL_STEP), (-1, 1, DIAGONAL_STEP), (1, -1, DIAGONAL_STEP), (1, 1, DIAGONAL_STEP)]
+
+class DStarLitePlanner(PathPlanner):
+    """
+    Incremental planner (D* Lite, Koenig & Likhachev 2002) for temporary no-fly zones.
+
+    The search runs backwards from the goal over the obstacle grid and is kept between calls:
+    when the vehicle moves, only the search key offset changes, and when a no-fly zone is added
+    or removed, only the cells it covers and their neighbours are re-queued. The next
+    `plan_path` call towards the same goal then repairs the affected part of the search
+    instead of starting from scratch. A new goal, or a start outside the current grid, starts
+    a fresh search.
+
+    Blocked cells are never part of the search. A vehicle caught inside a newly added zone is
+    first sent straight to the free cell nearest to it (in grid distance, regardless of what
+    lies between), and planned onwards from there.
+    """
+
+    def __init__(self, flight_polygon, sensitive_polygon, **kwargs):
+        super().__init__(flight_polygon, sensitive_polygon, **kwargs)
+        self.no_fly_zones = {}
+        self._zone_ids = itertools.count()
+        self._prepared_zones = None
+        self._zones_union = None
+        self._goal = None
+
+    # ----- No-fly zones -----
+
+    def add_no_fly_zone(self, polygon):
+        """Adds a temporary no-fly zone (a Shapely polygon in lon/lat). Returns its id."""
+        zone_id = next(self._zone_ids)
+        self.no_fly_zones[zone_id] = polygon
+        self._zones_changed()
+        if self._goal is not None:
+            self._apply_zone(polygon, 1)
+        return zone_id
+
+    def remove_no_fly_zone(self, zone_id):
+        polygon = self.no_fly_zones.pop(zone_id)
+        self._zones_changed()
+        if self._goal is not None:
+            self._apply_zone(polygon, -1)
+
+    def _zones_changed(self):
+        if self.no_fly_zones:
+            self._zones_union = unary_union(list(self.no_fly_zones.values()))
+            self._prepared_zones = prep(self._zones_union)
+        else:
+            self._zones_union = self._prepared_zones = None
+
+    def _zone_cells(self, polygon):
+        """
+        (rows, cols) of the grid cells blocked by `polygon`, grown by one cell so that moves
+        between neighbouring free cells cannot clip its corners.
+        """
+        grown = polygon.buffer(self.resolution)
+        lon_min, lat_min, lon_max, lat_max = grown.bounds
+        rows, cols = self.static_grid.shape
+        i_lo = max(int(math.ceil((lat_min - self.min_lat) / self.resolution)), 0)
+        j_lo = max(int(math.ceil((lon_min - self.min_lon) / self.resolution)), 0)
+        i_hi = min(int((lat_max - self.min_lat) / self.resolution) + 1, rows)
+        j_hi = min(int((lon_max - self.min_lon) / self.resolution) + 1, cols)
+        if i_lo >= i_hi or j_lo >= j_hi:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        mask = rasterize_polygon(grown, self.min_lat + i_lo * self.resolution,
+                                 self.min_lon + j_lo * self.resolution,
+                                 i_hi - i_lo, j_hi - j_lo, self.resolution)
+        ii, jj = np.nonzero(mask)
+        return ii + i_lo, jj + j_lo
+
+    def _apply_zone(self, polygon, delta):
+        """Adds (+1) or removes (-1) a zone's cover count and re-queues the cells that changed."""
+        ii, jj = self._zone_cells(polygon)
+        was_blocked = self.blocked[ii, jj].copy()
+        self.zone_count[ii, jj] += delta
+        self.blocked[ii, jj] = (self.static_grid[ii, jj] != 0) | (self.zone_count[ii, jj] > 0)
+        changed = (ii * self.blocked.shape[1] + jj)[was_blocked != self.blocked[ii, jj]]
+        if len(changed) == 0:
+            return
+        # The moves into a changed cell changed cost: re-evaluate its neighbours (and itself).
+        affected = set(changed.tolist())
+        for idx in changed.tolist():
+            affected.update(idx + offset for offset, _ in self._moves)
+        for idx in affected:
+            self._update_vertex(idx)
+
+    # ----- Line of sight (also avoids the no-fly zones) -----
+
+    def can_travel_straight(self, start_latlon, end_latlon):
+        if not super().can_travel_straight(start_latlon, end_latlon):
+            return False
+        if self._prepared_zones is None:
+            return True
+        line = LineString([(start_latlon[1], start_latlon[0]), (end_latlon[1], end_latlon[0])])
+        return not self._prepared_zones.intersects(line)
+
+    def segments_valid(self, start_latlon, end_latlons):
+        valid = super().segments_valid(start_latlon, end_latlons)
+        if self._zones_union is None or not valid.any():
+            return valid
+        if linestrings is None:
+            return np.array([self.can_travel_straight(start_latlon, end) for end in end_latlons])
+        ends = np.asarray(end_latlons, dtype=np.float64).reshape(-1, 2)[:, ::-1]
+        start = np.array([start_latlon[1], start_latlon[0]], dtype=np.float64)
+        lines = linestrings(np.stack((np.broadcast_to(start, ends.shape), ends), axis=1))
+        return valid & ~intersects(self._zones_union, lines)
+
+    # ----- D* Lite -----
+    # Scores and the blocked mask are read one cell at a time in the inner loops, so they are
+    # kept as Python lists / a bytearray rather than NumPy arrays (the blocked mask is also
+    # exposed as a NumPy view for the vectorized zone updates). The grid border is always
+    # blocked, which lets neighbours be found by fixed flat-index offsets without bounds checks.
+
+    def _h(self, idx):
+        """Octile distance from the start to cell `idx`, in the integer move costs."""
+        i, j = divmod(idx, self._cols)
+        di = abs(i - self._start_i)
+        dj = abs(j - self._start_j)
+        return STEP * di + (DIAGONAL_STEP - STEP) * dj if di >= dj else STEP * dj + (DIAGONAL_STEP - STEP) * di
+
+    def _key(self, idx):
+        m = min(self.g[idx], self.rhs[idx])
+        return (m + self._h(idx) + self.km, m)
+
+    def _update_vertex(self, idx):
+        g, rhs = self.g, self.rhs
+        if idx != self.goal_idx:
+            best = math.inf
+            if not self._blocked_bytes[idx]:
+                blocked = self._blocked_bytes
+                for offset, step in self._moves:
+                    n = idx + offset
+                    if not blocked[n]:
+                        cost = step + g[n]
+                        if cost < best:
+                            best = cost
+            rhs[idx] = best
+        if g[idx] != rhs[idx]:
+            key = self._key(idx)
+            self.open_key[idx] = key
+            heapq.heappush(self.open_set, (key[0], key[1], idx))
+        else:
+            self.open_key.pop(idx, None)
+
+    def _compute_shortest_path(self):
+        start = self.start_idx
+        g, rhs, open_set, open_key = self.g, self.rhs, self.open_set, self.open_key
+        while open_set:
+            k1, k2, idx = open_set[0]
+            key = (k1, k2)
+            if open_key.get(idx) != key:
+                heapq.heappop(open_set)  # stale entry
+                continue
+            if not (key < self._key(start) or rhs[start] > g[start]):
+                return
+            heapq.heappop(open_set)
+            del open_key[idx]
+            new_key = self._key(idx)
+            if key < new_key:
+                open_key[idx] = new_key
+                heapq.heappush(open_set, (new_key[0], new_key[1], idx))
+                continue
+            if g[idx] > rhs[idx]:
+                g[idx] = rhs[idx]
+            else:
+                g[idx] = math.inf
+                self._update_vertex(idx)
+            for offset, _ in self._moves:
+                self._update_vertex(idx + offset)
+
+    def _initialize(self, start, goal):
+        """Builds the grid around `start` and `goal` and resets the search towards `goal`."""
+        self.min_lat, max_lat, self.min_lon, max_lon = self.grid_bounds(start, goal)
+        self.static_grid = self.build_grid(self.min_lat, max_lat, self.min_lon, max_lon).copy()
+        self.static_grid[[0, -1], :] = 1
+        self.static_grid[:, [0, -1]] = 1
+        rows, cols = self.static_grid.shape
+        self._cols = cols
+        self._moves = [(di * cols + dj, step) for di, dj, step in INT_MOVES]
+        self.zone_count = np.zeros((rows, cols), dtype=np.int16)
+        for polygon in self.no_fly_zones.values():
+            ii, jj = self._zone_cells(polygon)
+            self.zone_count[ii, jj] += 1
+        self._blocked_bytes = bytearray(((self.static_grid != 0) | (self.zone_count > 0)).astype(np.uint8).tobytes())
+        self.blocked = np.frombuffer(self._blocked_bytes, dtype=np.uint8).reshape(rows, cols)
+        self.g = [math.inf] * (rows * cols)
+        self.rhs = [math.inf] * (rows * cols)
+        self.open_set = []
+        self.open_key = {}
+        self.km = 0
+        self._goal = tuple(goal)
+        self.goal_idx = self._cell(goal)
+        self._set_start(self._cell(start))
+        if self.goal_idx is None or self.start_idx is None:
+            return
+        self.rhs[self.goal_idx] = 0
+        key = self._key(self.goal_idx)
+        self.open_key[self.goal_idx] = key
+        heapq.heappush(self.open_set, (key[0], key[1], self.goal_idx))
+
+    def _set_start(self, idx):
+        self.start_idx = idx
+        if idx is not None:
+            self._start_i, self._start_j = divmod(idx, self._cols)
+
+    def _cell(self, latlon):
+        """Flat index of the cell holding the (lat, lon) point, or None if it is off the grid."""
+        rows, cols = self.blocked.shape
+        i, j = self.latlon_to_grid(latlon[0], latlon[1], self.min_lat, self.min_lon)
+        if 0 < i < rows - 1 and 0 < j < cols - 1:
+            return i * cols + j
+        return None
+
+    def _nearest_free_cell(self, idx):
+        """Nearest unblocked cell to `idx` (e.g. to leave a no-fly zone that appeared around the vehicle)."""
+        free = np.flatnonzero(self.blocked.reshape(-1) == 0)
+        if len(free) == 0:
+            return None
+        fi, fj = np.divmod(free, self._cols)
+        i, j = divmod(idx, self._cols)
+        return int(free[np.argmin((fi - i) ** 2 + (fj - j) ** 2)])
+
+    def plan_path(self, start, goal):
+        """
+        Plans a smoothed path between two (lat, lon) points around the sensitive area and the
+        current no-fly zones, reusing the previous search when the goal is unchanged.
+        Returns a list of (lat, lon) waypoints, or None if no path exists. A start inside a
+        no-fly zone is first connected to the nearest cell outside it.
+        """
+        if self._goal != tuple(goal) or self._cell(start) is None or self._cell(goal) is None:
+            self._initialize(start, goal)
+            if self.start_idx is None or self.goal_idx is None:
+                self._goal = None
+                return None
+        start_idx = cell_idx = self._cell(start)
+        if self._blocked_bytes[start_idx]:
+            start_idx = self._nearest_free_cell(start_idx)
+            if start_idx is None:
+                return None
+        self.km += self._h(start_idx)
+        self._set_start(start_idx)
+        self._compute_shortest_path()
+        if not math.isfinite(self.rhs[self.start_idx]) and self.start_idx != self.goal_idx:
+            return None
+
+        # Follow the cheapest successor from the start down to the goal.
+        g, blocked = self.g, self._blocked_bytes
+        current = self.start_idx
+        cells = [current]
+        while current != self.goal_idx:
+            best, best_cost = None, math.inf
+            for offset, step in self._moves:
+                n = current + offset
+                if not blocked[n] and step + g[n] < best_cost:
+                    best, best_cost = n, step + g[n]
+            if best is None or len(cells) > len(g):
+                return None
+            current = best
+            cells.append(current)
+        raw_path = [tuple(start)]
+        # A start inside a zone was replaced by the nearest free cell; keep it as the exit point
+        first = 0 if cells[0] != cell_idx else 1
+        raw_path += [self.grid_to_latlon(*divmod(idx, self._cols), self.min_lat, self.min_lon)
+                     for idx in cells[first:-1]]
+        raw_path.append(tuple(goal))
+        return self.smooth_path(raw_path)
@@ -0,0 +1,151 @@
+import math, os
+from concurrent.futures import ProcessPoolExecutor
+from shapely.affinity import rotate, scale
+from shapely.geometry import box
+
+try:
+    from .path_planner import PathPlanner, coverage_metrics
+except ImportError:
+    from path_planner import PathPlanner, coverage_metrics
+
+
+def partition_survey(survey_polygon, n_parts, angle_deg, spacing=None):
+    """
+    Splits `survey_polygon` into `n_parts` strips of equal area, cut parallel to the sweep
+    lines that `PathPlanner.generate_coverage_path` flies for `angle_deg` (in the same local
+    equirectangular frame), so each strip is covered by whole sweep lines.
+
+    With `spacing`, every cut is moved to the nearest point midway between two of the sweep
+    lines of the whole polygon, so neighbouring strips do not fly overlapping lines (areas
+    then balance to within one line). Returns the strips in sweep order; an empty geometry
+    stands for a strip that received no area.
+    """
+    if n_parts <= 1 or survey_polygon.is_empty:
+        return [survey_polygon]
+    origin = survey_polygon.centroid
+    lon_scale = math.cos(math.radians(origin.y))
+    local = rotate(scale(survey_polygon, xfact=lon_scale, yfact=1.0, origin=origin), -angle_deg, origin=origin)
+    min_x, min_y, max_x, max_y = local.bounds
+    min_y -= 1.0
+    max_y += 1.0
+
+    def area_before(x):
+        return local.intersection(box(min_x, min_y, x, max_y)).area
+
+    cuts = []
+    for k in range(1, n_parts):
+        target = local.area * k / n_parts
+        lo, hi = min_x, max_x
+        for _ in range(50):
+            mid = 0.5 * (lo + hi)
+            if area_before(mid) < target:
+                lo = mid
+            else:
+                hi = mid
+        cuts.append(0.5 * (lo + hi))
+
+    if spacing:
+        n_lines = max(1, int(math.floor((max_x - min_x) / spacing)) + 1)
+        first_x = min_x + 0.5 * ((max_x - min_x) - spacing * (n_lines - 1))
+        snapped = [first_x + (round((cut - first_x) / spacing - 0.5) + 0.5) * spacing for cut in cuts]
+        bounds = [min_x] + snapped + [max_x]
+        if all(a < b for a, b in zip(bounds, bounds[1:])):
+            cuts = snapped
+
+    strips = []
+    edges = [min_x] + cuts + [max_x]
+    for left, right in zip(edges, edges[1:]):
+        # Cut the original polygon with the slab mapped back to lon/lat, so the strips keep
+        # the survey boundary exactly.
+        slab = box(left, min_y, right, max_y)
+        slab = scale(rotate(slab, angle_deg, origin=origin), xfact=1.0 / lon_scale, yfact=1.0, origin=origin)
+        strips.append(survey_polygon.intersection(slab))
+    return strips
+
+
+def plan_legs(planner, takeoff, coverage_path):
+    """
+    Turns a coverage path into a flyable mission from and back to the (lat, lon) `takeoff`.
+    The coverage is reversed if needed to start at its end closest to the take-off. Returns a
+    dict with the coverage_path, path_to_survey (approach), mission_path (approach + coverage),
+    path_to_take_off (empty if no return path exists) and processing_spots, or None if
+    the start of the coverage cannot be reached.
+    """
+    def latlon_distance(a, b):
+        return ((a[0]-b[0])**2+(a[1]-b[1])**2)**0.5
+    coverage_path = list(coverage_path)
+    if latlon_distance(takeoff, coverage_path[0]) > latlon_distance(takeoff, coverage_path[-1]):
+        coverage_path.reverse()
+
+    approach_path = planner.plan_path(takeoff, coverage_path[0])
+    if approach_path is None:
+        return None
+    if approach_path[-1] == coverage_path[0]:
+        mission_path = approach_path + coverage_path[1:]
+    else:
+        mission_path = approach_path + coverage_path
+    return_path = planner.plan_path_from_x_to_takeoff(coverage_path[-1], takeoff)
+
+    return {
+        "coverage_path": coverage_path,
+        "path_to_survey": approach_path,
+        "mission_path": mission_path,
+        "path_to_take_off": return_path or [],
+        # Every second point in coverage, skipping the first one
+        "processing_spots": coverage_path[3::2],
+    }
+
+
+def plan_vehicle(flight_polygon, sensitive_polygon, survey_strip, takeoff, spacing, inner_margin, angle_deg,
+                 cruise_speed, turn_time, resolution):
+    """
+    Plans one vehicle's mission over its survey strip (see `plan_legs`), adding the coverage
+    `score` as in `PathPlanner.generate_optimal_coverage`. Module-level so that it can run in a
+    process pool. Returns None if the strip has no coverage or cannot be reached.
+    """
+    coverage_path = PathPlanner.generate_coverage_path(survey_strip, spacing, inner_margin, angle_deg)
+    if not coverage_path:
+        return None
+    planner = PathPlanner(flight_polygon, sensitive_polygon, resolution=resolution)
+    coverage_path = planner.route_coverage(coverage_path)
+    if coverage_path is None:
+        return None
+    mission = plan_legs(planner, takeoff, coverage_path)
+    if mission is None:
+        return None
+    mission["score"] = None
+    if len(coverage_path) >= 2:
+        mission["score"] = dict(angle=float(angle_deg), **coverage_metrics(coverage_path, cruise_speed, turn_time))
+    mission["survey_area"] = survey_strip
+    return mission
+
+
+def plan_fleet(flight_polygon, sensitive_polygon, survey_polygon, takeoffs, spacing, inner_margin=0.0,
+               cruise_speed=5.0, turn_time=3.0, resolution=0.0001, processes=None):
+    """
+    Splits the survey between len(`takeoffs`) vehicles and plans all of them concurrently.
+
+    The sweep angle is optimized once for the whole survey area; the area is then cut into
+    equal-area strips along it (`partition_survey`), vehicle k flies strip k from and back to
+    takeoffs[k], and the per-vehicle missions (`plan_vehicle`) are planned in a pool of
+    `processes` workers (all CPUs by default; 1 runs inline).
+    Returns (missions, angle): one mission dict, or None if planning failed, per vehicle.
+    """
+    n_vehicles = len(takeoffs)
+    planner = PathPlanner(flight_polygon, sensitive_polygon, resolution=resolution)
+    _, best = planner.generate_optimal_coverage(survey_polygon, spacing, inner_margin, cruise_speed=cruise_speed,
+                                                turn_time=turn_time, processes=processes)
+    if best is None:
+        return [None] * n_vehicles, None
+    angle = best["angle"]
+    strips = partition_survey(survey_polygon, n_vehicles, angle, spacing)
+    jobs = [(flight_polygon, sensitive_polygon, strip, tuple(takeoff), spacing, inner_margin, angle,
+             cruise_speed, turn_time, resolution) for strip, takeoff in zip(strips, takeoffs)]
+
+    processes = min(processes or os.cpu_count() or 1, n_vehicles)
+    if processes == 1:
+        missions = [plan_vehicle(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            missions = list(pool.map(plan_vehicle, *zip(*jobs)))
+    return missions, angle
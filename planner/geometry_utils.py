@@ -1,16 +1,192 @@
-import random
-from shapely.geometry import Point
+import math
+import numpy as np
+from shapely.affinity import scale
+from shapely.geometry import Polygon
 
-def random_point_in_polygon(poly, max_tries=1000):
+# Length of one degree of latitude on a spherical Earth, in metres
+METERS_PER_DEGREE = 111194.92664455873
+
+def random_points_in_polygon(poly, k, seed=None, max_tries=None):
     """
-    Returns a random (lat, lon) within the given Shapely polygon `poly`.
-    Shapely polygons use (lon, lat) order; this function returns (lat, lon).
+    Returns a (k, 2) array of random (lat, lon) points drawn uniformly within the given
+    Shapely polygon `poly` (Shapely polygons use (lon, lat) order).
+
+    Candidates are drawn from the bounding box in batches sized by the acceptance rate seen
+    so far and tested all at once with `points_in_polygon`, keeping those inside in draw
+    order. `seed` (an int or a `numpy.random.Generator`) makes the result reproducible.
+    At most `max_tries` candidates are drawn if given, in which case fewer than k rows may
+    be returned.
     """
+    rng = np.random.default_rng(seed)
+    points = np.empty((k, 2), dtype=np.float64)
+    if k <= 0 or poly.is_empty or poly.area == 0:
+        return points[:0]
     minx, miny, maxx, maxy = poly.bounds
-    for _ in range(max_tries):
-        randx = random.uniform(minx, maxx)  # longitude
-        randy = random.uniform(miny, maxy)  # latitude
-        p = Point(randx, randy)
-        if poly.contains(p):
-            return (p.y, p.x)
+    acceptance = poly.area / ((maxx - minx) * (maxy - miny))
+    found = tried = accepted = 0
+    while found < k and (max_tries is None or tried < max_tries):
+        batch = int(1.1 * (k - found) / acceptance) + 16
+        if max_tries is not None:
+            batch = min(batch, max_tries - tried)
+        xs = rng.uniform(minx, maxx, batch)  # longitudes
+        ys = rng.uniform(miny, maxy, batch)  # latitudes
+        inside = np.flatnonzero(points_in_polygon(poly, xs, ys))
+        tried += batch
+        accepted += len(inside)
+        acceptance = max(accepted, 1) / tried
+        take = inside[:k - found]
+        points[found:found + len(take), 0] = ys[take]
+        points[found:found + len(take), 1] = xs[take]
+        found += len(take)
+    return points[:found]
+
+def random_point_in_polygon(poly, max_tries=1000, seed=None):
+    """
+    Returns a random (lat, lon) within the given Shapely polygon `poly`, or None if none of
+    `max_tries` candidates fell inside it (see `random_points_in_polygon`).
+    """
+    points = random_points_in_polygon(poly, 1, seed=seed, max_tries=max_tries)
+    if len(points) == 0:
+        return None
+    lat, lon = points[0].tolist()
+    return (lat, lon)
+
+def fence_polygon(coords, max_vertices, inclusion=True, max_offset_m=200.0):
+    """
+    Simplifies the polygon with (lat, lon) vertices `coords` to at most `max_vertices` vertices
+    for an autopilot geofence, erring on the safe side: an inclusion fence stays inside the
+    polygon and an exclusion fence covers it.
+
+    In a local frame in metres, the polygon is offset inwards (inclusion) or outwards
+    (exclusion) by a tolerance, with mitred corners so no vertices are added, and then
+    simplified by the same tolerance, so it cannot cross back over the original boundary.
+    The tolerance doubles from 0.5 m until the result fits. Returns the (lat, lon) vertices
+    (ring not closed), unchanged if they already fit, or None if nothing within
+    `max_offset_m` does.
+    """
+    coords = [tuple(p) for p in coords]
+    if len(coords) > 1 and coords[0] == coords[-1]:
+        coords = coords[:-1]
+    if len(coords) <= max_vertices:
+        return coords
+    lat0 = float(np.mean([lat for lat, _ in coords]))
+    x_scale = METERS_PER_DEGREE * math.cos(math.radians(lat0))
+    polygon = Polygon([(lon, lat) for lat, lon in coords]).buffer(0)
+    local = scale(polygon, xfact=x_scale, yfact=METERS_PER_DEGREE, origin=(0, 0))
+    tolerance = 0.5
+    while tolerance <= max_offset_m:
+        shifted = local.buffer(-tolerance if inclusion else tolerance, join_style=2)
+        if shifted.is_empty:
+            return None
+        shifted = max(getattr(shifted, "geoms", [shifted]), key=lambda g: g.area)
+        fence = Polygon(shifted.simplify(tolerance, preserve_topology=True).exterior)
+        safe = local.covers(fence) if inclusion else fence.covers(local)
+        if safe and len(fence.exterior.coords) - 1 <= max_vertices:
+            return [(y / METERS_PER_DEGREE, x / x_scale) for x, y in fence.exterior.coords[:-1]]
+        tolerance *= 2.0
     return None
+
+def polygon_edges(geom):
+    """
+    Returns every boundary edge of a Shapely Polygon / MultiPolygon as an
+    (E, 4) float64 array of (x0, y0, x1, y1) rows, exterior and interior rings alike.
+    """
+    polygons = getattr(geom, "geoms", [geom])
+    edges = []
+    for polygon in polygons:
+        if polygon.is_empty:
+            continue
+        for ring in [polygon.exterior, *polygon.interiors]:
+            coords = np.asarray(ring.coords, dtype=np.float64)[:, :2]
+            edges.append(np.hstack((coords[:-1], coords[1:])))
+    if not edges:
+        return np.empty((0, 4), dtype=np.float64)
+    return np.vstack(edges)
+
+def points_in_polygon(geom, xs, ys):
+    """
+    Vectorized even-odd point-in-polygon test.
+    `xs`/`ys` are arrays of longitudes/latitudes; returns a boolean array of the same shape.
+    Points exactly on the boundary may fall either way.
+    """
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    edges = polygon_edges(geom)
+    flat_xs, flat_ys = xs.ravel(), ys.ravel()
+    inside = np.zeros(flat_xs.shape, dtype=bool)
+    x0, y0, x1, y1 = (edges[:, k] for k in range(4))
+    # Points are tested against all edges at once, in chunks to bound the (points, edges) temporaries.
+    chunk = max(1, 2 ** 20 // max(len(edges), 1))
+    for start in range(0, len(flat_xs), chunk):
+        px = flat_xs[start:start + chunk, np.newaxis]
+        py = flat_ys[start:start + chunk, np.newaxis]
+        crosses = (y0 <= py) != (y1 <= py)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x_cross = x0 + (py - y0) * (x1 - x0) / (y1 - y0)
+        inside[start:start + chunk] = np.count_nonzero(crosses & (px < x_cross), axis=1) % 2 == 1
+    return inside.reshape(xs.shape)
+
+def rasterize_polygon(geom, min_lat, min_lon, lat_steps, lon_steps, resolution):
+    """
+    Scanline-fills `geom` onto the grid whose cell (i, j) sits at
+    (min_lat + i * resolution, min_lon + j * resolution).
+    Returns a (lat_steps, lon_steps) boolean mask of the cells inside the polygon.
+
+    Every row is intersected with every edge at once, the crossings are sorted per row
+    and consecutive (enter, leave) pairs are written as +1/-1 into a difference array,
+    so the cost is O(rows * edges) NumPy work instead of one Shapely call per cell.
+    Cells exactly on the boundary may fall either way.
+    """
+    mask = np.zeros((lat_steps, lon_steps), dtype=bool)
+    edges = polygon_edges(geom)
+    if len(edges) == 0 or lat_steps <= 0 or lon_steps <= 0:
+        return mask
+    x0, y0, x1, y1 = (edges[:, k][np.newaxis, :] for k in range(4))
+    row_lats = (min_lat + np.arange(lat_steps) * resolution)[:, np.newaxis]
+
+    crosses = (y0 <= row_lats) != (y1 <= row_lats)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_cross = x0 + (row_lats - y0) * (x1 - x0) / (y1 - y0)
+    x_cross = np.where(crosses, x_cross, np.inf)
+    x_cross.sort(axis=1)
+
+    # Even-odd rule: crossings 0, 2, 4... enter the polygon, 1, 3, 5... leave it.
+    enter = x_cross[:, 0::2]
+    leave = x_cross[:, 1::2]
+    enter = enter[:, :leave.shape[1]]
+    valid = np.isfinite(leave)
+    # A cell is inside when its longitude lies strictly between an enter/leave pair.
+    first_col = np.floor((enter - min_lon) / resolution) + 1
+    end_col = np.ceil((leave - min_lon) / resolution)
+    first_col = np.clip(np.where(valid, first_col, 0), 0, lon_steps).astype(np.intp)
+    end_col = np.clip(np.where(valid, end_col, 0), 0, lon_steps).astype(np.intp)
+    valid &= end_col > first_col
+
+    rows = np.broadcast_to(np.arange(lat_steps)[:, np.newaxis], valid.shape)
+    diff = np.zeros((lat_steps, lon_steps + 1), dtype=np.int32)
+    np.add.at(diff, (rows[valid], first_col[valid]), 1)
+    np.add.at(diff, (rows[valid], end_col[valid]), -1)
+    return np.cumsum(diff[:, :-1], axis=1) > 0
+
+def segments_intersect_edges(segments, edges):
+    """
+    Vectorized closed segment intersection test.
+    `segments` is an (S, 4) and `edges` an (E, 4) array of (x0, y0, x1, y1) rows; returns an
+    (S, E) boolean array that is True where a segment touches or crosses an edge.
+    """
+    segments = np.asarray(segments, dtype=np.float64).reshape(-1, 4)[:, np.newaxis, :]
+    edges = np.asarray(edges, dtype=np.float64).reshape(-1, 4)[np.newaxis, :, :]
+    ax, ay, bx, by = (segments[..., k] for k in range(4))
+    cx, cy, dx, dy = (edges[..., k] for k in range(4))
+
+    def orientation(px, py, qx, qy, rx, ry):
+        return (qx - px) * (ry - py) - (qy - py) * (rx - px)
+
+    o1 = orientation(ax, ay, bx, by, cx, cy)
+    o2 = orientation(ax, ay, bx, by, dx, dy)
+    o3 = orientation(cx, cy, dx, dy, ax, ay)
+    o4 = orientation(cx, cy, dx, dy, bx, by)
+    # The bounding-box test only matters for collinear pairs, where all orientations are 0.
+    boxes_overlap = ((np.minimum(ax, bx) <= np.maximum(cx, dx)) & (np.minimum(cx, dx) <= np.maximum(ax, bx)) &
+                     (np.minimum(ay, by) <= np.maximum(cy, dy)) & (np.minimum(cy, dy) <= np.maximum(ay, by)))
+    return (o1 * o2 <= 0) & (o3 * o4 <= 0) & boxes_overlap
@@ -0,0 +1,147 @@
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+import numpy as np
+
+
+class GridCache:
+    """
+    On-disk cache of rasterized obstacle grids.
+
+    Each grid is saved as a `.npy` file named after two hashes: one of the mission geometry
+    (flight and sensitive polygons) and one of the grid parameters (bounds, margin and
+    resolution), so a changed KML simply misses. Cached grids are memory-mapped on load, so a
+    hit costs the same regardless of the grid size. The directory may be shared by several
+    missions; storing a grid deletes the least recently used ones beyond `max_grids`.
+    """
+
+    def __init__(self, cache_dir, max_grids=32):
+        self.cache_dir = cache_dir
+        self.max_grids = max_grids
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def geometry_hash(flight_polygon, sensitive_polygon):
+        digest = hashlib.sha256()
+        digest.update(flight_polygon.wkb)
+        digest.update(sensitive_polygon.wkb)
+        return digest.hexdigest()[:16]
+
+    @staticmethod
+    def parameters_hash(bounds, margin, resolution):
+        params = np.array([*bounds, margin, resolution], dtype=np.float64)
+        return hashlib.sha256(params.tobytes()).hexdigest()[:16]
+
+    def path_for(self, flight_polygon, sensitive_polygon, bounds, margin, resolution):
+        geometry_key = self.geometry_hash(flight_polygon, sensitive_polygon)
+        parameters_key = self.parameters_hash(bounds, margin, resolution)
+        return os.path.join(self.cache_dir, f"grid-{geometry_key}-{parameters_key}.npy")
+
+    def load(self, flight_polygon, sensitive_polygon, bounds, margin, resolution):
+        """
+        Returns the cached grid as a read-only memory map, or None on a cache miss.
+        """
+        path = self.path_for(flight_polygon, sensitive_polygon, bounds, margin, resolution)
+        if not os.path.exists(path):
+            return None
+        try:
+            grid = np.load(path, mmap_mode='r')
+        except (OSError, ValueError):
+            # Truncated or corrupt entry; treat it as a miss so it gets rebuilt.
+            return None
+        try:
+            # Mark the entry as recently used, for `prune`
+            os.utime(path)
+        except OSError:
+            pass
+        return grid
+
+    def store(self, grid, flight_polygon, sensitive_polygon, bounds, margin, resolution):
+        path = self.path_for(flight_polygon, sensitive_polygon, bounds, margin, resolution)
+        # Write to a uniquely named temporary file first, so neither a crash nor another process
+        # storing the same grid at the same time leaves a half-written entry behind.
+        with tempfile.NamedTemporaryFile(dir=self.cache_dir, prefix=".grid-", suffix=".tmp",
+                                         delete=False) as f:
+            tmp_path = f.name
+            try:
+                np.save(f, np.ascontiguousarray(grid))
+            except BaseException:
+                f.close()
+                os.remove(tmp_path)
+                raise
+        os.replace(tmp_path, path)
+        self.prune()
+        return path
+
+    def prune(self):
+        """
+        Deletes the least recently used grids beyond `max_grids`, whatever geometry they belong to.
+        """
+        entries = []
+        for file_name in os.listdir(self.cache_dir):
+            if file_name.startswith("grid-") and file_name.endswith(".npy"):
+                path = os.path.join(self.cache_dir, file_name)
+                try:
+                    entries.append((os.path.getmtime(path), path))
+                except OSError:
+                    continue  # removed by another process meanwhile
+        entries.sort(reverse=True)
+        for _, path in entries[self.max_grids:]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+class MemoryGridCache:
+    """
+    In-memory cache of rasterized obstacle grids with the same `load`/`store` interface as
+    `GridCache`, for long-running processes that plan many paths over the same bounds.
+    Keeps the `max_grids` most recently used grids (read-only); a miss falls through to the
+    optional on-disk `backing` cache.
+    """
+
+    def __init__(self, max_grids=8, backing=None):
+        self.max_grids = max_grids
+        self.backing = backing
+        self.grids = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key_for(flight_polygon, sensitive_polygon, bounds, margin, resolution):
+        return (GridCache.geometry_hash(flight_polygon, sensitive_polygon),
+                GridCache.parameters_hash(bounds, margin, resolution))
+
+    def load(self, flight_polygon, sensitive_polygon, bounds, margin, resolution):
+        key = self.key_for(flight_polygon, sensitive_polygon, bounds, margin, resolution)
+        with self._lock:
+            grid = self.grids.get(key)
+            if grid is not None:
+                self.grids.move_to_end(key)
+                self.hits += 1
+                return grid
+            self.misses += 1
+        if self.backing is not None:
+            grid = self.backing.load(flight_polygon, sensitive_polygon, bounds, margin, resolution)
+            if grid is not None:
+                self._remember(key, np.asarray(grid))
+            return grid
+        return None
+
+    def store(self, grid, flight_polygon, sensitive_polygon, bounds, margin, resolution):
+        self._remember(self.key_for(flight_polygon, sensitive_polygon, bounds, margin, resolution), grid)
+        if self.backing is not None:
+            self.backing.store(grid, flight_polygon, sensitive_polygon, bounds, margin, resolution)
+
+    def _remember(self, key, grid):
+        grid = np.array(grid)
+        grid.setflags(write=False)
+        with self._lock:
+            self.grids[key] = grid
+            self.grids.move_to_end(key)
+            while len(self.grids) > self.max_grids:
+                self.grids.popitem(last=False)
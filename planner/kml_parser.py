@@ -1,4 +1,10 @@
 import xml.etree.ElementTree as ET
+import numpy as np
+from shapely.geometry import (Point, LineString, Polygon, MultiPoint, MultiLineString,
+                              MultiPolygon, GeometryCollection)
+from shapely.prepared import prep
+
+KML_NS = '{http://www.opengis.net/kml/2.2}'
 
 class KMLParser:
     @staticmethod
@@ -41,3 +47,102 @@ class KMLParser:
                     if coords_elem is not None and coords_elem.text:
                         attributes[name] = coords_elem.text.strip()
         return attributes
+
+    @staticmethod
+    def parse_coordinates(text):
+        """
+        Parse a KML `coordinates` string ("lon,lat[,alt] lon,lat[,alt] ...") into an
+        (N, 2) float64 array of (lon, lat) rows.
+        """
+        tuples = text.split()
+        if not tuples:
+            return np.empty((0, 2), dtype=np.float64)
+        dims = tuples[0].count(',') + 1
+        values = np.array(text.replace(',', ' ').split(), dtype=np.float64)
+        if values.size == len(tuples) * dims:
+            return values.reshape(-1, dims)[:, :2].copy()
+        # Mixed 2D/3D tuples: fall back to parsing them one by one
+        return np.array([[float(v) for v in t.split(',')[:2]] for t in tuples], dtype=np.float64)
+
+    @staticmethod
+    def _placemark_geometry(placemark):
+        """
+        Returns (coords, geometry) for the first Point, LineString or Polygon in a Placemark
+        element, where coords is the (N, 2) array of the point, line or outer ring.
+        Returns (None, None) when the placemark has no supported geometry.
+        """
+        for elem in placemark.iter():
+            if elem.tag == KML_NS + 'Point':
+                coords = KMLParser.parse_coordinates(elem.findtext(KML_NS + 'coordinates', ''))
+                return (coords, Point(coords[0])) if len(coords) else (None, None)
+            if elem.tag == KML_NS + 'LineString':
+                coords = KMLParser.parse_coordinates(elem.findtext(KML_NS + 'coordinates', ''))
+                return (coords, LineString(coords)) if len(coords) >= 2 else (None, None)
+            if elem.tag == KML_NS + 'Polygon':
+                ring_path = f'{KML_NS}LinearRing/{KML_NS}coordinates'
+                outer = elem.find(f'{KML_NS}outerBoundaryIs/{ring_path}')
+                if outer is None or not outer.text:
+                    return None, None
+                coords = KMLParser.parse_coordinates(outer.text)
+                holes = [KMLParser.parse_coordinates(inner.text)
+                         for inner in elem.findall(f'{KML_NS}innerBoundaryIs/{ring_path}') if inner.text]
+                return coords, Polygon(coords, holes)
+        return None, None
+
+    @staticmethod
+    def iter_placemarks(file_path):
+        """
+        Stream the placemarks of a KML file with `iterparse`, yielding (name, coords, geometry)
+        for every placemark with a Point, LineString or Polygon. Each placemark is discarded
+        from the tree once yielded, so memory stays bounded however large the file is.
+        """
+        parents = []
+        for event, elem in ET.iterparse(file_path, events=('start', 'end')):
+            if event == 'start':
+                parents.append(elem)
+                continue
+            parents.pop()
+            if elem.tag != KML_NS + 'Placemark':
+                continue
+            name = (elem.findtext(KML_NS + 'name') or '').strip()
+            coords, geometry = KMLParser._placemark_geometry(elem)
+            if geometry is not None:
+                yield name, coords, geometry
+            elem.clear()
+            if parents:
+                parents[-1].remove(elem)
+
+    @staticmethod
+    def load_geometries(file_path, names=None, prepared=False):
+        """
+        Load the named placemarks of a KML file (all of them, or only those in `names`) into
+        a dict keyed by name, with:
+          - "coords":   list of (N, 2) float64 (lon, lat) arrays, one per placemark
+          - "geometry": Shapely geometry; placemarks sharing a name become a Multi* geometry
+          - "prepared": prepared geometry if `prepared` is set, else None
+        """
+        parts = {}
+        for name, coords, geometry in KMLParser.iter_placemarks(file_path):
+            if names is not None and name not in names:
+                continue
+            entry = parts.setdefault(name, {"coords": [], "geometries": []})
+            entry["coords"].append(coords)
+            entry["geometries"].append(geometry)
+
+        features = {}
+        multi_types = {'Point': MultiPoint, 'LineString': MultiLineString, 'Polygon': MultiPolygon}
+        for name, entry in parts.items():
+            geometries = entry["geometries"]
+            geom_types = {g.geom_type for g in geometries}
+            if len(geometries) == 1:
+                geometry = geometries[0]
+            elif len(geom_types) == 1 and geom_types <= multi_types.keys():
+                geometry = multi_types[geom_types.pop()](geometries)
+            else:
+                geometry = GeometryCollection(geometries)
+            features[name] = {
+                "coords": entry["coords"],
+                "geometry": geometry,
+                "prepared": prep(geometry) if prepared else None,
+            }
+        return features
@@ -1,102 +1,86 @@
 # main.py
-from kml_parser import KMLParser
 from geometry_utils import random_point_in_polygon
-from path_planner import PathPlanner
+from mission_compiler import compile_mission, compile_fleet, build_planner, mission_polygons
+from survey_parameters import SurveyParameters
+from processing_scheduler import ProcessingBudget
 from map_generator import MapGenerator
 from drone import connect_vehicle, set_geofence, upload_mission
-from shapely.geometry import Polygon, Point
-import numpy as np
+from shapely.geometry import Point
+import os
+
+# Path planning mode: "grid" (A* on the obstacle grid, then smoothing), "quadtree" (A* on an
+# adaptive quadtree, fine only along obstacle boundaries, then smoothing) or
+# "visibility" (any-angle shortest paths on the visibility graph of the free space)
+PLANNER_MODE = "grid"
+
+# Survey altitude (m), camera overlaps and cruise speed (m/s); sweep spacing and capture interval follow from them
+SURVEY = SurveyParameters(altitude=25.0, side_overlap=0.2, forward_overlap=0.2, cruise_speed=5.0)
+
+# Onboard detector throughput (frames/s), largest image backlog (frames) and battery endurance (s);
+# hover stops are scheduled so the backlog never exceeds the limit. Update the throughput from the
+# rate logged by the onboard image processor.
+PROCESSING = ProcessingBudget(inference_rate=0.3, max_backlog=10, battery_time=1200)
+
+# Cross-track tolerance (m) within which redundant waypoints are dropped before upload; None keeps them all
+WAYPOINT_TOLERANCE = 1.0
+
+# Compiled mission, copied to the vehicle and loaded by semi-autonomous-approach/main.py (which
+# looks for the same file name unless given another path)
+MISSION_ARTIFACT = "mission.npz"
+
+# Number of vehicles sharing the survey; above 1, one mission per vehicle is also compiled
+FLEET_SIZE = 1
 
 def main():
-    # Parse KML file
+    # Compile the mission (re-planned only when the KML changes) into an artifact for the runtime
     kml_file = 'AENGM0074 2025 geolocations_new.kml'
-    attrs = KMLParser.parse_kml(kml_file)
+    artifact_path = MISSION_ARTIFACT
+    mission = compile_mission(kml_file, artifact_path, SURVEY, planner_mode=PLANNER_MODE, processing=PROCESSING,
+                              compaction_tolerance=WAYPOINT_TOLERANCE)
+    if mission is None:
+        return
+    print("Mission artifact saved to '%s'." % artifact_path)
+    if FLEET_SIZE > 1:
+        fleet = compile_fleet(kml_file, os.path.splitext(kml_file)[0], SURVEY, FLEET_SIZE,
+                              compaction_tolerance=WAYPOINT_TOLERANCE)
+        for k, vehicle_mission in enumerate(fleet):
+            if vehicle_mission is not None:
+                print("Vehicle %d: %d waypoints, ~%.0f s of coverage" % (
+                    k, len(vehicle_mission["mission_path"]), vehicle_mission["meta"]["coverage_flight_time"]))
 
     # Extract Take-Off location
-    takeoff_str = attrs["Take-Off Location"]
-    lon_tk, lat_tk, *_ = takeoff_str.split(',')
-    lon_tk, lat_tk = float(lon_tk), float(lat_tk)
-
-    # Build Sensitive Area polygon (with a buffer)
-    sens_coords = []
-    for pair in attrs["Sensitive Area"].split():
-        lon, lat, *_ = pair.split(',')
-        sens_coords.append((float(lon), float(lat)))
-    sensitive_polygon = Polygon(sens_coords).buffer(0.0000001)
-
-    # Build Survey Area polygon
-    survey_coords = []
-    for pair in attrs["Survey Area"].split():
-        lon, lat, *_ = pair.split(',')
-        survey_coords.append((float(lon), float(lat)))
-    survey_polygon = Polygon(survey_coords)
-
-    # Build Flight Region polygon
-    flight_coords = []
-    for pair in attrs["Flight Region"].split():
-        lon, lat, *_ = pair.split(',')
-        flight_coords.append((float(lon), float(lat)))
-    flight_polygon = Polygon(flight_coords)
-
-    # Determine approach corner (bottom-left of survey area)
+    lat_tk, lon_tk = mission["takeoff"][0].tolist()
+
+    # Polygons (the Sensitive Area with a buffer) and their (lat, lon) coordinates
+    flight_polygon, sensitive_polygon, survey_polygon = mission_polygons(mission)
+    flight_coords = [tuple(p) for p in mission["flight_region"].tolist()]
+    sens_coords = [tuple(p) for p in mission["sensitive_area"].tolist()]
+    survey_coords = [tuple(p) for p in mission["survey_area"].tolist()]
+
+    meta = mission["meta"]
+    print("Coverage sweep angle: %.1f deg, %.0f m, %d turns, ~%.0f s" % (
+        meta["sweep_angle"], meta["coverage_length"], meta["coverage_turns"], meta["coverage_flight_time"]))
+    footprint_w, footprint_l = meta["ground_dims"]
+    print("Camera footprint %.1f x %.1f m, sweep spacing %.1f m, capture every %.2f s (%d frames)" % (
+        footprint_w, footprint_l, SURVEY.line_spacing_m(), meta["capture_interval"],
+        SURVEY.frames_for(meta["coverage_length"])))
+
+    final_path_coords = [tuple(p) for p in mission["mission_path"].tolist()]
+    if "waypoints_planned" in meta:
+        print("Mission waypoints: %d (%d planned, compacted to within %.1f m)" % (
+            len(final_path_coords) + len(mission["path_to_take_off"]), meta["waypoints_planned"],
+            meta["compaction_tolerance"]))
+    processing_spots = [tuple(p) for p in mission["processing_spots"].tolist()]
+    hover_times = meta.get("hover_times") or [0.0] * len(processing_spots)
+
+    # The planner itself is only needed for ad-hoc queries such as the Rhino path below
+    planner = build_planner(flight_polygon, sensitive_polygon, (lat_tk, lon_tk), PLANNER_MODE, meta["resolution"],
+                            os.path.join(os.path.dirname(os.path.abspath(kml_file)), "grid-cache"))
     lon_min, lat_min, lon_max, lat_max = survey_polygon.bounds
-    approach_corner = (lat_min, lon_min)
-
-    # Compute grid bounds for approach path planning
-    all_lats = [lat_tk, lat_min, lat_max] + [p[1] for p in sens_coords] + [p[1] for p in flight_coords]
-    all_lons = [lon_tk, lon_min, lon_max] + [p[0] for p in sens_coords] + [p[0] for p in flight_coords]
-    min_lat_grid = min(all_lats) - 0.001
-    max_lat_grid = max(all_lats) + 0.001
-    min_lon_grid = min(all_lons) - 0.001
-    max_lon_grid = max(all_lons) + 0.001
-    resolution = 0.0001
-
-    # Create a PathPlanner instance
-    planner = PathPlanner(flight_polygon, sensitive_polygon, resolution=resolution)
-
-    # Plan approach path (from Take-Off to approach corner)
-    lat_steps = int((max_lat_grid - min_lat_grid) / resolution) + 1
-    lon_steps = int((max_lon_grid - min_lon_grid) / resolution) + 1
-    grid = np.zeros((lat_steps, lon_steps), dtype=int)
-    for i in range(lat_steps):
-        for j in range(lon_steps):
-            lat_cell = min_lat_grid + i * resolution
-            lon_cell = min_lon_grid + j * resolution
-            pt = Point(lon_cell, lat_cell)
-            if not flight_polygon.contains(pt):
-                grid[i, j] = 1
-            elif sensitive_polygon.contains(pt):
-                grid[i, j] = 1
-
-    start_idx = planner.latlon_to_grid(lat_tk, lon_tk, min_lat_grid, min_lon_grid)
-    goal_idx = planner.latlon_to_grid(approach_corner[0], approach_corner[1], min_lat_grid, min_lon_grid)
-    path_indices = planner.a_star_search(grid, start_idx, goal_idx)
-    if path_indices is None:
-        print("No approach path found.")
-        return
-    raw_approach_path = [planner.grid_to_latlon(i, j, min_lat_grid, min_lon_grid) for (i, j) in path_indices]
-    approach_path = planner.smooth_path(raw_approach_path)
-
-    # Generate rotated zigzag coverage for the survey area
-    coverage_path = planner.generate_rotated_zigzag(survey_polygon, spacing=0.00009, inner_margin=0.000001)
-    if not coverage_path:
-        print("No coverage path generated.")
-        return
-    # Reverse coverage if needed
-    def latlon_distance(a, b):
-        return ((a[0]-b[0])**2+(a[1]-b[1])**2)**0.5
-    if latlon_distance(approach_corner, coverage_path[0]) > latlon_distance(approach_corner, coverage_path[-1]):
-        coverage_path.reverse()
-    coverage_path[0] = approach_corner
-    if len(coverage_path) >= 2:
-        coverage_path = coverage_path[:-2]
-    if approach_path[-1] == approach_corner:
-        final_path_coords = approach_path + coverage_path[1:]
-    else:
-        final_path_coords = approach_path + coverage_path
+    min_lat_grid, max_lat_grid, min_lon_grid, max_lon_grid = planner.grid_bounds(
+        (lat_tk, lon_tk), (lat_min, lon_min), (lat_max, lon_max))
 
     # # Select a random Rhino location within the survey area
-    from geometry_utils import random_point_in_polygon
     rhino_location = random_point_in_polygon(survey_polygon)
     if rhino_location is None:
         print("Could not get random Rhino location in the Survey Area!")
@@ -120,14 +104,15 @@ def main():
 
     # Create the map (centered on overall grid bounds)
     center = (0.5 * (min_lat_grid + max_lat_grid), 0.5 * (min_lon_grid + max_lon_grid))
-    map_gen = MapGenerator(center, zoom_start=16)
+    # Bulk mode: one GeoJSON layer per feature type, decimated paths and clustered markers
+    map_gen = MapGenerator(center, zoom_start=16, bulk=True)
 
     # Add polygons for Sensitive, Flight, and Survey areas
-    map_gen.add_polygon([(lat, lon) for lon, lat in sens_coords],
+    map_gen.add_polygon(sens_coords,
                         color="red", tooltip="Sensitive Area", fill=True, fill_opacity=0.4)
-    map_gen.add_polygon([(lat, lon) for lon, lat in flight_coords],
+    map_gen.add_polygon(flight_coords,
                         color="green", tooltip="Flight Region", fill=False, weight=3)
-    map_gen.add_polygon([(lat, lon) for lon, lat in survey_coords],
+    map_gen.add_polygon(survey_coords,
                         color="blue", tooltip="Survey Area", fill=True, fill_opacity=0.2)
 
     # Add the mission path (approach + coverage)
@@ -139,12 +124,11 @@ def main():
     survey_centroid = survey_polygon.centroid
     map_gen.add_marker([survey_centroid.y, survey_centroid.x], "Survey (Centroid)", "blue", icon="flag")
 
-    # Add markers for processing spots (every second point in coverage) skipping the first one
-    for i in range(1, len(coverage_path), 2):
-        if i == 1:
-            continue  # Delete the first processing spot
-        marker_text = f"Processing Spot #{i}"
-        map_gen.add_marker(coverage_path[i], marker_text, "orange", icon="info-sign")
+    # Add markers for processing spots (hover stops)
+    if processing_spots:
+        marker_texts = [f"Processing Spot #{i + 1} (hover {hover_time:.0f} s)"
+                        for i, hover_time in enumerate(hover_times)]
+        map_gen.add_markers(processing_spots, marker_texts, "orange", icon="info-sign")
 
     # # Add Rhino-to-Takeoff path if available
     if rhino_takeoff_path:
@@ -184,24 +168,22 @@ def main():
     print("\n--- Locations ---")
     print("Take-Off Location:", (lat_tk, lon_tk))
     print("Flight Region Coordinates:")
-    for lon, lat in flight_coords:
-        print((lat, lon))
+    for point in flight_coords:
+        print(point)
     print("Sensitive Area Coordinates:")
-    for lon, lat in sens_coords:
-        print((lat, lon))
+    for point in sens_coords:
+        print(point)
     print("Survey Area Coordinates:")
-    for lon, lat in survey_coords:
-        print((lat, lon))
+    for point in survey_coords:
+        print(point)
     print("Processing Spots:")
-    for i in range(1, len(coverage_path), 2):
-        if i == 1:
-            continue  # first processing spot skipped
-        print(coverage_path[i])
+    for spot, hover_time in zip(processing_spots, hover_times):
+        print(spot, "hover %.1f s" % hover_time)
     print("Random Rhino Location:", rhino_location)
 
     # Upload mission to drone
     # vehicle = connect_vehicle("tcp:127.0.0.1:14550")
-    # set_geofence(vehicle, flight_coords, fence_altitude=50)
+    # set_geofence(vehicle, flight_coords, fence_altitude=50, exclusion_coords=[sens_coords])
     # waypoints = [(lat, lon, 10) for lat, lon in final_path_coords]
     # upload_mission(vehicle, waypoints)
     # print("Mission uploaded to vehicle.")
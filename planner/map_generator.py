@@ -1,11 +1,115 @@
+import json
+import math
+import os
 import folium
+import numpy as np
 from branca.element import Template, MacroElement
+from folium.elements import JSCSSMixin
+from folium.plugins import MarkerCluster
+
+try:
+    from .waypoint_compaction import compact_waypoints
+except ImportError:
+    from waypoint_compaction import compact_waypoints
+
+# Ground size of one 256 px tile pixel at the equator and zoom level 0, in metres
+METERS_PER_PIXEL_Z0 = 156543.03392804097
+# Marker layers with more markers than this are clustered in bulk mode
+CLUSTER_THRESHOLD = 50
+
+
+class BulkLayers(JSCSSMixin, MacroElement):
+    """
+    Draws every layer collected by a bulk-mode `MapGenerator` from one data object (see
+    `MapGenerator.bulk_data`), set with `set_data` before the map is rendered: polygon
+    and polyline layers as a single `L.geoJSON` each, marker layers as one (clustered) group.
+    The data is inlined in the HTML, or loaded with a <script> tag from `data_url` (a file
+    that sets `window[data_var]`, which also works for maps opened offline from disk).
+    """
+    default_js = MarkerCluster.default_js
+    default_css = MarkerCluster.default_css
+
+    _template = Template("""
+        {% macro header(this, kwargs) %}
+            {% if this.data_url %}<script src="{{ this.data_url }}"></script>{% endif %}
+        {% endmacro %}
+        {% macro script(this, kwargs) %}
+            (function(data, map) {
+                data.layers.forEach(function(layer) {
+                    if (layer.kind === "markers") {
+                        var group = layer.cluster ? L.markerClusterGroup() : L.featureGroup();
+                        var icon = L.AwesomeMarkers.icon(
+                            {markerColor: layer.color, icon: layer.icon, prefix: "glyphicon"});
+                        layer.points.forEach(function(p) {
+                            var marker = L.marker([p[0], p[1]], {icon: icon});
+                            if (p[2]) { marker.bindPopup(p[2]); }
+                            group.addLayer(marker);
+                        });
+                        group.addTo(map);
+                    } else {
+                        var geojson = L.geoJSON(layer.geojson, {style: layer.style});
+                        if (layer.tooltip) { geojson.bindTooltip(layer.tooltip, {sticky: true}); }
+                        geojson.addTo(map);
+                    }
+                });
+            })({% if this.data_url %}window["{{ this.data_var }}"]{% else %}{{ this.data_json }}{% endif %},
+               {{ this._parent.get_name() }});
+        {% endmacro %}
+    """)
+
+    def __init__(self):
+        super().__init__()
+        self._name = "BulkLayers"
+        self.data_url = self.data_var = self.data_json = None
+
+    def set_data(self, data, data_url=None, data_var=None):
+        self.data_url = data_url
+        self.data_var = data_var
+        self.data_json = None if data_url else json.dumps(data, separators=(",", ":"))
+
 
 class MapGenerator:
-    def __init__(self, center, zoom_start=16):
+    """
+    Builds the folium map of a mission.
+
+    In `bulk` mode, polygons, polylines and markers are collected into layers (one per
+    kind, tooltip and style, or marker colour and icon) instead of becoming one folium object
+    each, and are drawn on `save` from a single compact data object. Polylines and polygons
+    are decimated to one screen pixel at `detail_zoom` (default: two levels closer than
+    `zoom_start`) and large marker layers are clustered, so the map stays fast to write and
+    render with thousands of points.
+    """
+
+    def __init__(self, center, zoom_start=16, bulk=False, detail_zoom=None):
         self.map = folium.Map(location=center, zoom_start=zoom_start)
+        self.bulk = bulk
+        self.detail_zoom = zoom_start + 2 if detail_zoom is None else detail_zoom
+        self.tolerance_m = METERS_PER_PIXEL_Z0 * math.cos(math.radians(center[0])) / 2 ** self.detail_zoom
+        self.layers = {}
+        self._bulk_layers = None
+        # Polyline and polygon vertices before and after decimation (bulk mode), as reported by benchmark_map.py
+        self.points_in = 0
+        self.points_out = 0
+
+    def _layer(self, key, **fields):
+        if key not in self.layers:
+            self.layers[key] = dict(fields, items=[])
+        return self.layers[key]["items"]
+
+    def _decimate(self, locations):
+        locations = [tuple(p) for p in np.asarray(locations, dtype=np.float64).reshape(-1, 2).tolist()]
+        decimated, _ = compact_waypoints(locations, self.tolerance_m)
+        self.points_in += len(locations)
+        self.points_out += len(decimated)
+        # GeoJSON order (lon, lat), rounded to ~1 cm
+        return [[round(lon, 7), round(lat, 7)] for lat, lon in decimated]
 
     def add_polygon(self, locations, color, tooltip, weight=2, fill=True, fill_opacity=0.4):
+        if self.bulk:
+            style = {"color": color, "weight": weight, "fill": fill, "fillOpacity": fill_opacity}
+            ring = self._decimate(list(locations) + [locations[0]])
+            self._layer(("polygon", tooltip, json.dumps(style)), tooltip=tooltip, style=style).append([ring])
+            return
         folium.Polygon(
             locations=locations,
             color=color,
@@ -16,13 +120,32 @@ class MapGenerator:
         ).add_to(self.map)
 
     def add_marker(self, location, popup, icon_color, icon="info-sign"):
+        if self.bulk:
+            self.add_markers([location], [popup], icon_color, icon)
+            return
         folium.Marker(
             location=location,
             popup=popup,
             icon=folium.Icon(color=icon_color, icon=icon)
         ).add_to(self.map)
 
+    def add_markers(self, locations, popups=None, icon_color="blue", icon="info-sign"):
+        """Adds many (lat, lon) markers at once, e.g. detections; `popups` is a list of texts or None."""
+        locations = np.asarray(locations, dtype=np.float64).reshape(-1, 2).round(7).tolist()
+        popups = popups if popups is not None else [None] * len(locations)
+        if not self.bulk:
+            for location, popup in zip(locations, popups):
+                self.add_marker(location, popup, icon_color, icon)
+            return
+        items = self._layer(("markers", icon_color, icon), color=icon_color, icon=icon)
+        items.extend([lat, lon, popup] for (lat, lon), popup in zip(locations, popups))
+
     def add_polyline(self, locations, color, tooltip, weight=3, opacity=1.0):
+        if self.bulk:
+            style = {"color": color, "weight": weight, "opacity": opacity}
+            self._layer(("polyline", tooltip, json.dumps(style)), tooltip=tooltip, style=style).append(
+                self._decimate(locations))
+            return
         folium.PolyLine(
             locations=locations,
             color=color,
@@ -36,8 +159,56 @@ class MapGenerator:
         legend._template = Template(legend_html)
         self.map.get_root().add_child(legend)
 
+    def _bulk_bounds(self):
+        """[[south, west], [north, east]] of everything collected in bulk mode, or None."""
+        lats, lons = [], []
+        for key, layer in self.layers.items():
+            if key[0] == "markers":
+                points = [(p[0], p[1]) for p in layer["items"]]
+            else:
+                points = [(lat, lon) for part in layer["items"] for ring in (part if key[0] == "polygon" else [part])
+                          for lon, lat in ring]
+            lats.extend(p[0] for p in points)
+            lons.extend(p[1] for p in points)
+        if not lats:
+            return None
+        return [[min(lats), min(lons)], [max(lats), max(lons)]]
+
     def fit_bounds(self):
-        self.map.fit_bounds(self.map.get_bounds())
+        bounds = self._bulk_bounds() if self.bulk else None
+        self.map.fit_bounds(bounds if bounds is not None else self.map.get_bounds())
+
+    def bulk_data(self):
+        """The data object drawn by `BulkLayers`: one entry per collected layer."""
+        layers = []
+        for key, layer in self.layers.items():
+            kind = key[0]
+            if kind == "markers":
+                layers.append({"kind": "markers", "color": layer["color"], "icon": layer["icon"],
+                               "cluster": len(layer["items"]) > CLUSTER_THRESHOLD, "points": layer["items"]})
+                continue
+            geometry_type = "MultiPolygon" if kind == "polygon" else "MultiLineString"
+            layers.append({"kind": kind, "tooltip": layer["tooltip"], "style": layer["style"],
+                           "geojson": {"type": "Feature", "properties": {},
+                                       "geometry": {"type": geometry_type, "coordinates": layer["items"]}}})
+        return {"layers": layers}
 
-    def save(self, file_name):
+    def save(self, file_name, data_file=False):
+        """
+        Saves the map as HTML. In bulk mode, with `data_file` the layer data goes to a
+        separate `<name>.data.js` next to it, so the HTML itself stays small.
+        """
+        if self.bulk and self.layers:
+            data = self.bulk_data()
+            data_url = data_var = None
+            if data_file:
+                data_path = os.path.splitext(file_name)[0] + ".data.js"
+                data_url = os.path.basename(data_path)
+                data_var = "mapData_" + self.map.get_name()
+                with open(data_path, "w") as f:
+                    f.write(f"window[{json.dumps(data_var)}] = {json.dumps(data, separators=(',', ':'))};\n")
+            if self._bulk_layers is None:
+                self._bulk_layers = BulkLayers()
+                self._bulk_layers.add_to(self.map)
+            self._bulk_layers.set_data(data, data_url, data_var)
         self.map.save(file_name)
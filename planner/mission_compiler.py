@@ -0,0 +1,301 @@
+# mission_compiler.py
+"""
+Compiles a mission KML into a binary artifact holding every planning output, so that the
+flight runtime can load a ready-made mission instead of parsing KML and planning onboard.
+
+The artifact is a NumPy `.npz` archive. Coordinate arrays are (N, 2) float64 in (lat, lon)
+order; scalar settings live in a JSON `meta` entry together with the SHA-256 of the source
+KML, which is how a stale artifact is detected and re-planned.
+"""
+import hashlib
+import json
+import os
+import numpy as np
+from shapely.geometry import Polygon
+
+try:
+    from .kml_parser import KMLParser
+    from .path_planner import PathPlanner
+    from .grid_cache import GridCache
+    from .visibility_planner import VisibilityGraphPlanner
+    from .quadtree_planner import QuadtreePlanner
+    from .fleet_planner import plan_legs, plan_fleet
+    from .processing_scheduler import schedule_processing_stops, leg_lengths_m
+    from .waypoint_compaction import compact_waypoints
+except ImportError:
+    from kml_parser import KMLParser
+    from path_planner import PathPlanner
+    from grid_cache import GridCache
+    from visibility_planner import VisibilityGraphPlanner
+    from quadtree_planner import QuadtreePlanner
+    from fleet_planner import plan_legs, plan_fleet
+    from processing_scheduler import schedule_processing_stops, leg_lengths_m
+    from waypoint_compaction import compact_waypoints
+
+ARTIFACT_VERSION = 1
+ARTIFACT_ARRAYS = ("takeoff", "flight_region", "sensitive_area", "survey_area", "path_to_survey",
+                   "coverage_path", "path_to_take_off", "processing_spots", "mission_path")
+# Buffer applied to the Sensitive Area before planning
+SENSITIVE_BUFFER = 0.0000001
+
+
+def kml_hash(kml_file):
+    digest = hashlib.sha256()
+    with open(kml_file, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def build_planner(flight_polygon, sensitive_polygon, takeoff, planner_mode="grid", resolution=0.0001,
+                  cache_dir=None, grid_cache=None):
+    """
+    Creates the planner for `planner_mode` ("grid", "quadtree" or "visibility"). In grid mode obstacle grids
+    are cached in `grid_cache`, or in a `GridCache` in `cache_dir` (if given), and the return-home field to
+    `takeoff` is precomputed.
+    """
+    if planner_mode == "visibility":
+        return VisibilityGraphPlanner(flight_polygon, sensitive_polygon, resolution=resolution)
+    if planner_mode == "quadtree":
+        return QuadtreePlanner(flight_polygon, sensitive_polygon, resolution=resolution)
+    if grid_cache is None and cache_dir:
+        grid_cache = GridCache(cache_dir)
+    planner = PathPlanner(flight_polygon, sensitive_polygon, resolution=resolution, grid_cache=grid_cache)
+    planner.prepare_return_home(takeoff)
+    return planner
+
+
+def mission_polygons(artifact):
+    """Returns the (flight, sensitive, survey) Shapely polygons of an artifact, ready for planning."""
+    flight_polygon = Polygon(artifact["flight_region"][:, ::-1])
+    sensitive_polygon = Polygon(artifact["sensitive_area"][:, ::-1]).buffer(SENSITIVE_BUFFER)
+    survey_polygon = Polygon(artifact["survey_area"][:, ::-1])
+    return flight_polygon, sensitive_polygon, survey_polygon
+
+
+def save_mission_artifact(artifact_path, artifact):
+    arrays = {name: np.asarray(artifact[name], dtype=np.float64).reshape(-1, 2) for name in ARTIFACT_ARRAYS}
+    meta = np.array(json.dumps(artifact["meta"]))
+    # Write to a temporary file first so a crash never leaves a half-written artifact behind.
+    tmp_path = artifact_path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, meta=meta, **arrays)
+    os.replace(tmp_path, artifact_path)
+
+
+def load_mission_artifact(artifact_path, expected_kml_hash=None):
+    """
+    Loads an artifact written by `save_mission_artifact`. Returns None if it does not exist,
+    was written by another artifact version, or was compiled from a KML other than
+    `expected_kml_hash`.
+    """
+    if not os.path.exists(artifact_path):
+        return None
+    with np.load(artifact_path) as data:
+        meta = json.loads(str(data["meta"]))
+        if meta.get("version") != ARTIFACT_VERSION:
+            return None
+        if expected_kml_hash is not None and meta.get("kml_hash") != expected_kml_hash:
+            return None
+        artifact = {name: data[name] for name in ARTIFACT_ARRAYS}
+    artifact["meta"] = meta
+    return artifact
+
+
+def load_mission_kml(kml_file):
+    """Returns the take-off (lat, lon), the KML features and the (flight, sensitive, survey) polygons."""
+    features = KMLParser.load_geometries(
+        kml_file, names={"Take-Off Location", "Sensitive Area", "Survey Area", "Flight Region"})
+    lon_tk, lat_tk = features["Take-Off Location"]["coords"][0][0].tolist()
+    sensitive_polygon = features["Sensitive Area"]["geometry"].buffer(SENSITIVE_BUFFER)
+    survey_polygon = features["Survey Area"]["geometry"]
+    flight_polygon = features["Flight Region"]["geometry"]
+    return (lat_tk, lon_tk), features, (flight_polygon, sensitive_polygon, survey_polygon)
+
+
+def _latlons(coords):
+    return [(lat, lon) for lon, lat in coords.tolist()]
+
+
+def _mission_artifact(takeoff, features, legs, score, meta):
+    """Assembles the artifact dict of one vehicle from its `fleet_planner.plan_legs` output."""
+    return {
+        "takeoff": [takeoff],
+        "flight_region": _latlons(features["Flight Region"]["coords"][0]),
+        "sensitive_area": _latlons(features["Sensitive Area"]["coords"][0]),
+        "survey_area": _latlons(features["Survey Area"]["coords"][0]),
+        "path_to_survey": legs["path_to_survey"],
+        "coverage_path": legs["coverage_path"],
+        "path_to_take_off": legs["path_to_take_off"],
+        "processing_spots": legs["processing_spots"],
+        "mission_path": legs["mission_path"],
+        "meta": dict(meta, **{
+            "version": ARTIFACT_VERSION,
+            "sweep_angle": score["angle"],
+            "coverage_length": score["length"],
+            "coverage_turns": score["turns"],
+            "coverage_flight_time": score["flight_time"],
+        }),
+    }
+
+
+def _survey_meta(kml_digest, survey, planner_mode, resolution):
+    return {
+        "kml_hash": kml_digest,
+        "planner_mode": planner_mode,
+        "resolution": resolution,
+        "altitude": survey.altitude,
+        "ground_dims": list(survey.ground_footprint()),
+        "capture_interval": survey.capture_interval(),
+        "cruise_speed": survey.cruise_speed,
+    }
+
+
+def _meta_matches(artifact, expected):
+    """True if `artifact` exists and its meta holds every `expected` value."""
+    return artifact is not None and all(artifact["meta"].get(key, -1) == value for key, value in expected.items())
+
+
+def schedule_processing(legs, survey, processing):
+    """
+    Replaces the processing spots of `legs` (see `fleet_planner.plan_legs`) by the hover stops
+    `schedule_processing_stops` picks for the `ProcessingBudget` `processing`.
+    Returns the `ProcessingSchedule`.
+    """
+    transit_m = leg_lengths_m(legs["path_to_survey"]).sum() + leg_lengths_m(legs["path_to_take_off"]).sum()
+    schedule = schedule_processing_stops(
+        legs["coverage_path"], survey.capture_interval(), processing.inference_rate, processing.max_backlog,
+        cruise_speed=survey.cruise_speed, stop_overhead=processing.stop_overhead,
+        transit_time=float(transit_m) / survey.cruise_speed, battery_time=processing.battery_time)
+    legs["processing_spots"] = schedule.stops
+    return schedule
+
+
+def compact_legs(legs, planner, tolerance_m):
+    """
+    Removes redundant waypoints from the mission_path and path_to_take_off of `legs` (see
+    `fleet_planner.plan_legs`) with `compact_waypoints`, within `tolerance_m` metres and
+    validated against `planner`'s obstacles. Processing spots on the path are kept.
+    Returns the total number of waypoints before and after.
+    """
+    spots = set(map(tuple, legs["processing_spots"]))
+    before = after = 0
+    for key in ("mission_path", "path_to_take_off"):
+        path = legs[key]
+        keep = [k for k, point in enumerate(path) if tuple(point) in spots]
+        legs[key], _ = compact_waypoints(path, tolerance_m, planner, keep)
+        before += len(path)
+        after += len(legs[key])
+    return before, after
+
+
+def compile_mission(kml_file, artifact_path, survey, planner_mode="grid", resolution=0.0001, processing=None,
+                    compaction_tolerance=1.0, force=False):
+    """
+    Plans the mission described by `kml_file` and writes it to `artifact_path`, unless an
+    artifact compiled from the same KML with the same planner and survey settings already
+    exists there (pass `force` to re-plan anyway).
+    `survey` is a `SurveyParameters`. With a `ProcessingBudget` as `processing`, the processing
+    spots are the hover stops chosen by `schedule_processing`, and their hover times are kept
+    in the artifact's meta; otherwise every second coverage point is one.
+    The mission and return paths are then compacted (`compact_legs`) to within
+    `compaction_tolerance` metres; None keeps every planned waypoint.
+    Returns the artifact dict, or None if planning failed.
+    """
+    kml_digest = kml_hash(kml_file)
+    processing_settings = processing.as_dict() if processing is not None else None
+    if not force:
+        artifact = load_mission_artifact(artifact_path, kml_digest)
+        # Reused only if planned with the same planner and survey settings (altitude, footprint, speed)
+        expected = dict(_survey_meta(kml_digest, survey, planner_mode, resolution), processing=processing_settings,
+                        compaction_tolerance=compaction_tolerance)
+        if _meta_matches(artifact, expected):
+            return artifact
+
+    takeoff, features, (flight_polygon, sensitive_polygon, survey_polygon) = load_mission_kml(kml_file)
+    cache_dir = os.path.join(os.path.dirname(os.path.abspath(kml_file)), "grid-cache")
+    planner = build_planner(flight_polygon, sensitive_polygon, takeoff, planner_mode, resolution, cache_dir)
+
+    # Zigzag coverage clipped to the survey area, along the quickest sweep direction
+    coverage_path, coverage_score = planner.generate_optimal_coverage(
+        survey_polygon, spacing=survey.sweep_spacing_deg(), inner_margin=0.000001,
+        cruise_speed=survey.cruise_speed)
+    if not coverage_path:
+        print("No coverage path generated.")
+        return None
+    # Approach, return to Take-Off and processing spots
+    legs = plan_legs(planner, takeoff, coverage_path)
+    if legs is None:
+        print("No approach path found.")
+        return None
+    if not legs["path_to_take_off"]:
+        print("WARNING: No return path found from the end of the coverage to Take-Off.")
+
+    meta = _survey_meta(kml_digest, survey, planner_mode, resolution)
+    meta["processing"] = processing_settings
+    if processing is not None:
+        schedule = schedule_processing(legs, survey, processing)
+        meta["hover_times"] = schedule.hover_times
+        meta["mission_time"] = schedule.mission_time
+        if not schedule.within_battery:
+            print("WARNING: Mission needs %.0f s including %.0f s of hovering, over the %.0f s battery budget." % (
+                schedule.mission_time, schedule.total_hover_time, processing.battery_time))
+    meta["compaction_tolerance"] = compaction_tolerance
+    if compaction_tolerance is not None:
+        before, after = compact_legs(legs, planner, compaction_tolerance)
+        meta["waypoints_planned"] = before
+        print("Mission waypoints: %d -> %d after compaction (%.1f m tolerance)." % (
+            before, after, compaction_tolerance))
+    artifact = _mission_artifact(takeoff, features, legs, coverage_score, meta)
+    save_mission_artifact(artifact_path, artifact)
+    return load_mission_artifact(artifact_path)
+
+
+def compile_fleet(kml_file, artifact_prefix, survey, n_vehicles, resolution=0.0001, processes=None,
+                  compaction_tolerance=1.0, force=False):
+    """
+    Splits the survey area of `kml_file` between `n_vehicles` vehicles launching from its
+    take-off location (see `fleet_planner.plan_fleet`) and writes one artifact per vehicle, to
+    `<artifact_prefix>.vehicle<k>.mission.npz`. Each artifact's survey_area is that vehicle's
+    strip, and its paths are compacted as in `compile_mission`. As there, the fleet is only
+    re-planned if the KML or the settings changed, or some vehicle has no artifact (pass
+    `force` to re-plan anyway). Returns the list of artifacts, with None for vehicles whose
+    planning failed.
+    """
+    kml_digest = kml_hash(kml_file)
+    artifact_paths = [f"{artifact_prefix}.vehicle{k}.mission.npz" for k in range(n_vehicles)]
+    expected = dict(_survey_meta(kml_digest, survey, "grid", resolution), fleet_size=n_vehicles,
+                    compaction_tolerance=compaction_tolerance)
+    if not force:
+        artifacts = [load_mission_artifact(path, kml_digest) for path in artifact_paths]
+        if all(_meta_matches(artifact, dict(expected, vehicle=k)) for k, artifact in enumerate(artifacts)):
+            return artifacts
+
+    takeoff, features, (flight_polygon, sensitive_polygon, survey_polygon) = load_mission_kml(kml_file)
+    missions, _ = plan_fleet(flight_polygon, sensitive_polygon, survey_polygon, [takeoff] * n_vehicles,
+                             survey.sweep_spacing_deg(), inner_margin=0.000001, cruise_speed=survey.cruise_speed,
+                             resolution=resolution, processes=processes)
+    # Line-of-sight checks only; no grid is built
+    planner = PathPlanner(flight_polygon, sensitive_polygon, resolution=resolution)
+    artifacts = []
+    for k, mission in enumerate(missions):
+        if mission is None or mission["score"] is None:
+            print(f"No mission planned for vehicle {k}.")
+            artifacts.append(None)
+            continue
+        meta = dict(expected, vehicle=k)
+        if compaction_tolerance is not None:
+            meta["waypoints_planned"], _ = compact_legs(mission, planner, compaction_tolerance)
+        artifact = _mission_artifact(takeoff, features, mission, mission["score"], meta)
+        # The vehicle's own strip. An artifact holds a single outline, so when the cut splits the survey
+        # area only the largest part is recorded; the coverage path still sweeps every part
+        parts = getattr(mission["survey_area"], "geoms", [mission["survey_area"]])
+        strip = max(parts, key=lambda g: g.area)
+        if len(parts) > 1:
+            print("WARNING: Vehicle %d's strip has %d parts; its artifact outlines the largest only "
+                  "(%.0f%% of the strip's area)." % (k, len(parts), 100.0 * strip.area / mission["survey_area"].area))
+        artifact["survey_area"] = _latlons(np.asarray(strip.exterior.coords))
+        artifact_path = artifact_paths[k]
+        save_mission_artifact(artifact_path, artifact)
+        artifacts.append(load_mission_artifact(artifact_path))
+    return artifacts
@@ -0,0 +1,153 @@
+import importlib
+import time
+from collections import deque
+from pymavlink import mavutil
+
+REQUEST_TYPES = ['MISSION_REQUEST_INT', 'MISSION_REQUEST', 'MISSION_ACK']
+
+
+def mavlink2_connection(device, **kwargs):
+    """
+    `mavutil.mavlink_connection` that sends MAVLink 2 from its first message, as `mission_type`
+    (geofences, rally points) needs. pymavlink otherwise chooses MAVLink 1 or 2 for the whole
+    process, from the MAVLINK20 environment variable, when it loads its dialect.
+    """
+    mav = mavutil.mavlink_connection(device, **kwargs)
+    if not mav.mavlink20():
+        dialect = importlib.import_module(f"pymavlink.dialects.v20.{mavutil.current_dialect}")
+        mav.mav = dialect.MAVLink(mav, srcSystem=mav.source_system, srcComponent=mav.source_component)
+        mav.mav.robust_parsing = mav.robust_parsing
+        mav.WIRE_PROTOCOL_VERSION = dialect.WIRE_PROTOCOL_VERSION
+    return mav
+
+
+class UploadResult:
+    """Outcome of one `MissionUploader.upload` call."""
+
+    def __init__(self, success, count, elapsed, items_sent, retransmissions, ack_type=None):
+        self.success = success
+        self.count = count
+        self.elapsed = elapsed
+        self.items_sent = items_sent
+        self.retransmissions = retransmissions
+        self.ack_type = ack_type
+
+    @property
+    def throughput(self):
+        """Mission items per second."""
+        return self.count / self.elapsed if self.success and self.elapsed > 0 else 0.0
+
+    def __repr__(self):
+        return (f"UploadResult(success={self.success}, count={self.count}, elapsed={self.elapsed:.2f}s, "
+                f"throughput={self.throughput:.1f} items/s, items_sent={self.items_sent}, "
+                f"retransmissions={self.retransmissions}, ack_type={self.ack_type})")
+
+
+class MissionUploader:
+    """
+    Uploads a list of (lat, lon, alt) waypoints with the MAVLink mission protocol.
+
+    All items are encoded up front, and every MISSION_REQUEST(_INT) is answered as soon as
+    it arrives, in whatever order the autopilot asks, so several requests can be in flight
+    on a high-latency link. When the link goes quiet for `item_timeout` seconds, the most
+    recently requested items are sent again (or MISSION_COUNT, if nothing was requested yet).
+    The timeout grows by `backoff` up to `max_timeout` after each silent period and resets
+    when the autopilot makes progress. After `max_retries` silent periods in a row the upload
+    stops, keeping its state: `upload(resume=True)` then picks up where the autopilot left
+    off instead of starting again from item 0, unless the autopilot has cancelled it meanwhile.
+    The upload succeeds once the autopilot acknowledges it with MAV_MISSION_ACCEPTED.
+    Other item lists, such as geofences, are uploaded with `from_items` and their `mission_type`.
+    """
+
+    def __init__(self, mav, waypoints_3d, item_timeout=0.5, max_retries=5, backoff=2.0, max_timeout=4.0,
+                 mission_type=mavutil.mavlink.MAV_MISSION_TYPE_MISSION):
+        self.mav = mav
+        self.mission_type = mission_type
+        self.item_timeout = item_timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_timeout = max_timeout
+        # Left out for plain missions, so they also upload over a MAVLink 1 dialect
+        self._type_field = {"mission_type": mission_type} if mission_type else {}
+        self.items = [
+            mav.mav.mission_item_int_encode(
+                mav.target_system, mav.target_component, seq,
+                mavutil.mavlink.MAV_FRAME_GLOBAL_RELATIVE_ALT,
+                mavutil.mavlink.MAV_CMD_NAV_WAYPOINT,
+                0, 1,        # current, autocontinue
+                0, 0, 0, 0,  # params 1-4 (not used)
+                int(lat * 1e7), int(lon * 1e7), alt, **self._type_field)
+            for seq, (lat, lon, alt) in enumerate(waypoints_3d)]
+        # Items requested most recently, retransmitted when the link goes quiet
+        self._recent = deque(maxlen=4)
+        self._started = False
+
+    @classmethod
+    def from_items(cls, mav, items, mission_type, **options):
+        """Uploader for already encoded MISSION_ITEM_INT messages (seq 0, 1, ...) of `mission_type`."""
+        uploader = cls(mav, [], mission_type=mission_type, **options)
+        uploader.items = list(items)
+        return uploader
+
+    def _send_count(self):
+        self.mav.mav.mission_count_send(self.mav.target_system, self.mav.target_component, len(self.items),
+                                        **self._type_field)
+
+    def upload(self, resume=False):
+        """Runs (or with `resume`, continues) the upload. Returns an `UploadResult`."""
+        count = len(self.items)
+        t0 = time.monotonic()
+        items_sent = retransmissions = 0
+        if not (resume and self._started):
+            self._recent.clear()
+            self._send_count()
+            self._started = True
+        elif not self._recent:
+            self._send_count()
+
+        timeout = self.item_timeout
+        retries = 0
+        deadline = time.monotonic() + timeout
+        while True:
+            msg = self.mav.recv_match(type=REQUEST_TYPES, blocking=True,
+                                      timeout=max(deadline - time.monotonic(), 0.0))
+            if msg is None:
+                retries += 1
+                if retries > self.max_retries:
+                    return UploadResult(False, count, time.monotonic() - t0, items_sent, retransmissions)
+                if self._recent:
+                    for seq in self._recent:
+                        self.mav.mav.send(self.items[seq])
+                        items_sent += 1
+                        retransmissions += 1
+                else:
+                    self._send_count()
+                    retransmissions += 1
+                timeout = min(timeout * self.backoff, self.max_timeout)
+                deadline = time.monotonic() + timeout
+                continue
+            if getattr(msg, "mission_type", self.mission_type) != self.mission_type:
+                continue
+
+            if msg.get_type() == 'MISSION_ACK':
+                if msg.type == mavutil.mavlink.MAV_MISSION_ACCEPTED:
+                    self._started = False
+                    return UploadResult(True, count, time.monotonic() - t0, items_sent, retransmissions,
+                                        msg.type)
+                if msg.type == mavutil.mavlink.MAV_MISSION_INVALID_SEQUENCE:
+                    continue  # a duplicate item arrived late; the upload goes on
+                # Any other ACK ends the autopilot's side of the upload; start over next time.
+                self._started = False
+                return UploadResult(False, count, time.monotonic() - t0, items_sent, retransmissions, msg.type)
+
+            if not 0 <= msg.seq < count:
+                continue
+            self.mav.mav.send(self.items[msg.seq])
+            items_sent += 1
+            if msg.seq in self._recent:
+                self._recent.remove(msg.seq)
+                retransmissions += 1
+            self._recent.append(msg.seq)
+            timeout = self.item_timeout
+            retries = 0
+            deadline = time.monotonic() + timeout
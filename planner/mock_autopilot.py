@@ -0,0 +1,194 @@
+# mock_autopilot.py
+"""
+Minimal pymavlink autopilot for exercising mission uploads offline.
+
+It implements the receiving side of the MAVLink mission upload protocol over a real
+pymavlink connection (UDP on localhost by default), with simulated packet loss and latency
+in both directions, so upload code can be tested and benchmarked without SITL or a vehicle.
+"""
+import heapq
+import random
+import threading
+import time
+from pymavlink import mavutil
+
+try:
+    from .mission_upload import mavlink2_connection
+except ImportError:
+    from mission_upload import mavlink2_connection
+
+
+class MockAutopilot:
+    """
+    Accepts mission and geofence uploads, parameter changes and DO_PAUSE_CONTINUE commands.
+
+    Each message in either direction is dropped with probability `loss` and otherwise delayed
+    by `latency` seconds plus up to `jitter` seconds. Up to `window` item requests are kept
+    in flight at once (1 behaves like ArduPilot and PX4), and a request not answered within
+    `request_timeout` seconds is repeated. An upload that sees no items for `abort_timeout`
+    seconds is cancelled. Completed missions are kept in `mission` as (seq, lat, lon, alt),
+    fences in `fence` as (seq, command, vertex count, lat, lon) and parameters in `params`.
+    """
+
+    def __init__(self, connection_string='udpout:127.0.0.1:14560', loss=0.0, latency=0.0, jitter=0.0, window=1,
+                 request_timeout=0.5, abort_timeout=10.0, seed=None):
+        self.mav = mavlink2_connection(connection_string, source_system=1, source_component=1)
+        self.loss = loss
+        self.latency = latency
+        self.jitter = jitter
+        self.window = window
+        self.request_timeout = request_timeout
+        self.abort_timeout = abort_timeout
+        self.rng = random.Random(seed)
+        self.mission = []
+        self.fence = []
+        self.params = {}
+        self.uploads_completed = 0
+        self._outbox = []
+        self._outbox_lock = threading.Lock()
+        self._outbox_counter = 0
+        self._stop = threading.Event()
+        self._threads = []
+        self._upload = None
+        # The last completed upload, whose ACK is repeated if the uploader missed it and sends items again
+        self._completed = None
+
+    def start(self):
+        for target in (self._receive_loop, self._send_loop, self._heartbeat_loop):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=1.0)
+        self.mav.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # ----- Lossy, delayed link -----
+
+    def _send(self, msg):
+        if self.rng.random() < self.loss:
+            return
+        due = time.monotonic() + self.latency + self.rng.uniform(0.0, self.jitter)
+        with self._outbox_lock:
+            self._outbox_counter += 1
+            heapq.heappush(self._outbox, (due, self._outbox_counter, msg))
+
+    def _send_loop(self):
+        while not self._stop.is_set():
+            now = time.monotonic()
+            ready = []
+            with self._outbox_lock:
+                while self._outbox and self._outbox[0][0] <= now:
+                    ready.append(heapq.heappop(self._outbox)[2])
+            for msg in ready:
+                self.mav.mav.send(msg)
+            time.sleep(0.0005)
+
+    def _heartbeat_loop(self):
+        while not self._stop.is_set():
+            self.mav.mav.heartbeat_send(mavutil.mavlink.MAV_TYPE_QUADROTOR,
+                                        mavutil.mavlink.MAV_AUTOPILOT_ARDUPILOTMEGA, 0, 0, 0)
+            self._stop.wait(1.0)
+
+    # ----- Mission protocol -----
+
+    def _request(self, seq):
+        upload = self._upload
+        self._send(self.mav.mav.mission_request_int_encode(upload["sysid"], upload["compid"], seq,
+                                                           **self._type_field(upload["mission_type"])))
+        upload["requested"][seq] = time.monotonic()
+
+    def _ack(self, sysid, compid, result, mission_type=mavutil.mavlink.MAV_MISSION_TYPE_MISSION):
+        self._send(self.mav.mav.mission_ack_encode(sysid, compid, result, **self._type_field(mission_type)))
+
+    @staticmethod
+    def _type_field(mission_type):
+        # Plain missions also work over a MAVLink 1 dialect, which has no mission_type
+        return {"mission_type": mission_type} if mission_type else {}
+
+    def _fill_window(self):
+        upload = self._upload
+        while len(upload["requested"]) < self.window and upload["next_seq"] < upload["count"]:
+            self._request(upload["next_seq"])
+            upload["next_seq"] += 1
+
+    def _handle(self, msg):
+        msg_type = msg.get_type()
+        mission_type = getattr(msg, "mission_type", mavutil.mavlink.MAV_MISSION_TYPE_MISSION)
+        sysid, compid = msg.get_srcSystem(), msg.get_srcComponent()
+        if msg_type == 'MISSION_COUNT':
+            if msg.count == 0:
+                self._store(mission_type, [])
+                self._ack(sysid, compid, mavutil.mavlink.MAV_MISSION_ACCEPTED, mission_type)
+                return
+            self._completed = None
+            self._upload = {"count": msg.count, "items": {}, "requested": {}, "next_seq": 0,
+                            "sysid": sysid, "compid": compid, "last_item": time.monotonic(),
+                            "mission_type": mission_type}
+            self._fill_window()
+        elif msg_type in ('MISSION_ITEM_INT', 'MISSION_ITEM'):
+            upload = self._upload
+            if upload is None:
+                completed = self._completed
+                if completed is not None and completed["mission_type"] == mission_type and msg.seq < completed["count"]:
+                    # The final ACK was lost and the uploader is retransmitting: acknowledge again
+                    self._ack(sysid, compid, mavutil.mavlink.MAV_MISSION_ACCEPTED, mission_type)
+                return
+            if msg.seq not in upload["requested"] or mission_type != upload["mission_type"]:
+                return  # duplicate or unrequested item
+            del upload["requested"][msg.seq]
+            if upload["mission_type"] == mavutil.mavlink.MAV_MISSION_TYPE_FENCE:
+                upload["items"][msg.seq] = (msg.seq, msg.command, int(msg.param1), msg.x / 1e7, msg.y / 1e7)
+            else:
+                upload["items"][msg.seq] = (msg.seq, msg.x / 1e7, msg.y / 1e7, msg.z)
+            upload["last_item"] = time.monotonic()
+            if len(upload["items"]) == upload["count"]:
+                self._store(upload["mission_type"], [upload["items"][seq] for seq in range(upload["count"])])
+                self.uploads_completed += 1
+                self._upload = None
+                self._completed = upload
+                self._ack(sysid, compid, mavutil.mavlink.MAV_MISSION_ACCEPTED, upload["mission_type"])
+            else:
+                self._fill_window()
+        elif msg_type == 'PARAM_SET':
+            self.params[msg.param_id] = msg.param_value
+            self._send(self.mav.mav.param_value_encode(msg.param_id.encode(), msg.param_value, msg.param_type,
+                                                       len(self.params), len(self.params) - 1))
+        elif msg_type == 'COMMAND_LONG' and msg.command == mavutil.mavlink.MAV_CMD_DO_PAUSE_CONTINUE:
+            self._send(self.mav.mav.command_ack_encode(msg.command, mavutil.mavlink.MAV_RESULT_ACCEPTED))
+
+    def _store(self, mission_type, items):
+        if mission_type == mavutil.mavlink.MAV_MISSION_TYPE_FENCE:
+            self.fence = items
+        else:
+            self.mission = items
+
+    def _check_timeouts(self):
+        upload = self._upload
+        if upload is None:
+            return
+        now = time.monotonic()
+        if now - upload["last_item"] > self.abort_timeout:
+            self._ack(upload["sysid"], upload["compid"], mavutil.mavlink.MAV_MISSION_OPERATION_CANCELLED,
+                      upload["mission_type"])
+            self._upload = None
+            return
+        for seq, sent in list(upload["requested"].items()):
+            if now - sent > self.request_timeout:
+                self._request(seq)
+
+    def _receive_loop(self):
+        while not self._stop.is_set():
+            msg = self.mav.recv_match(blocking=True, timeout=0.01)
+            if msg is not None and msg.get_type() != 'BAD_DATA' and self.rng.random() >= self.loss:
+                self._handle(msg)
+            self._check_timeouts()
@@ -0,0 +1,191 @@
+# monte_carlo.py
+"""
+Monte Carlo study of return-home planning: samples many rhino positions in the survey area
+(and optionally random take-off sites), plans the path from each back to its take-off site
+in a process pool, and reports p50/p95/p99 planning time and path length and the failure rate.
+
+Writes the summary as JSON and one row per scenario as CSV. With --baseline (a summary
+JSON from an earlier run), exits with status 1 if planning time, path length or the failure
+rate regressed by more than --tolerance, so it doubles as a performance regression benchmark.
+
+Usage:
+    python monte_carlo.py [--kml FILE] [--scenarios 1000] [--random-takeoffs 0] [--seed 0]
+                          [--planner grid] [--processes N] [--json summary.json] [--csv runs.csv]
+                          [--baseline old_summary.json] [--tolerance 0.25]
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from geometry_utils import random_points_in_polygon
+from mission_compiler import build_planner, load_mission_kml
+from processing_scheduler import leg_lengths_m
+
+# Percentiles reported for planning time and path length
+PERCENTILES = (50, 95, 99)
+CSV_FIELDS = ("scenario", "rhino_lat", "rhino_lon", "takeoff_lat", "takeoff_lon", "success",
+              "planning_time_ms", "path_length_m", "waypoints")
+
+# Planner of each worker process, built once by `init_worker`
+_planner = None
+
+
+def sample_scenarios(flight_polygon, sensitive_polygon, survey_polygon, takeoff, n_scenarios,
+                     n_random_takeoffs=0, seed=0):
+    """
+    Returns `n_scenarios` (rhino, takeoff) pairs of (lat, lon) points: rhino positions uniform
+    over the survey area outside the sensitive area, each paired with a take-off site drawn from
+    `takeoff` and `n_random_takeoffs` random sites in the flight region outside the sensitive area.
+    """
+    rng = np.random.default_rng(seed)
+    rhinos = random_points_in_polygon(survey_polygon.difference(sensitive_polygon), n_scenarios, seed=rng)
+    sites = [tuple(takeoff)]
+    if n_random_takeoffs:
+        free = flight_polygon.difference(sensitive_polygon)
+        sites += [tuple(p) for p in random_points_in_polygon(free, n_random_takeoffs, seed=rng).tolist()]
+    choice = rng.integers(0, len(sites), len(rhinos))
+    return [(tuple(rhino), sites[k]) for rhino, k in zip(rhinos.tolist(), choice.tolist())]
+
+
+def init_worker(flight_polygon, sensitive_polygon, takeoff, planner_mode, resolution):
+    global _planner
+    _planner = build_planner(flight_polygon, sensitive_polygon, takeoff, planner_mode, resolution)
+
+
+def run_scenario(job):
+    """Plans one scenario (index, rhino, takeoff) with the worker's planner; returns its CSV row as a dict."""
+    index, rhino, takeoff = job
+    t0 = time.perf_counter()
+    path = _planner.plan_path_from_x_to_takeoff(rhino, takeoff)
+    elapsed = time.perf_counter() - t0
+    return {
+        "scenario": index,
+        "rhino_lat": rhino[0], "rhino_lon": rhino[1],
+        "takeoff_lat": takeoff[0], "takeoff_lon": takeoff[1],
+        "success": path is not None,
+        "planning_time_ms": 1e3 * elapsed,
+        "path_length_m": float(leg_lengths_m(path).sum()) if path else None,
+        "waypoints": len(path) if path else 0,
+    }
+
+
+def run_monte_carlo(flight_polygon, sensitive_polygon, takeoff, scenarios, planner_mode="grid", resolution=0.0001,
+                    processes=None):
+    """
+    Plans every scenario of `sample_scenarios` in a pool of `processes` workers (all CPUs by
+    default; 1 runs inline), each with its own planner built for `takeoff`.
+    Returns the rows in scenario order.
+    """
+    jobs = [(k, rhino, site) for k, (rhino, site) in enumerate(scenarios)]
+    init_args = (flight_polygon, sensitive_polygon, tuple(takeoff), planner_mode, resolution)
+    processes = min(processes or os.cpu_count() or 1, max(len(jobs), 1))
+    if processes == 1:
+        init_worker(*init_args)
+        return [run_scenario(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=processes, initializer=init_worker, initargs=init_args) as pool:
+        return list(pool.map(run_scenario, jobs, chunksize=max(1, len(jobs) // (8 * processes))))
+
+
+def distribution(values):
+    if len(values) == 0:
+        return None
+    values = np.asarray(values, dtype=np.float64)
+    stats = {f"p{p}": float(v) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))}
+    stats.update(mean=float(values.mean()), max=float(values.max()))
+    return stats
+
+
+def summarize(rows):
+    """Failure rate and the planning time (ms) and path length (m) distributions of a run."""
+    succeeded = [row for row in rows if row["success"]]
+    return {
+        "scenarios": len(rows),
+        "failures": len(rows) - len(succeeded),
+        "failure_rate": (len(rows) - len(succeeded)) / len(rows) if rows else 0.0,
+        "planning_time_ms": distribution([row["planning_time_ms"] for row in rows]),
+        "path_length_m": distribution([row["path_length_m"] for row in succeeded]),
+    }
+
+
+def compare_to_baseline(summary, baseline, tolerance):
+    """
+    Returns a message for every statistic of `summary` worse than the `baseline` summary: a
+    planning time or path length percentile more than `tolerance` (a fraction) above it, or a
+    failure rate more than one scenario in a hundred above it.
+    """
+    regressions = []
+    for metric in ("planning_time_ms", "path_length_m"):
+        for key in (f"p{p}" for p in PERCENTILES):
+            old = (baseline.get(metric) or {}).get(key)
+            new = (summary.get(metric) or {}).get(key)
+            if old is not None and new is not None and new > old * (1.0 + tolerance):
+                regressions.append(f"{metric} {key}: {new:.2f} vs {old:.2f} in the baseline")
+    old_failure_rate = baseline.get("failure_rate", 0.0)
+    if summary["failure_rate"] > old_failure_rate + 0.01:
+        regressions.append(f"failure_rate: {summary['failure_rate']:.3f} vs {old_failure_rate:.3f} in the baseline")
+    return regressions
+
+
+def write_csv(rows, path):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--kml', default='AENGM0074 2025 geolocations_new.kml')
+    parser.add_argument('--scenarios', type=int, default=1000)
+    parser.add_argument('--random-takeoffs', type=int, default=0,
+                        help="random take-off sites added to the one in the KML")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--planner', choices=['grid', 'quadtree', 'visibility'], default='grid')
+    parser.add_argument('--resolution', type=float, default=0.0001)
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--json', default='monte_carlo_summary.json')
+    parser.add_argument('--csv', default='monte_carlo_runs.csv')
+    parser.add_argument('--baseline', default=None, help="summary JSON of an earlier run to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="allowed relative increase of each percentile over the baseline")
+    args = parser.parse_args()
+
+    takeoff, _, (flight_polygon, sensitive_polygon, survey_polygon) = load_mission_kml(args.kml)
+    scenarios = sample_scenarios(flight_polygon, sensitive_polygon, survey_polygon, takeoff, args.scenarios,
+                                 args.random_takeoffs, args.seed)
+    t0 = time.perf_counter()
+    rows = run_monte_carlo(flight_polygon, sensitive_polygon, takeoff, scenarios, args.planner, args.resolution,
+                           args.processes)
+    wall_time = time.perf_counter() - t0
+
+    summary = summarize(rows)
+    summary.update(planner=args.planner, resolution=args.resolution, seed=args.seed,
+                   random_takeoffs=args.random_takeoffs, wall_time_s=wall_time)
+    with open(args.json, "w") as f:
+        json.dump(summary, f, indent=2)
+    write_csv(rows, args.csv)
+
+    print(f"{summary['scenarios']} scenarios in {wall_time:.1f} s, {summary['failures']} failed "
+          f"({100 * summary['failure_rate']:.1f}%)")
+    for metric in ("planning_time_ms", "path_length_m"):
+        stats = summary[metric]
+        if stats is not None:
+            print(f"{metric:>17}: " + "  ".join(f"{key} {value:.2f}" for key, value in stats.items()))
+    print(f"Summary saved to '{args.json}', runs to '{args.csv}'.")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_to_baseline(summary, json.load(f), args.tolerance)
+        for message in regressions:
+            print("REGRESSION:", message)
+        if regressions:
+            sys.exit(1)
+        print("No regressions against the baseline.")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,41 @@
-import heapq, math, numpy as np
-from shapely.geometry import Point, LineString
-from shapely.affinity import rotate, translate
+import heapq, math, os, numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from shapely.geometry import LineString
+from shapely.affinity import rotate, translate, scale
+from shapely.prepared import prep
+
+try:
+    # Shapely >= 2.0: vectorized predicates over arrays of geometries
+    from shapely import linestrings, covers, intersects, prepare
+except ImportError:
+    linestrings = None
+
+try:
+    from .geometry_utils import rasterize_polygon, polygon_edges, METERS_PER_DEGREE
+    from .return_home_field import ReturnHomeField
+except ImportError:
+    from geometry_utils import rasterize_polygon, polygon_edges, METERS_PER_DEGREE
+    from return_home_field import ReturnHomeField
+
+SQRT2 = math.sqrt(2.0)
+# 8-connected moves as (di, dj, cost)
+MOVES = [(-1, 0, 1.0), (1, 0, 1.0), (0, -1, 1.0), (0, 1, 1.0),
+         (-1, -1, SQRT2), (-1, 1, SQRT2), (1, -1, SQRT2), (1, 1, SQRT2)]
 
 class PathPlanner:
-    def __init__(self, flight_polygon, sensitive_polygon, resolution=0.0001, margin=0.001):
+    def __init__(self, flight_polygon, sensitive_polygon, resolution=0.0001, margin=0.001, grid_cache=None):
         self.flight_polygon = flight_polygon
         self.sensitive_polygon = sensitive_polygon
         self.resolution = resolution
         self.margin = margin
+        self.grid_cache = grid_cache
+        self.return_home_field = None
+        # Prepared geometries, built once and reused by every line-of-sight check
+        self.prepared_flight = prep(flight_polygon)
+        self.prepared_sensitive = prep(sensitive_polygon)
+        if linestrings is not None:
+            prepare(flight_polygon)
+            prepare(sensitive_polygon)
 
     def latlon_to_grid(self, lat, lon, min_lat, min_lon):
         i = int((lat - min_lat) / self.resolution)
@@ -19,49 +47,215 @@ class PathPlanner:
         lon = min_lon + j * self.resolution
         return (lat, lon)
 
+    def grid_bounds(self, *latlons):
+        """
+        Returns (min_lat, max_lat, min_lon, max_lon) of the planning grid: the extent of the
+        flight and sensitive polygons plus any extra (lat, lon) points, padded by `margin`.
+        """
+        all_lats = [lat for lat, _ in latlons]
+        all_lons = [lon for _, lon in latlons]
+        for polygon in (self.flight_polygon, self.sensitive_polygon):
+            lon_min, lat_min, lon_max, lat_max = polygon.bounds
+            all_lats += [lat_min, lat_max]
+            all_lons += [lon_min, lon_max]
+        return (min(all_lats) - self.margin, max(all_lats) + self.margin,
+                min(all_lons) - self.margin, max(all_lons) + self.margin)
+
+    def build_grid(self, min_lat, max_lat, min_lon, max_lon):
+        """
+        Rasterizes the obstacle grid over the given bounds: a cell is 1 (blocked) when it lies
+        outside the flight region or inside the sensitive area, 0 (free) otherwise.
+        When a `grid_cache` is set, a previously built grid for the same geometry and
+        bounds is loaded from disk instead. The grid is read-only either way; copy it to edit it.
+        """
+        bounds = (min_lat, max_lat, min_lon, max_lon)
+        if self.grid_cache is not None:
+            grid = self.grid_cache.load(self.flight_polygon, self.sensitive_polygon,
+                                        bounds, self.margin, self.resolution)
+            if grid is not None:
+                return grid
+        lat_steps = int((max_lat - min_lat) / self.resolution) + 1
+        lon_steps = int((max_lon - min_lon) / self.resolution) + 1
+        inside_flight = rasterize_polygon(self.flight_polygon, min_lat, min_lon,
+                                          lat_steps, lon_steps, self.resolution)
+        inside_sensitive = rasterize_polygon(self.sensitive_polygon, min_lat, min_lon,
+                                             lat_steps, lon_steps, self.resolution)
+        grid = (~inside_flight | inside_sensitive).astype(np.uint8)
+        # Read-only, like the memory-mapped grid of a cache hit
+        grid.setflags(write=False)
+        if self.grid_cache is not None:
+            self.grid_cache.store(grid, self.flight_polygon, self.sensitive_polygon,
+                                  bounds, self.margin, self.resolution)
+        return grid
+
     def heuristic(self, a, b):
-        return math.sqrt((a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2)
+        """
+        Octile distance between grid cells `a` and `b`: the exact cost of an obstacle-free
+        8-connected path with unit straight moves and sqrt(2) diagonal moves.
+        """
+        di = abs(a[0] - b[0])
+        dj = abs(a[1] - b[1])
+        return max(di, dj) + (SQRT2 - 1.0) * min(di, dj)
 
     def a_star_search(self, grid, start, goal):
+        """
+        8-connected A* over `grid` (non-zero cells are blocked) from cell `start` to `goal`.
+        Returns the list of (i, j) cells from start to goal, or None if the goal is unreachable.
+
+        Cells are addressed by their flat index; g-scores, parent pointers and the closed set
+        live in flat NumPy arrays. Stale heap entries are skipped on pop (lazy deletion)
+        instead of being searched for in the open set.
+        """
         rows, cols = grid.shape
-        open_set = []
-        heapq.heappush(open_set, (0, start))
-        came_from = {}
-        g_score = {start: 0}
-        f_score = {start: self.heuristic(start, goal)}
-        directions = [(-1, 0), (1, 0), (0, -1), (0, 1),
-                      (-1, -1), (-1, 1), (1, -1), (1, 1)]
+        if not (0 <= start[0] < rows and 0 <= start[1] < cols
+                and 0 <= goal[0] < rows and 0 <= goal[1] < cols):
+            return None
+        n_cells = rows * cols
+        blocked = np.asarray(grid).ravel() != 0
+        g_score = np.full(n_cells, np.inf)
+        came_from = np.full(n_cells, -1, dtype=np.int32 if n_cells < 2 ** 31 else np.int64)
+        closed = np.zeros(n_cells, dtype=bool)
+
+        start_idx = start[0] * cols + start[1]
+        goal_idx = goal[0] * cols + goal[1]
+        goal_i, goal_j = goal
+        g_score[start_idx] = 0.0
+        # Heap entries are (f, h, flat index); ties on f prefer the cell closer to the goal.
+        start_h = self.heuristic(start, goal)
+        open_set = [(start_h, start_h, start_idx)]
         while open_set:
-            _, current = heapq.heappop(open_set)
-            if current == goal:
+            _, _, current = heapq.heappop(open_set)
+            if closed[current]:
+                continue
+            if current == goal_idx:
                 path = []
-                while current in came_from:
-                    path.append(current)
+                while current != -1:
+                    path.append(divmod(int(current), cols))
                     current = came_from[current]
-                path.append(start)
                 return path[::-1]
-            for dx, dy in directions:
-                neighbor = (current[0] + dx, current[1] + dy)
-                if 0 <= neighbor[0] < rows and 0 <= neighbor[1] < cols:
-                    if grid[neighbor] == 0:
-                        tentative_g = g_score[current] + 1
-                        if neighbor not in g_score or tentative_g < g_score[neighbor]:
-                            came_from[neighbor] = current
-                            g_score[neighbor] = tentative_g
-                            f_score[neighbor] = tentative_g + self.heuristic(neighbor, goal)
-                            if neighbor not in [item[1] for item in open_set]:
-                                heapq.heappush(open_set, (f_score[neighbor], neighbor))
+            closed[current] = True
+            current_g = g_score[current]
+            ci, cj = divmod(int(current), cols)
+            for di, dj, step in MOVES:
+                ni = ci + di
+                nj = cj + dj
+                if not (0 <= ni < rows and 0 <= nj < cols):
+                    continue
+                neighbor = ni * cols + nj
+                if blocked[neighbor] or closed[neighbor]:
+                    continue
+                tentative_g = current_g + step
+                if tentative_g < g_score[neighbor]:
+                    g_score[neighbor] = tentative_g
+                    came_from[neighbor] = current
+                    # Octile heuristic, inlined from `heuristic` to keep the inner loop tight.
+                    hi = abs(ni - goal_i)
+                    hj = abs(nj - goal_j)
+                    h = (hi + (SQRT2 - 1.0) * hj) if hi >= hj else (hj + (SQRT2 - 1.0) * hi)
+                    heapq.heappush(open_set, (tentative_g + h, h, neighbor))
         return None
 
+    def distance_field(self, grid, goal):
+        """
+        Reverse Dijkstra from cell `goal` over the whole free part of `grid`, with the same
+        8-connected octile costs as `a_star_search`.
+        Returns (cost_to_go, next_cell): a float array of the grid's shape holding each cell's
+        path cost to the goal (inf where unreachable), and a flat int array holding the flat
+        index of the next cell towards the goal (-1 at the goal and at unreachable cells).
+        """
+        rows, cols = grid.shape
+        n_cells = rows * cols
+        blocked = np.asarray(grid).ravel() != 0
+        cost_to_go = np.full(n_cells, np.inf)
+        next_cell = np.full(n_cells, -1, dtype=np.int32 if n_cells < 2 ** 31 else np.int64)
+        closed = np.zeros(n_cells, dtype=bool)
+        if not (0 <= goal[0] < rows and 0 <= goal[1] < cols):
+            return cost_to_go.reshape(rows, cols), next_cell
+
+        goal_idx = goal[0] * cols + goal[1]
+        cost_to_go[goal_idx] = 0.0
+        open_set = [(0.0, goal_idx)]
+        while open_set:
+            current_cost, current = heapq.heappop(open_set)
+            if closed[current]:
+                continue
+            closed[current] = True
+            ci, cj = divmod(int(current), cols)
+            for di, dj, step in MOVES:
+                ni = ci + di
+                nj = cj + dj
+                if not (0 <= ni < rows and 0 <= nj < cols):
+                    continue
+                neighbor = ni * cols + nj
+                if blocked[neighbor] or closed[neighbor]:
+                    continue
+                tentative_cost = current_cost + step
+                if tentative_cost < cost_to_go[neighbor]:
+                    cost_to_go[neighbor] = tentative_cost
+                    next_cell[neighbor] = current
+                    heapq.heappush(open_set, (tentative_cost, neighbor))
+        return cost_to_go.reshape(rows, cols), next_cell
+
+    def prepare_return_home(self, takeoff):
+        """
+        Precomputes the return-home field to the (lat, lon) take-off location, after which
+        `plan_path_from_x_to_takeoff` to that location follows the field instead of searching.
+        """
+        self.return_home_field = ReturnHomeField(self, takeoff)
+        return self.return_home_field
+
     def can_travel_straight(self, start_latlon, end_latlon):
         start_lat, start_lon = start_latlon
         end_lat, end_lon = end_latlon
         line = LineString([(start_lon, start_lat), (end_lon, end_lat)])
-        inside_flight = self.flight_polygon.covers(line)
-        intersects_sensitive = line.intersects(self.sensitive_polygon)
+        inside_flight = self.prepared_flight.covers(line)
+        intersects_sensitive = self.prepared_sensitive.intersects(line)
         return inside_flight and not intersects_sensitive
 
+    def segments_valid(self, start_latlon, end_latlons):
+        """
+        Batched `can_travel_straight` from one (lat, lon) point to many.
+        Returns a boolean array, True where the segment stays inside the flight region and
+        clear of the sensitive area. On Shapely >= 2.0 all segments are tested in one
+        vectorized call against the prepared polygons.
+        """
+        if len(end_latlons) == 0:
+            return np.zeros(0, dtype=bool)
+        if linestrings is None:
+            return np.array([self.can_travel_straight(start_latlon, end) for end in end_latlons])
+        ends = np.asarray(end_latlons, dtype=np.float64).reshape(-1, 2)[:, ::-1]
+        start = np.array([start_latlon[1], start_latlon[0]], dtype=np.float64)
+        lines = linestrings(np.stack((np.broadcast_to(start, ends.shape), ends), axis=1))
+        return covers(self.flight_polygon, lines) & ~intersects(self.sensitive_polygon, lines)
+
+    def furthest_visible(self, path, i):
+        """
+        Returns the index of the point of `path` just before the first point after i+1 that is
+        out of line of sight from `path[i]` (the last point if there is none), the same point
+        as scanning forward one point at a time.
+
+        Points are checked in windows of 2, 4, 8, ... points, each with one batched
+        `segments_valid` call, until a window contains a blocked point. A jump of k points
+        therefore takes O(log k) calls and checks fewer than 2k + 2 segments.
+        """
+        n = len(path)
+        if i >= n - 2:
+            return n - 1
+        # Consecutive grid points are always mutually visible.
+        start, size = i + 2, 2
+        while start < n:
+            stop = min(start + size, n)
+            blocked = np.flatnonzero(~self.segments_valid(path[i], path[start:stop]))
+            if len(blocked):
+                return start + int(blocked[0]) - 1
+            start, size = stop, size * 2
+        return n - 1
+
     def smooth_path(self, raw_path):
+        """
+        String-pulling: from each kept point, jump to the furthest point still in line of sight
+        (see `furthest_visible`) and keep that one next.
+        """
         n = len(raw_path)
         if n < 2:
             return raw_path
@@ -71,15 +265,7 @@ class PathPlanner:
             smoothed.append(raw_path[i])
             if i == n - 1:
                 break
-            best_j = i + 1
-            j = i + 2
-            while j < n:
-                if self.can_travel_straight(raw_path[i], raw_path[j]):
-                    best_j = j
-                    j += 1
-                else:
-                    break
-            i = best_j
+            i = self.furthest_visible(raw_path, i)
         return smoothed
 
     def generate_rotated_zigzag(self, survey_polygon, spacing=0.0002, inner_margin=0.0):
@@ -127,36 +313,201 @@ class PathPlanner:
             col_index += 1
         return coverage_path
 
-    def plan_path_from_x_to_takeoff(self, start, takeoff):
-        # Build bounding box for grid
-        all_lats = [start[0], takeoff[0]]
-        all_lons = [start[1], takeoff[1]]
-        for lon, lat in self.flight_polygon.exterior.coords:
-            all_lats.append(lat)
-            all_lons.append(lon)
-        for lon, lat in self.sensitive_polygon.exterior.coords:
-            all_lats.append(lat)
-            all_lons.append(lon)
-        min_lat = min(all_lats) - self.margin
-        max_lat = max(all_lats) + self.margin
-        min_lon = min(all_lons) - self.margin
-        max_lon = max(all_lons) + self.margin
-        lat_steps = int((max_lat - min_lat) / self.resolution) + 1
-        lon_steps = int((max_lon - min_lon) / self.resolution) + 1
-        grid = np.zeros((lat_steps, lon_steps), dtype=int)
-        for i in range(lat_steps):
-            for j in range(lon_steps):
-                lat_cell = min_lat + i * self.resolution
-                lon_cell = min_lon + j * self.resolution
-                pt = Point(lon_cell, lat_cell)
-                if not self.flight_polygon.contains(pt):
-                    grid[i, j] = 1
-                elif self.sensitive_polygon.contains(pt):
-                    grid[i, j] = 1
+    @staticmethod
+    def sweep_angle(survey_polygon):
+        """
+        Default sweep direction in degrees: the first edge of the minimum rotated rectangle.
+        Returns None for degenerate polygons.
+        """
+        mrr = survey_polygon.minimum_rotated_rectangle
+        if mrr.is_empty or mrr.geom_type != "Polygon":
+            return None
+        corners = list(mrr.exterior.coords)
+        dx = corners[1][0] - corners[0][0]
+        dy = corners[1][1] - corners[0][1]
+        if math.hypot(dx, dy) < 1e-9:
+            return None
+        return math.degrees(math.atan2(dy, dx))
+
+    @staticmethod
+    def generate_coverage_path(survey_polygon, spacing=0.0002, inner_margin=0.0, angle_deg=None):
+        """
+        Boustrophedon coverage of `survey_polygon` itself (not its bounding rectangle).
+
+        Parallel sweep lines `spacing` apart, perpendicular to `angle_deg` (defaults to
+        `sweep_angle`), are generated in the polygon's rotated frame with one NumPy affine
+        transform and clipped against every polygon edge at once. On concave polygons a line
+        may yield several segments; they are flown in order along the line, and consecutive
+        lines alternate direction. Returns a list of (lat, lon) waypoints, two per segment.
+
+        Sweeping happens in a local equirectangular frame (longitudes scaled by the cosine of
+        the centroid latitude), so `spacing` is in degrees of latitude whatever the direction
+        and `angle_deg` is measured counter-clockwise from east.
+
+        The legs are not checked against the flight region or the sensitive area: on a concave
+        survey area the joins between segments can cross them. `route_coverage` makes the
+        path flyable.
+        """
+        if survey_polygon.is_empty:
+            return []
+        area = survey_polygon.buffer(-inner_margin) if inner_margin > 0 else survey_polygon
+        if area.is_empty:
+            return []
+        origin = np.asarray(area.centroid.coords[0])
+        lon_scale = np.array([math.cos(math.radians(origin[1])), 1.0])
+        if angle_deg is None:
+            angle_deg = PathPlanner.sweep_angle(scale(area, xfact=lon_scale[0], yfact=1.0, origin=tuple(origin)))
+            if angle_deg is None:
+                return []
+
+        theta = math.radians(angle_deg)
+        to_local = np.array([[math.cos(theta), math.sin(theta)],
+                             [-math.sin(theta), math.cos(theta)]])
+        edges = polygon_edges(area)
+        local_a = ((edges[:, :2] - origin) * lon_scale) @ to_local.T
+        local_b = ((edges[:, 2:] - origin) * lon_scale) @ to_local.T
+
+        # Evenly spaced lines, centred so the leftover margin is split between both sides.
+        min_x = min(local_a[:, 0].min(), local_b[:, 0].min())
+        max_x = max(local_a[:, 0].max(), local_b[:, 0].max())
+        n_lines = max(1, int(math.floor((max_x - min_x) / spacing)) + 1)
+        first_x = min_x + 0.5 * ((max_x - min_x) - spacing * (n_lines - 1))
+        line_x = (first_x + spacing * np.arange(n_lines))[:, np.newaxis]
+
+        x0, y0 = local_a[:, 0][np.newaxis, :], local_a[:, 1][np.newaxis, :]
+        x1, y1 = local_b[:, 0][np.newaxis, :], local_b[:, 1][np.newaxis, :]
+        crosses = (x0 <= line_x) != (x1 <= line_x)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            y_cross = y0 + (line_x - x0) * (y1 - y0) / (x1 - x0)
+        y_cross = np.where(crosses, y_cross, np.nan)
+
+        # Drop lines that miss the polygon, then flip every other remaining line. Sorting on
+        # -y for flipped lines keeps (enter, leave) crossings paired and NaNs at the end.
+        y_cross = y_cross[crosses.any(axis=1)]
+        line_x = line_x[crosses.any(axis=1)]
+        if len(y_cross) == 0:
+            return []
+        flip = np.where(np.arange(len(y_cross)) % 2 == 1, -1.0, 1.0)[:, np.newaxis]
+        order = np.argsort(np.where(np.isnan(y_cross), np.inf, flip * y_cross), axis=1)
+        y_sorted = np.take_along_axis(y_cross, order, axis=1)
+
+        valid = ~np.isnan(y_sorted)
+        local_points = np.column_stack((np.broadcast_to(line_x, y_sorted.shape)[valid], y_sorted[valid]))
+        global_points = (local_points @ to_local) / lon_scale + origin
+        return [(float(lat), float(lon)) for lon, lat in global_points]
+
+    def route_coverage(self, path):
+        """
+        Makes a coverage path flyable: every leg (a clipped sweep segment, or the join to the
+        next segment or line) that leaves the flight region or crosses the sensitive area is
+        replaced by a `plan_path` detour. Grid detours only check cell centres, so every leg of a
+        detour is checked again. Returns the new path, or None if a leg cannot be routed.
+        """
+        if len(path) < 2:
+            return list(path)
+        routed = [path[0]]
+        for a, b in zip(path[:-1], path[1:]):
+            if not self.segments_valid(a, [b])[0]:
+                detour = self.plan_path(a, b)
+                if detour is None:
+                    return None
+                # The detour starts and ends at the grid points nearest to a and b
+                detour = [p for p in detour if p != a and p != b] + [b]
+                points = [a] + detour
+                if not all(self.segments_valid(p, [q])[0] for p, q in zip(points[:-1], points[1:])):
+                    return None
+                routed.extend(detour)
+            else:
+                routed.append(b)
+        return routed
+
+    def generate_optimal_coverage(self, survey_polygon, spacing=0.0002, inner_margin=0.0, angle_step_deg=1.0,
+                                  cruise_speed=5.0, turn_time=3.0, processes=None):
+        """
+        Flyable coverage path (as `generate_coverage_path`, then `route_coverage`) for the
+        sweep angle with the shortest estimated flight time.
+
+        Candidates are every `angle_step_deg` over [0, 180) plus the direction of each survey
+        polygon edge. Each is scored by path length in metres, number of turns and estimated
+        flight time (length / `cruise_speed` + turns * `turn_time`), with the candidates split
+        across a pool of `processes` workers (all CPUs by default; 1 runs inline). Candidates
+        are then routed in order of that estimate, which detours can only lengthen, until no
+        remaining one can beat the best routed path; angles that cannot be routed are skipped.
+        Returns (coverage_path, score), where score is a dict with the winning angle and metrics.
+        """
+        if survey_polygon.is_empty:
+            return [], None
+        exterior = np.asarray(survey_polygon.exterior.coords)
+        # Edge directions in the same equirectangular frame `generate_coverage_path` sweeps in
+        lon_scale = math.cos(math.radians(survey_polygon.centroid.y))
+        edge_angles = np.degrees(np.arctan2(np.diff(exterior[:, 1]), np.diff(exterior[:, 0]) * lon_scale))
+        angles = np.unique(np.round(np.concatenate((np.arange(0.0, 180.0, angle_step_deg), edge_angles % 180.0)), 6))
+
+        processes = processes or os.cpu_count() or 1
+        chunks = [chunk for chunk in np.array_split(angles, processes) if len(chunk)]
+        jobs = [(survey_polygon, spacing, inner_margin, chunk, cruise_speed, turn_time) for chunk in chunks]
+        if len(jobs) == 1:
+            scores = score_sweep_angles(*jobs[0])
+        else:
+            with ProcessPoolExecutor(max_workers=len(jobs)) as pool:
+                scores = [score for chunk_scores in pool.map(score_sweep_angles, *zip(*jobs))
+                          for score in chunk_scores]
+        best, best_path = None, []
+        for score in sorted(scores, key=lambda score: score["flight_time"]):
+            if best is not None and score["flight_time"] >= best["flight_time"]:
+                break
+            path = self.route_coverage(
+                self.generate_coverage_path(survey_polygon, spacing, inner_margin, score["angle"]))
+            if path is None:
+                continue
+            routed = dict(score, **coverage_metrics(path, cruise_speed, turn_time))
+            if best is None or routed["flight_time"] < best["flight_time"]:
+                best, best_path = routed, path
+        return best_path, best
+
+    def plan_path(self, start, goal):
+        """
+        Plans a smoothed path between two (lat, lon) points on the obstacle grid.
+        Returns a list of (lat, lon) waypoints, or None if no path exists.
+        """
+        min_lat, max_lat, min_lon, max_lon = self.grid_bounds(start, goal)
+        grid = self.build_grid(min_lat, max_lat, min_lon, max_lon)
         start_idx = self.latlon_to_grid(start[0], start[1], min_lat, min_lon)
-        goal_idx = self.latlon_to_grid(takeoff[0], takeoff[1], min_lat, min_lon)
+        goal_idx = self.latlon_to_grid(goal[0], goal[1], min_lat, min_lon)
         path_indices = self.a_star_search(grid, start_idx, goal_idx)
         if path_indices is None:
             return None
         raw_path = [self.grid_to_latlon(i, j, min_lat, min_lon) for (i, j) in path_indices]
         return self.smooth_path(raw_path)
+
+    def plan_path_from_x_to_takeoff(self, start, takeoff):
+        field = self.return_home_field
+        if field is not None and field.takeoff == tuple(takeoff):
+            raw_path = field.path_from(start)
+            return None if raw_path is None else self.smooth_path(raw_path)
+        return self.plan_path(start, takeoff)
+
+
+def score_sweep_angles(survey_polygon, spacing, inner_margin, angles, cruise_speed, turn_time):
+    """
+    Scores the coverage path of `survey_polygon` for each sweep angle in `angles`.
+    Module-level so that it can run in a process pool. Returns a list of dicts with the angle,
+    length (metres), turns and flight_time (seconds); angles without a path are skipped.
+    """
+    scores = []
+    for angle in angles:
+        path = PathPlanner.generate_coverage_path(survey_polygon, spacing, inner_margin, float(angle))
+        if len(path) < 2:
+            continue
+        scores.append(dict(angle=float(angle), **coverage_metrics(path, cruise_speed, turn_time)))
+    return scores
+
+
+def coverage_metrics(path, cruise_speed, turn_time):
+    """Length (metres), turns and estimated flight_time (seconds) of a list of (lat, lon) waypoints."""
+    points = np.asarray(path)
+    d_lat = np.diff(points[:, 0]) * METERS_PER_DEGREE
+    d_lon = np.diff(points[:, 1]) * METERS_PER_DEGREE * np.cos(np.radians(points[:-1, 0]))
+    length = float(np.hypot(d_lat, d_lon).sum())
+    turns = len(path) - 2
+    return {"length": length, "turns": turns, "flight_time": length / cruise_speed + turns * turn_time}
@@ -0,0 +1,362 @@
+# planning_service.py
+"""
+Long-running local planning service: loads the mission geometry once, keeps the planner, its
+prepared geometries, obstacle grids, return-home field and computed coverage paths warm, and
+answers planning queries as JSON over localhost HTTP or a Unix socket.
+
+Routes:
+    GET  /health       status, planner mode, uptime, request count and grid cache hits
+    GET  /mission      take-off and (lat, lon) polygons of the mission
+    POST /path         {"start": [lat, lon], "goal": [lat, lon]}
+    POST /return_home  {"position": [lat, lon], "takeoff": [lat, lon] (optional)}
+    POST /coverage     {"spacing": deg, "inner_margin": deg, "angle": deg} (all optional)
+
+Usage:
+    python planning_service.py [--kml FILE] [--planner grid] [--port 8765 | --socket PATH]
+"""
+import argparse
+import http.client
+import json
+import math
+import os
+import socket
+import socketserver
+import threading
+import time
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    from .mission_compiler import build_planner, load_mission_kml
+    from .grid_cache import GridCache, MemoryGridCache
+    from .processing_scheduler import leg_lengths_m
+    from .survey_parameters import SurveyParameters
+except ImportError:
+    from mission_compiler import build_planner, load_mission_kml
+    from grid_cache import GridCache, MemoryGridCache
+    from processing_scheduler import leg_lengths_m
+    from survey_parameters import SurveyParameters
+
+DEFAULT_PORT = 8765
+
+
+class PlanningError(Exception):
+    """A request the service cannot answer; `status` is the HTTP status to reply with."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _point(payload, key, default=None):
+    value = payload.get(key, default)
+    if value is None:
+        raise PlanningError(f"Missing '{key}'")
+    try:
+        lat, lon = (float(v) for v in value)
+    except (TypeError, ValueError):
+        raise PlanningError(f"'{key}' must be [lat, lon]")
+    if not (math.isfinite(lat) and math.isfinite(lon)):
+        raise PlanningError(f"'{key}' must be finite")
+    return (lat, lon)
+
+
+def _path_reply(path, started):
+    return {
+        "path": [list(p) for p in path] if path is not None else None,
+        "length_m": float(leg_lengths_m(path).sum()) if path else None,
+        "elapsed_ms": 1e3 * (time.perf_counter() - started),
+    }
+
+
+class PlanningService:
+    """
+    Answers planning queries for the mission in `kml_file` with one warm planner (see
+    `mission_compiler.build_planner`). Obstacle grids are kept in a `MemoryGridCache` (backed
+    by the on-disk cache in `cache_dir`, if given) and coverage paths are memoized per
+    parameter set. Planning calls are serialized, so the service is safe to use from the
+    threads of the HTTP server. `handle` is transport-independent.
+    """
+
+    def __init__(self, kml_file, planner_mode="grid", resolution=0.0001, survey=None, cache_dir=None):
+        self.started = time.monotonic()
+        self.planner_mode = planner_mode
+        self.survey = survey if survey is not None else SurveyParameters(altitude=25.0)
+        self.takeoff, features, (self.flight_polygon, self.sensitive_polygon, self.survey_polygon) = \
+            load_mission_kml(kml_file)
+        self.grid_cache = MemoryGridCache(backing=GridCache(cache_dir) if cache_dir else None)
+        self.planner = build_planner(self.flight_polygon, self.sensitive_polygon, self.takeoff, planner_mode,
+                                     resolution, grid_cache=self.grid_cache)
+        self.mission = {
+            "takeoff": list(self.takeoff),
+            "flight_region": [[lat, lon] for lon, lat in self.flight_polygon.exterior.coords],
+            "sensitive_area": [[lat, lon] for lon, lat in features["Sensitive Area"]["coords"][0].tolist()],
+            "survey_area": [[lat, lon] for lon, lat in self.survey_polygon.exterior.coords],
+        }
+        self.requests = 0
+        self._coverage = {}
+        self._lock = threading.Lock()
+        self.routes = {
+            ("GET", "/health"): self.health,
+            ("GET", "/mission"): lambda payload: self.mission,
+            ("POST", "/path"): self.path,
+            ("POST", "/return_home"): self.return_home,
+            ("POST", "/coverage"): self.coverage,
+        }
+
+    def handle(self, method, route, payload=None):
+        """Runs one request; returns (HTTP status, JSON-serializable reply)."""
+        handler = self.routes.get((method, route))
+        if handler is None:
+            return 404, {"error": f"No route {method} {route}"}
+        self.requests += 1
+        try:
+            return 200, handler(payload or {})
+        except PlanningError as e:
+            return e.status, {"error": str(e)}
+        except Exception as e:
+            # A bug, not a bad request; the caller still gets a reply and the service keeps running
+            traceback.print_exc()
+            return 500, {"error": f"{type(e).__name__}: {e}"}
+
+    def _mission_point(self, payload, key, default=None):
+        """
+        The (lat, lon) `payload[key]` (see `_point`), rejected unless it lies within the flight
+        region's bounds plus the planner's margin: the planning grid spans every point it is
+        given, so a far-away point would make the service build a huge grid.
+        """
+        lat, lon = _point(payload, key, default)
+        min_lon, min_lat, max_lon, max_lat = self.flight_polygon.bounds
+        margin = self.planner.margin
+        if not (min_lat - margin <= lat <= max_lat + margin and min_lon - margin <= lon <= max_lon + margin):
+            raise PlanningError(f"'{key}' is outside the flight region")
+        return (lat, lon)
+
+    def health(self, payload):
+        return {"status": "ok", "planner_mode": self.planner_mode, "uptime_s": time.monotonic() - self.started,
+                "requests": self.requests, "grid_cache_hits": self.grid_cache.hits,
+                "grid_cache_misses": self.grid_cache.misses}
+
+    def path(self, payload):
+        start, goal = self._mission_point(payload, "start"), self._mission_point(payload, "goal")
+        started = time.perf_counter()
+        with self._lock:
+            path = self.planner.plan_path(start, goal)
+        return _path_reply(path, started)
+
+    def return_home(self, payload):
+        position = self._mission_point(payload, "position")
+        takeoff = self._mission_point(payload, "takeoff", self.takeoff)
+        started = time.perf_counter()
+        with self._lock:
+            path = self.planner.plan_path_from_x_to_takeoff(position, takeoff)
+        return _path_reply(path, started)
+
+    def coverage(self, payload):
+        try:
+            spacing = float(payload.get("spacing", self.survey.sweep_spacing_deg()))
+            inner_margin = float(payload.get("inner_margin", 0.000001))
+            angle = payload.get("angle")
+            angle = None if angle is None else float(angle)
+        except (TypeError, ValueError):
+            raise PlanningError("'spacing', 'inner_margin' and 'angle' must be numbers")
+        if not all(math.isfinite(v) for v in (spacing, inner_margin, 0.0 if angle is None else angle)):
+            raise PlanningError("'spacing', 'inner_margin' and 'angle' must be finite")
+        if spacing <= 0:
+            raise PlanningError("'spacing' must be positive")
+        key = (spacing, inner_margin, angle)
+        started = time.perf_counter()
+        with self._lock:
+            if key not in self._coverage:
+                if angle is None:
+                    path, score = self.planner.generate_optimal_coverage(
+                        self.survey_polygon, spacing, inner_margin, cruise_speed=self.survey.cruise_speed,
+                        processes=1)
+                else:
+                    path = self.planner.route_coverage(
+                        self.planner.generate_coverage_path(self.survey_polygon, spacing, inner_margin, angle))
+                    if path is None:
+                        raise PlanningError(f"No flyable coverage path at {angle} degrees", 404)
+                    score = None
+                self._coverage[key] = ([list(p) for p in path], score)
+            path, score = self._coverage[key]
+        reply = _path_reply(path, started)
+        reply["score"] = score
+        return reply
+
+
+class PlanningRequestHandler(BaseHTTPRequestHandler):
+    """HTTP front end of the `PlanningService` in `self.server.service`, with keep-alive connections."""
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        # Headers and body are separate writes; with Nagle's algorithm each reply over TCP would
+        # wait ~40 ms for the client's delayed ACK (Unix sockets have no such option)
+        self.disable_nagle_algorithm = self.request.family != socket.AF_UNIX
+        super().setup()
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _dispatch(self, method):
+        payload = None
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            try:
+                payload = json.loads(self.rfile.read(length))
+            except ValueError:
+                self._reply(400, {"error": "Body is not valid JSON"})
+                return
+            if not isinstance(payload, dict):
+                self._reply(400, {"error": "Body must be a JSON object"})
+                return
+        self._reply(*self.server.service.handle(method, self.path.split("?")[0], payload))
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        # Unix socket peers have no address; BaseHTTPRequestHandler expects a (host, port) pair
+        request, _ = super().get_request()
+        return request, ("unix", 0)
+
+
+def make_server(service, host="127.0.0.1", port=DEFAULT_PORT, socket_path=None, verbose=False):
+    """Returns an HTTP server for `service` on host:port, or on the Unix socket `socket_path` if given."""
+    if socket_path is not None:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = ThreadingUnixHTTPServer(socket_path, PlanningRequestHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), PlanningRequestHandler)
+    server.service = service
+    server.verbose = verbose
+    return server
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path, timeout=30):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class PlanningClient:
+    """
+    Client of a running planning service, over one keep-alive connection. Every query
+    returns the decoded reply; replies for impossible paths have "path": None, and
+    rejected requests raise `PlanningError`.
+    """
+
+    def __init__(self, host="127.0.0.1", port=DEFAULT_PORT, socket_path=None, timeout=30):
+        if socket_path is not None:
+            self.connection = UnixHTTPConnection(socket_path, timeout)
+        else:
+            self.connection = http.client.HTTPConnection(host, port, timeout=timeout)
+
+    def request(self, method, route, payload=None):
+        body = json.dumps(payload).encode() if payload is not None else None
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        self.connection.request(method, route, body=body, headers=headers)
+        response = self.connection.getresponse()
+        reply = json.loads(response.read())
+        if response.status != 200:
+            raise PlanningError(reply.get("error", f"HTTP {response.status}"), response.status)
+        return reply
+
+    def health(self):
+        return self.request("GET", "/health")
+
+    def mission(self):
+        return self.request("GET", "/mission")
+
+    def path(self, start, goal):
+        return self.request("POST", "/path", {"start": list(start), "goal": list(goal)})
+
+    def return_home(self, position, takeoff=None):
+        payload = {"position": list(position)}
+        if takeoff is not None:
+            payload["takeoff"] = list(takeoff)
+        return self.request("POST", "/return_home", payload)
+
+    def coverage(self, spacing=None, inner_margin=None, angle=None):
+        payload = {key: value for key, value in
+                   (("spacing", spacing), ("inner_margin", inner_margin), ("angle", angle)) if value is not None}
+        return self.request("POST", "/coverage", payload)
+
+    def close(self):
+        self.connection.close()
+
+
+class InProcessClient(PlanningClient):
+    """
+    Stand-in for `PlanningClient` that calls a `PlanningService` directly, with the same JSON
+    round trip but no server, for tests and for callers in the same process.
+    """
+
+    def __init__(self, service):
+        self.service = service
+
+    def request(self, method, route, payload=None):
+        payload = json.loads(json.dumps(payload)) if payload is not None else None
+        status, reply = self.service.handle(method, route, payload)
+        reply = json.loads(json.dumps(reply))
+        if status != 200:
+            raise PlanningError(reply.get("error", f"HTTP {status}"), status)
+        return reply
+
+    def close(self):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--kml', default='AENGM0074 2025 geolocations_new.kml')
+    parser.add_argument('--planner', choices=['grid', 'quadtree', 'visibility'], default='grid')
+    parser.add_argument('--resolution', type=float, default=0.0001)
+    parser.add_argument('--altitude', type=float, default=25.0, help="survey altitude (m), sets the sweep spacing")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--socket', default=None, help="serve on this Unix socket instead of TCP")
+    parser.add_argument('--verbose', action='store_true', help="log every request")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    cache_dir = os.path.join(os.path.dirname(os.path.abspath(args.kml)), "grid-cache")
+    service = PlanningService(args.kml, args.planner, args.resolution, SurveyParameters(altitude=args.altitude),
+                              cache_dir)
+    server = make_server(service, args.host, args.port, args.socket, args.verbose)
+    where = args.socket or f"http://{args.host}:{args.port}"
+    print(f"Planning service ({args.planner}) ready in {time.perf_counter() - t0:.1f} s on {where}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+
+
+if __name__ == '__main__':
+    main()
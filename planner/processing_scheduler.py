@@ -0,0 +1,164 @@
+import numpy as np
+
+try:
+    from .geometry_utils import METERS_PER_DEGREE
+except ImportError:
+    from geometry_utils import METERS_PER_DEGREE
+
+
+class ProcessingBudget:
+    """
+    Onboard processing limits for `schedule_processing_stops`: the `inference_rate` (frames
+    per second) the detector sustains, the largest image backlog (frames) allowed to build
+    up, the battery endurance in seconds (None for no check) and the time lost per hover stop.
+    """
+
+    def __init__(self, inference_rate, max_backlog, battery_time=None, stop_overhead=2.0):
+        if inference_rate <= 0 or max_backlog < 0:
+            raise ValueError("Inference rate must be positive and the backlog limit non-negative")
+        self.inference_rate = inference_rate
+        self.max_backlog = max_backlog
+        self.battery_time = battery_time
+        self.stop_overhead = stop_overhead
+
+    def as_dict(self):
+        return {"inference_rate": self.inference_rate, "max_backlog": self.max_backlog,
+                "battery_time": self.battery_time, "stop_overhead": self.stop_overhead}
+
+
+def leg_lengths_m(path):
+    """Lengths in metres of the legs of a list of (lat, lon) points (local equirectangular approximation)."""
+    points = np.asarray(path, dtype=np.float64).reshape(-1, 2)
+    d_lat = np.diff(points[:, 0]) * METERS_PER_DEGREE
+    d_lon = np.diff(points[:, 1]) * METERS_PER_DEGREE * np.cos(np.radians(points[:-1, 0]))
+    return np.hypot(d_lat, d_lon)
+
+
+def insert_stops(path, stops):
+    """
+    Cheapest-insertion of extra (lat, lon) `stops` into `path`: repeatedly inserts the stop
+    that lengthens the path least, between the pair of consecutive points where it costs least.
+    Returns (new_path, stop_indices) with the position of each stop in the new path.
+    """
+    path = [tuple(p) for p in path]
+    pending = [tuple(s) for s in stops]
+    inserted = []
+    while pending:
+        points = np.asarray(path, dtype=np.float64)
+        candidates = np.asarray(pending, dtype=np.float64)
+        cos_lat = np.cos(np.radians(points[:, 0]))[np.newaxis, :]
+
+        def dist(a_lat, a_lon, b_lat, b_lon):
+            return np.hypot((a_lat - b_lat) * METERS_PER_DEGREE, (a_lon - b_lon) * METERS_PER_DEGREE * cos_lat)
+
+        # (stops, path points) distances; inserting between points k and k+1 costs
+        # d(k, s) + d(s, k+1) - d(k, k+1).
+        to_points = dist(candidates[:, :1], candidates[:, 1:], points[np.newaxis, :, 0], points[np.newaxis, :, 1])
+        extra = to_points[:, :-1] + to_points[:, 1:] - leg_lengths_m(path)[np.newaxis, :]
+        s, k = (int(v) for v in np.unravel_index(np.argmin(extra), extra.shape))
+        path.insert(k + 1, pending.pop(s))
+        inserted = [idx + 1 if idx > k else idx for idx in inserted] + [k + 1]
+    return path, inserted
+
+
+class ProcessingSchedule:
+    """
+    Hover stops chosen by `schedule_processing_stops`: `path` is the coverage path (with any
+    inserted stops), `stops` the (lat, lon) of each stop, `stop_indices` their index in `path`
+    (fractional for a stop part-way along a leg) and `hover_times` how long to hover there (s).
+    """
+
+    def __init__(self, path, stops, stop_indices, hover_times, flight_time, peak_backlog, final_backlog,
+                 battery_time=None):
+        self.path = path
+        self.stops = stops
+        self.stop_indices = stop_indices
+        self.hover_times = hover_times
+        self.flight_time = flight_time
+        self.peak_backlog = peak_backlog
+        self.final_backlog = final_backlog
+        self.battery_time = battery_time
+
+    @property
+    def total_hover_time(self):
+        return float(sum(self.hover_times))
+
+    @property
+    def mission_time(self):
+        """Flight time plus hover time, in seconds."""
+        return self.flight_time + self.total_hover_time
+
+    @property
+    def within_battery(self):
+        return self.battery_time is None or self.mission_time <= self.battery_time
+
+
+def schedule_processing_stops(coverage_path, capture_interval, inference_rate, max_backlog, cruise_speed=5.0,
+                              turn_time=3.0, stop_overhead=2.0, transit_time=0.0, battery_time=None,
+                              required_stops=(), initial_backlog=0.0):
+    """
+    Chooses where to hover on `coverage_path` so the onboard image backlog never exceeds
+    `max_backlog` frames, with as little hover time as possible.
+
+    While flying the coverage a frame is captured every `capture_interval` seconds and the
+    processor clears `inference_rate` frames per second, so the backlog grows at their
+    difference; hovering pauses capture and only drains it. Processing carries on during the
+    return flight and after landing, so the backlog only has to stay within bounds, not reach
+    zero. Stops are made as late as possible, at a coverage vertex (where the vehicle slows
+    for the turn anyway) when one is before the overflow point, otherwise part-way along the
+    leg. Each stop drains the backlog just far enough to finish the survey, or empties it if
+    another stop will be needed. The total hover time is then the minimum, the backlog excess
+    over `max_backlog`, spread over as few stops as possible.
+
+    `required_stops` are extra (lat, lon) points the vehicle must pass (e.g. to relay results),
+    inserted by cheapest insertion before scheduling. `transit_time` (approach and return
+    flight) and `stop_overhead` (per hover stop) only count towards the battery check against
+    `battery_time` (seconds of endurance, None to skip).
+    Returns a `ProcessingSchedule`.
+    """
+    if inference_rate <= 0 or capture_interval <= 0:
+        raise ValueError("Inference rate and capture interval must be positive")
+    path, _ = insert_stops(coverage_path, required_stops)
+    # Every vertex but the last is a turn (the coverage scoring charges `turn_time` for each).
+    leg_times = leg_lengths_m(path) / cruise_speed
+    leg_times[:-1] += turn_time
+    growth_rate = 1.0 / capture_interval - inference_rate
+    if growth_rate > 0 and max_backlog <= 0:
+        # Every captured frame the processor cannot clear at once would exceed the limit
+        raise ValueError("The backlog limit must be positive when captures outpace inference")
+    remaining_time = np.concatenate((np.cumsum(leg_times[::-1])[::-1], [0.0]))
+
+    stops, stop_indices, hover_times = [], [], []
+    backlog = peak = float(initial_backlog)
+
+    def hover(index, position, time_left):
+        nonlocal backlog
+        # Drain so that the remaining coverage ends exactly at the limit, or empty the backlog.
+        target = max(0.0, max_backlog - growth_rate * time_left)
+        if backlog > target:
+            stops.append(position)
+            stop_indices.append(index)
+            hover_times.append((backlog - target) / inference_rate)
+            backlog = target
+
+    for k, leg_time in enumerate(leg_times):
+        if growth_rate <= 0:
+            # The processor keeps up: the backlog only shrinks.
+            backlog = max(0.0, backlog + growth_rate * leg_time)
+            continue
+        if backlog + growth_rate * leg_time > max_backlog:
+            hover(k, path[k], remaining_time[k])
+        flown = 0.0
+        # Even from empty, a leg may overflow: stop part-way along it where the limit is hit.
+        while backlog + growth_rate * (leg_time - flown) > max_backlog + 1e-9:
+            flown += (max_backlog - backlog) / growth_rate
+            backlog = max_backlog
+            peak = max(peak, backlog)
+            f = flown / leg_time
+            position = (path[k][0] + f * (path[k + 1][0] - path[k][0]), path[k][1] + f * (path[k + 1][1] - path[k][1]))
+            hover(k + float(f), position, remaining_time[k + 1] + leg_time - flown)
+        backlog += growth_rate * (leg_time - flown)
+        peak = max(peak, backlog)
+
+    flight_time = float(leg_times.sum()) + transit_time + stop_overhead * len(stops)
+    return ProcessingSchedule(path, stops, stop_indices, hover_times, flight_time, peak, backlog, battery_time)
@@ -0,0 +1,253 @@
+import heapq, math, numpy as np
+from shapely.geometry import box as shapely_box
+from shapely.prepared import prep
+
+try:
+    # Shapely >= 2.0: vectorized predicates over arrays of geometries
+    from shapely import box as boxes, covers, intersects
+except ImportError:
+    boxes = None
+
+try:
+    from .path_planner import PathPlanner
+except ImportError:
+    from path_planner import PathPlanner
+
+# Leaf states
+FREE, BLOCKED, MIXED = 0, 1, 2
+
+
+def _spread_bits(values):
+    """Spreads the low 32 bits of each value so that bit k moves to bit 2k."""
+    v = np.asarray(values).astype(np.uint64) & np.uint64(0xFFFFFFFF)
+    for shift, mask in ((16, 0x0000FFFF0000FFFF), (8, 0x00FF00FF00FF00FF), (4, 0x0F0F0F0F0F0F0F0F),
+                        (2, 0x3333333333333333), (1, 0x5555555555555555)):
+        v = (v | (v << np.uint64(shift))) & np.uint64(mask)
+    return v
+
+
+def morton_codes(i, j):
+    """Z-order (Morton) codes of the cells (i, j), interleaving the bits of i and j."""
+    return (_spread_bits(i) << np.uint64(1)) | _spread_bits(j)
+
+
+class QuadtreeOccupancy:
+    """
+    Adaptive occupancy of the square of 2**depth x 2**depth cells of size `resolution` (degrees)
+    whose lower-left corner is (min_lat, min_lon).
+
+    A square is split into four only while it is partly free and partly blocked, so the tree
+    is fine along the flight region and sensitive area boundaries and coarse everywhere else.
+    Squares still mixed at the finest level count as blocked. Each square is tested exactly
+    against the polygons, so a free leaf lies wholly inside the flight region and outside the
+    sensitive area.
+
+    Leaves are stored as flat arrays sorted by the Morton code of their lower-left cell. In
+    Z-order a leaf of size 2**level covers the contiguous code range [code, code + 4**level),
+    so the leaf holding any cell is found with a binary search.
+    """
+
+    def __init__(self, flight_polygon, sensitive_polygon, min_lat, min_lon, resolution, depth):
+        self.min_lat = min_lat
+        self.min_lon = min_lon
+        self.resolution = resolution
+        self.depth = depth
+        self.size = 1 << depth
+        self._flight = flight_polygon
+        self._sensitive = sensitive_polygon
+        if boxes is None:
+            self._prepared_flight = prep(flight_polygon)
+            self._prepared_sensitive = prep(sensitive_polygon)
+
+        i0, j0, levels, state = self._build()
+        codes = morton_codes(i0, j0)
+        order = np.argsort(codes)
+        self.codes = codes[order]
+        self.i0 = i0[order]
+        self.j0 = j0[order]
+        self.levels = levels[order]
+        self.state = state[order]
+        self._adjacency = None
+
+    def _classify(self, i0, j0, size):
+        """FREE, BLOCKED or MIXED for each square of `size` cells with lower-left cells (i0, j0)."""
+        lat0 = self.min_lat + i0 * self.resolution
+        lon0 = self.min_lon + j0 * self.resolution
+        extent = size * self.resolution
+        if boxes is not None:
+            squares = boxes(lon0, lat0, lon0 + extent, lat0 + extent)
+            in_flight = covers(self._flight, squares)
+            touches_flight = in_flight | intersects(self._flight, squares)
+            touches_sensitive = intersects(self._sensitive, squares)
+            in_sensitive = touches_sensitive & covers(self._sensitive, squares)
+        else:
+            squares = [shapely_box(x, y, x + extent, y + extent) for x, y in zip(lon0, lat0)]
+            in_flight = np.array([self._prepared_flight.covers(s) for s in squares], dtype=bool)
+            touches_flight = np.array([self._prepared_flight.intersects(s) for s in squares], dtype=bool)
+            touches_sensitive = np.array([self._prepared_sensitive.intersects(s) for s in squares], dtype=bool)
+            in_sensitive = np.array([self._prepared_sensitive.covers(s) for s in squares], dtype=bool)
+        state = np.full(len(i0), MIXED, dtype=np.uint8)
+        state[in_flight & ~touches_sensitive] = FREE
+        state[~touches_flight | in_sensitive] = BLOCKED
+        return state
+
+    def _build(self):
+        """Splits squares level by level, classifying each level in one vectorized pass."""
+        i0 = np.zeros(1, dtype=np.uint32)
+        j0 = np.zeros(1, dtype=np.uint32)
+        leaves = []
+        for level in range(self.depth, -1, -1):
+            state = self._classify(i0, j0, 1 << level)
+            if level == 0:
+                state[state == MIXED] = BLOCKED
+            done = state != MIXED
+            leaves.append((i0[done], j0[done], np.full(done.sum(), level, dtype=np.uint8), state[done]))
+            if done.all():
+                break
+            half = np.uint32(1 << (level - 1))
+            mi, mj = i0[~done], j0[~done]
+            i0 = np.concatenate((mi, mi + half, mi, mi + half))
+            j0 = np.concatenate((mj, mj, mj + half, mj + half))
+        return tuple(np.concatenate(parts) for parts in zip(*leaves))
+
+    @property
+    def nbytes(self):
+        """Memory held by the leaf arrays, in bytes."""
+        return sum(a.nbytes for a in (self.codes, self.i0, self.j0, self.levels, self.state))
+
+    def __len__(self):
+        return len(self.codes)
+
+    def locate(self, i, j):
+        """Indices of the leaves holding the cells (i, j); -1 for cells outside the tree."""
+        i = np.asarray(i, dtype=np.int64)
+        j = np.asarray(j, dtype=np.int64)
+        inside = (i >= 0) & (i < self.size) & (j >= 0) & (j < self.size)
+        leaf = np.searchsorted(self.codes, morton_codes(np.where(inside, i, 0), np.where(inside, j, 0)),
+                               side='right') - 1
+        return np.where(inside, leaf, -1)
+
+    def centers(self, leaves):
+        """(i, j) centres of the given leaves, in (fractional) cell units."""
+        half = (1 << self.levels[leaves].astype(np.int64)) / 2.0
+        return self.i0[leaves] + half, self.j0[leaves] + half
+
+    def adjacency(self):
+        """
+        Free-to-free leaf adjacency as CSR arrays (indptr, indices). Two free leaves are adjacent
+        when they share part of an edge, which is found by locating the cells just outside each
+        side of every free leaf.
+        """
+        if self._adjacency is not None:
+            return self._adjacency
+        n = len(self)
+        free = np.flatnonzero(self.state == FREE)
+        sizes = 1 << self.levels[free].astype(np.int64)
+        counts = 4 * sizes
+        owner = np.repeat(free, counts)
+        size = np.repeat(sizes, counts)
+        offset = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        side, k = np.divmod(offset, size)
+        i0 = self.i0[owner].astype(np.int64)
+        j0 = self.j0[owner].astype(np.int64)
+        # Sides: 0 = below j0, 1 = beyond j0 + size, 2 = below i0, 3 = beyond i0 + size
+        ni = np.where(side < 2, i0 + k, np.where(side == 2, i0 - 1, i0 + size))
+        nj = np.where(side >= 2, j0 + k, np.where(side == 0, j0 - 1, j0 + size))
+        neighbor = self.locate(ni, nj)
+        keep = neighbor >= 0
+        keep[keep] = self.state[neighbor[keep]] == FREE
+        pairs = np.unique(owner[keep] * n + neighbor[keep])
+        sources, targets = np.divmod(pairs, n)
+        indptr = np.searchsorted(sources, np.arange(n + 1))
+        self._adjacency = (indptr, targets)
+        return self._adjacency
+
+    def a_star_search(self, start, goal):
+        """
+        A* between the free leaves `start` and `goal` through adjacent free leaves, with
+        centre-to-centre distances as edge costs. Returns the list of leaf indices from start
+        to goal, or None if the goal is unreachable.
+        """
+        indptr, indices = self.adjacency()
+        n = len(self)
+        ci, cj = self.centers(np.arange(n))
+        ci, cj = ci.tolist(), cj.tolist()
+        goal_i, goal_j = ci[goal], cj[goal]
+        g_score = np.full(n, np.inf)
+        came_from = np.full(n, -1, dtype=np.int64)
+        closed = np.zeros(n, dtype=bool)
+        g_score[start] = 0.0
+        start_h = math.hypot(ci[start] - goal_i, cj[start] - goal_j)
+        open_set = [(start_h, start_h, start)]
+        while open_set:
+            _, _, current = heapq.heappop(open_set)
+            if closed[current]:
+                continue
+            if current == goal:
+                path = []
+                while current != -1:
+                    path.append(int(current))
+                    current = came_from[current]
+                return path[::-1]
+            closed[current] = True
+            current_g = g_score[current]
+            for neighbor in indices[indptr[current]:indptr[current + 1]].tolist():
+                if closed[neighbor]:
+                    continue
+                tentative_g = current_g + math.hypot(ci[neighbor] - ci[current], cj[neighbor] - cj[current])
+                if tentative_g < g_score[neighbor]:
+                    g_score[neighbor] = tentative_g
+                    came_from[neighbor] = current
+                    h = math.hypot(ci[neighbor] - goal_i, cj[neighbor] - goal_j)
+                    heapq.heappush(open_set, (tentative_g + h, h, neighbor))
+        return None
+
+
+class QuadtreePlanner(PathPlanner):
+    """
+    Plans over a `QuadtreeOccupancy` of the flight region instead of a dense grid.
+
+    The tree is built once for the flight region (plus `margin`) with `resolution` as the
+    finest cell size, so memory and search effort follow the length of the obstacle boundaries
+    rather than the area flown. Paths through leaf centres are smoothed as in `PathPlanner`.
+    """
+
+    def __init__(self, flight_polygon, sensitive_polygon, resolution=0.0001, margin=0.001, **kwargs):
+        super().__init__(flight_polygon, sensitive_polygon, resolution=resolution, margin=margin, **kwargs)
+        self.min_lat, max_lat, self.min_lon, max_lon = self.grid_bounds()
+        cells = max(math.ceil((max_lat - self.min_lat) / resolution),
+                    math.ceil((max_lon - self.min_lon) / resolution), 1)
+        self.occupancy = QuadtreeOccupancy(flight_polygon, sensitive_polygon, self.min_lat, self.min_lon,
+                                           resolution, max(math.ceil(math.log2(cells)), 0))
+
+    def _leaf_at(self, latlon, search_radius=2):
+        """
+        Free leaf holding the (lat, lon) point, or the nearest free leaf within `search_radius`
+        cells of it (e.g. for a point hugging the flight region boundary). None if there is none.
+        """
+        i, j = self.latlon_to_grid(latlon[0], latlon[1], self.min_lat, self.min_lon)
+        offsets = np.arange(-search_radius, search_radius + 1)
+        di, dj = (a.ravel() for a in np.meshgrid(offsets, offsets, indexing='ij'))
+        order = np.argsort(di ** 2 + dj ** 2, kind='stable')
+        leaves = self.occupancy.locate(i + di[order], j + dj[order])
+        leaves = leaves[leaves >= 0]
+        free = leaves[self.occupancy.state[leaves] == FREE]
+        return int(free[0]) if len(free) else None
+
+    def plan_path(self, start, goal):
+        """
+        Plans a smoothed path between two (lat, lon) points over the quadtree.
+        Returns a list of (lat, lon) waypoints, or None if no path exists.
+        """
+        start_leaf = self._leaf_at(start)
+        goal_leaf = self._leaf_at(goal)
+        if start_leaf is None or goal_leaf is None:
+            return None
+        leaves = self.occupancy.a_star_search(start_leaf, goal_leaf)
+        if leaves is None:
+            return None
+        ci, cj = self.occupancy.centers(np.asarray(leaves))
+        raw_path = [tuple(start)]
+        raw_path += [self.grid_to_latlon(i, j, self.min_lat, self.min_lon) for i, j in zip(ci.tolist(), cj.tolist())]
+        raw_path.append(tuple(goal))
+        return self.smooth_path(raw_path)
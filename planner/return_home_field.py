@@ -0,0 +1,72 @@
+import numpy as np
+
+
+class ReturnHomeField:
+    """
+    Cost-to-go field towards the take-off location.
+
+    One reverse Dijkstra pass from the take-off cell (see `PathPlanner.distance_field`) stores,
+    for every free cell, its cost to the take-off and the next cell on the way there. A path
+    home from any position is then read off by following those pointers, which costs
+    O(path length) and is cheap enough to call on every telemetry update.
+    """
+
+    def __init__(self, planner, takeoff):
+        self.planner = planner
+        self.takeoff = tuple(takeoff)
+        self.min_lat, self.max_lat, self.min_lon, self.max_lon = planner.grid_bounds(self.takeoff)
+        grid = planner.build_grid(self.min_lat, self.max_lat, self.min_lon, self.max_lon)
+        self.shape = grid.shape
+        self.goal_cell = planner.latlon_to_grid(self.takeoff[0], self.takeoff[1], self.min_lat, self.min_lon)
+        cost_to_go, self.next_cell = planner.distance_field(grid, self.goal_cell)
+        self.cost_to_go = cost_to_go.astype(np.float32)
+
+    def _start_cell(self, position):
+        """
+        Returns the cell of the (lat, lon) `position`, or its cheapest reachable neighbour when
+        the cell itself is unreachable (e.g. a position hugging the flight region boundary).
+        Returns None if neither is reachable.
+        """
+        rows, cols = self.shape
+        i, j = self.planner.latlon_to_grid(position[0], position[1], self.min_lat, self.min_lon)
+        if 0 <= i < rows and 0 <= j < cols and np.isfinite(self.cost_to_go[i, j]):
+            return (i, j)
+        best, best_cost = None, np.inf
+        for di in (-1, 0, 1):
+            for dj in (-1, 0, 1):
+                ni, nj = i + di, j + dj
+                if 0 <= ni < rows and 0 <= nj < cols and self.cost_to_go[ni, nj] < best_cost:
+                    best, best_cost = (ni, nj), self.cost_to_go[ni, nj]
+        return best
+
+    def cost_from(self, position):
+        """
+        Path cost (in grid cells) from the (lat, lon) `position` to the take-off; inf if unreachable.
+        """
+        cell = self._start_cell(position)
+        return float('inf') if cell is None else float(self.cost_to_go[cell])
+
+    def path_from(self, position, compact=True):
+        """
+        Returns the list of (lat, lon) grid waypoints from `position` to the take-off, or None if
+        the take-off cannot be reached. With `compact`, intermediate cells on straight runs are
+        dropped so only the turning points remain.
+        """
+        cell = self._start_cell(position)
+        if cell is None:
+            return None
+        cols = self.shape[1]
+        current = cell[0] * cols + cell[1]
+        cells = [current]
+        while self.next_cell[current] != -1:
+            current = int(self.next_cell[current])
+            cells.append(current)
+
+        if compact and len(cells) > 2:
+            kept = [cells[0]]
+            for prev_idx, idx, next_idx in zip(cells, cells[1:], cells[2:]):
+                if idx - prev_idx != next_idx - idx:
+                    kept.append(idx)
+            kept.append(cells[-1])
+            cells = kept
+        return [self.planner.grid_to_latlon(*divmod(idx, cols), self.min_lat, self.min_lon) for idx in cells]
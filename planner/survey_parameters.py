@@ -0,0 +1,62 @@
+import math
+
+try:
+    from .geometry_utils import METERS_PER_DEGREE
+except ImportError:
+    from geometry_utils import METERS_PER_DEGREE
+
+# Field of view (horizontal, vertical) in degrees that reproduces the ground footprints used by
+# the onboard image processor, e.g. 21.83 m x 16.68 m at 25 m altitude.
+DEFAULT_CAMERA_FOV = (47.177476, 36.898053)
+
+
+class SurveyParameters:
+    """
+    Mission-level survey settings, from which the sweep spacing and the capture interval follow.
+
+    The camera is assumed to point straight down with the image width across the flight
+    direction. Adjacent sweeps overlap by `side_overlap` of the footprint width, and consecutive
+    frames along a sweep by `forward_overlap` of the footprint length.
+    """
+
+    def __init__(self, altitude, camera_fov=DEFAULT_CAMERA_FOV, side_overlap=0.2, forward_overlap=0.2,
+                 cruise_speed=5.0):
+        if not (0.0 <= side_overlap < 1.0 and 0.0 <= forward_overlap < 1.0):
+            raise ValueError("Overlaps must be in [0, 1)")
+        if altitude <= 0 or cruise_speed <= 0:
+            raise ValueError("Altitude and cruise speed must be positive")
+        self.altitude = altitude
+        self.camera_fov = camera_fov
+        self.side_overlap = side_overlap
+        self.forward_overlap = forward_overlap
+        self.cruise_speed = cruise_speed
+
+    def ground_footprint(self):
+        """Returns the (width, length) in metres of the ground area covered by one frame."""
+        h_fov, v_fov = (math.radians(angle) for angle in self.camera_fov)
+        return (2.0 * self.altitude * math.tan(h_fov / 2.0),
+                2.0 * self.altitude * math.tan(v_fov / 2.0))
+
+    def line_spacing_m(self):
+        """Distance in metres between adjacent sweep lines."""
+        return self.ground_footprint()[0] * (1.0 - self.side_overlap)
+
+    def capture_spacing_m(self):
+        """Distance in metres flown between consecutive frames."""
+        return self.ground_footprint()[1] * (1.0 - self.forward_overlap)
+
+    def sweep_spacing_deg(self):
+        """
+        Sweep line spacing in degrees of latitude, as expected by
+        `PathPlanner.generate_coverage_path` (which scales longitudes to the mission latitude
+        itself, so the value holds for any sweep direction).
+        """
+        return self.line_spacing_m() / METERS_PER_DEGREE
+
+    def capture_interval(self):
+        """Seconds between frames at cruise speed for the requested forward overlap."""
+        return self.capture_spacing_m() / self.cruise_speed
+
+    def frames_for(self, path_length_m):
+        """Number of frames captured while flying `path_length_m` metres of coverage."""
+        return int(math.ceil(path_length_m / self.capture_spacing_m())) + 1
@@ -0,0 +1,57 @@
+import pytest
+
+from planner.planning_service import InProcessClient, PlanningError, PlanningService
+
+KML = """<?xml version="1.0" encoding="UTF-8"?>
+<kml xmlns="http://www.opengis.net/kml/2.2">
+<Document>
+<Placemark><name>Take-Off Location</name><Point><coordinates>-2.6715,51.4234,0</coordinates></Point></Placemark>
+<Placemark><name>Flight Region</name><Polygon><outerBoundaryIs><LinearRing><coordinates>
+-2.6728,51.4225,0 -2.6660,51.4225,0 -2.6660,51.4280,0 -2.6728,51.4280,0 -2.6728,51.4225,0
+</coordinates></LinearRing></outerBoundaryIs></Polygon></Placemark>
+<Placemark><name>Sensitive Area</name><Polygon><outerBoundaryIs><LinearRing><coordinates>
+-2.6712,51.4245,0 -2.6700,51.4245,0 -2.6700,51.4262,0 -2.6712,51.4262,0 -2.6712,51.4245,0
+</coordinates></LinearRing></outerBoundaryIs></Polygon></Placemark>
+<Placemark><name>Survey Area</name><Polygon><outerBoundaryIs><LinearRing><coordinates>
+-2.6690,51.4250,0 -2.6668,51.4250,0 -2.6668,51.4272,0 -2.6690,51.4272,0 -2.6690,51.4250,0
+</coordinates></LinearRing></outerBoundaryIs></Polygon></Placemark>
+</Document></kml>
+"""
+
+
+@pytest.fixture(scope="module")
+def client(tmp_path_factory):
+    kml_file = tmp_path_factory.mktemp("mission") / "mission.kml"
+    kml_file.write_text(KML)
+    return InProcessClient(PlanningService(str(kml_file)))
+
+
+def test_return_home_from_inside_the_flight_region(client):
+    reply = client.return_home([51.4270, -2.6670])
+    # Ends on the take-off's grid cell (0.0001 degrees)
+    assert reply["path"][-1] == pytest.approx([51.4234, -2.6715], abs=1e-4)
+
+
+@pytest.mark.parametrize("position", [[float("nan"), -2.6670], [51.4270, float("inf")], [51.4270, "east"]])
+def test_invalid_positions_are_rejected(client, position):
+    with pytest.raises(PlanningError) as error:
+        client.return_home(position)
+    assert error.value.status == 400
+
+
+def test_positions_far_outside_the_flight_region_are_rejected(client):
+    with pytest.raises(PlanningError) as error:
+        client.path([51.4270, -2.6670], [52.0, -2.6670])
+    assert error.value.status == 400
+
+
+def test_unexpected_errors_get_a_reply(client, monkeypatch):
+    def broken(*args):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(client.service.planner, "plan_path", broken)
+    with pytest.raises(PlanningError) as error:
+        client.path([51.4270, -2.6670], [51.4230, -2.6720])
+    assert error.value.status == 500
+    assert "boom" in str(error.value)
+    assert client.health()["status"] == "ok"
@@ -0,0 +1,23 @@
+import pytest
+
+from planner.processing_scheduler import schedule_processing_stops
+
+# Three points roughly 100 m apart along a line of latitude
+PATH = [(51.4230, -2.6710), (51.4230, -2.6696), (51.4230, -2.6682)]
+
+
+def test_zero_backlog_limit_is_rejected_when_captures_outpace_inference():
+    with pytest.raises(ValueError):
+        schedule_processing_stops(PATH, capture_interval=0.5, inference_rate=1.0, max_backlog=0)
+
+
+def test_zero_backlog_limit_is_allowed_when_inference_keeps_up():
+    schedule = schedule_processing_stops(PATH, capture_interval=0.5, inference_rate=2.0, max_backlog=0)
+    assert schedule.stops == []
+    assert schedule.final_backlog == 0.0
+
+
+def test_backlog_stays_within_limit():
+    schedule = schedule_processing_stops(PATH, capture_interval=0.5, inference_rate=1.0, max_backlog=5)
+    assert schedule.stops
+    assert schedule.peak_backlog <= 5 + 1e-9
@@ -0,0 +1,157 @@
+import numpy as np
+from shapely.geometry import Point
+from shapely.geometry.polygon import orient
+from shapely.prepared import prep
+
+try:
+    from .path_planner import PathPlanner
+    from .geometry_utils import polygon_edges, segments_intersect_edges
+except ImportError:
+    from path_planner import PathPlanner
+    from geometry_utils import polygon_edges, segments_intersect_edges
+
+
+class VisibilityGraphPlanner(PathPlanner):
+    """
+    Any-angle planner over the visibility graph of the free space.
+
+    The free space is the flight region shrunk by `clearance` minus the sensitive area grown
+    by `clearance` (mitre joins, so corners stay corners, then simplified). Shortest paths through a polygonal
+    free space only bend at its reflex vertices, so those are the graph nodes. Vertex-to-vertex
+    visibility and all-pairs shortest distances are computed once on construction; a query
+    only tests the start and goal against the vertices and combines the results with the
+    precomputed distance matrix, independently of any grid resolution.
+
+    Coverage generation and smoothing are inherited from `PathPlanner`.
+    """
+
+    def __init__(self, flight_polygon, sensitive_polygon, clearance=0.00002, **kwargs):
+        super().__init__(flight_polygon, sensitive_polygon, **kwargs)
+        self.clearance = clearance
+        # Simplifying within a tenth of the clearance drops the vertices of rounded corners
+        # while keeping at least 90% of the clearance everywhere.
+        self.free_space = flight_polygon.buffer(-clearance, join_style=2).difference(
+            sensitive_polygon.buffer(clearance, join_style=2)).simplify(clearance * 0.1)
+        self.prepared_free_space = prep(self.free_space)
+        # Segments running along the boundary have midpoints on it up to rounding error,
+        # so the midpoint test uses the free space grown by a negligible tolerance.
+        self._prepared_midpoint_space = prep(self.free_space.buffer(clearance * 1e-3, join_style=2))
+        self.edges = polygon_edges(self.free_space)
+        self.vertices = self._reflex_vertices(self.free_space)
+        # (V, E) mask of the boundary edges that end at each vertex.
+        self.incident_edges = ((self.edges[np.newaxis, :, :2] == self.vertices[:, np.newaxis, :]).all(axis=-1) |
+                               (self.edges[np.newaxis, :, 2:] == self.vertices[:, np.newaxis, :]).all(axis=-1))
+        self.visible = self._vertex_visibility()
+        self.distances, self.next_hop = self._all_pairs_shortest_paths()
+
+    @staticmethod
+    def _reflex_vertices(free_space):
+        """
+        Returns the (V, 2) array of (lon, lat) vertices where the free space turns away from
+        its interior (interior angle above 180 degrees).
+        """
+        vertices = []
+        for polygon in getattr(free_space, "geoms", [free_space]):
+            if polygon.is_empty:
+                continue
+            # Exterior counter-clockwise, holes clockwise: the interior is always on the left.
+            polygon = orient(polygon, sign=1.0)
+            for ring in [polygon.exterior, *polygon.interiors]:
+                coords = np.asarray(ring.coords, dtype=np.float64)[:-1, :2]
+                prev_pts = np.roll(coords, 1, axis=0)
+                next_pts = np.roll(coords, -1, axis=0)
+                turn = ((coords[:, 0] - prev_pts[:, 0]) * (next_pts[:, 1] - coords[:, 1]) -
+                        (coords[:, 1] - prev_pts[:, 1]) * (next_pts[:, 0] - coords[:, 0]))
+                vertices.append(coords[turn < 0])
+        if not vertices:
+            return np.empty((0, 2), dtype=np.float64)
+        return np.vstack(vertices)
+
+    def _blocked(self, starts, ends, incident=None):
+        """
+        For (S, 2) segment starts and ends, returns a boolean (S,) array that is True where the
+        segment touches the free-space boundary. `incident` is an optional (S, E) mask of edges
+        that share an endpoint with the segment; touching those is allowed.
+        """
+        hits = segments_intersect_edges(np.hstack((starts, ends)), self.edges)
+        if incident is not None:
+            hits &= ~incident
+        return hits.any(axis=1)
+
+    def _vertex_visibility(self):
+        n = len(self.vertices)
+        visible = np.zeros((n, n), dtype=bool)
+        if n < 2:
+            return visible
+        i_idx, j_idx = np.triu_indices(n, k=1)
+        candidates = ~self._blocked(self.vertices[i_idx], self.vertices[j_idx],
+                                    self.incident_edges[i_idx] | self.incident_edges[j_idx])
+        # A segment between two boundary vertices that crosses no other edge lies either
+        # wholly inside or wholly outside the free space; its midpoint tells which.
+        midpoints = 0.5 * (self.vertices[i_idx] + self.vertices[j_idx])
+        for k in np.flatnonzero(candidates):
+            candidates[k] = self._prepared_midpoint_space.covers(Point(midpoints[k]))
+        visible[i_idx[candidates], j_idx[candidates]] = True
+        visible |= visible.T
+        return visible
+
+    def _all_pairs_shortest_paths(self):
+        """
+        Floyd-Warshall over the visibility graph. Returns the (V, V) distance matrix and the
+        next-hop matrix used to rebuild vertex-to-vertex paths.
+        """
+        n = len(self.vertices)
+        deltas = self.vertices[:, np.newaxis, :] - self.vertices[np.newaxis, :, :]
+        distances = np.where(self.visible, np.hypot(deltas[..., 0], deltas[..., 1]), np.inf)
+        np.fill_diagonal(distances, 0.0)
+        next_hop = np.tile(np.arange(n), (n, 1))
+        for k in range(n):
+            via_k = distances[:, k, np.newaxis] + distances[np.newaxis, k, :]
+            shorter = via_k < distances
+            distances = np.where(shorter, via_k, distances)
+            next_hop = np.where(shorter, next_hop[:, k, np.newaxis], next_hop)
+        return distances, next_hop
+
+    def _endpoint_distances(self, point):
+        """Distances from a (lon, lat) point to every vertex it can see (inf elsewhere)."""
+        n = len(self.vertices)
+        if n == 0:
+            return np.empty(0)
+        starts = np.broadcast_to(point, (n, 2))
+        blocked = self._blocked(starts, self.vertices, self.incident_edges)
+        distances = np.hypot(self.vertices[:, 0] - point[0], self.vertices[:, 1] - point[1])
+        return np.where(blocked, np.inf, distances)
+
+    def plan_path(self, start, goal):
+        """
+        Plans the shortest any-angle path between two (lat, lon) points.
+        Returns a list of (lat, lon) waypoints, or None if either point is outside the free
+        space or no path exists.
+        """
+        start_pt = np.array([start[1], start[0]], dtype=np.float64)
+        goal_pt = np.array([goal[1], goal[0]], dtype=np.float64)
+        if not (self.prepared_free_space.covers(Point(start_pt))
+                and self.prepared_free_space.covers(Point(goal_pt))):
+            return None
+        if not self._blocked(start_pt[np.newaxis, :], goal_pt[np.newaxis, :])[0]:
+            return [tuple(start), tuple(goal)]
+
+        from_start = self._endpoint_distances(start_pt)
+        to_goal = self._endpoint_distances(goal_pt)
+        if len(from_start) == 0:
+            return None
+        totals = from_start[:, np.newaxis] + self.distances + to_goal[np.newaxis, :]
+        first, last = np.unravel_index(np.argmin(totals), totals.shape)
+        if not np.isfinite(totals[first, last]):
+            return None
+
+        path = [tuple(start)]
+        current = first
+        while True:
+            lon, lat = self.vertices[current]
+            path.append((float(lat), float(lon)))
+            if current == last:
+                break
+            current = self.next_hop[current, last]
+        path.append(tuple(goal))
+        return path
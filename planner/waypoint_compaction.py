@@ -0,0 +1,61 @@
+import numpy as np
+
+try:
+    from .geometry_utils import METERS_PER_DEGREE
+except ImportError:
+    from geometry_utils import METERS_PER_DEGREE
+
+
+def cross_track_distances_m(points_xy, a, b):
+    """
+    Distances from each row of the (N, 2) `points_xy` to the segment a-b (not the infinite
+    line, so a point beyond either end, such as a reversal, always counts as off the track).
+    """
+    ab = b - a
+    length_sq = float(ab @ ab)
+    if length_sq == 0.0:
+        return np.hypot(*(points_xy - a).T)
+    t = np.clip(((points_xy - a) @ ab) / length_sq, 0.0, 1.0)
+    return np.hypot(*(points_xy - (a + t[:, np.newaxis] * ab)).T)
+
+
+def compact_waypoints(path, tolerance_m=1.0, planner=None, keep=()):
+    """
+    Douglas-Peucker simplification of a list of (lat, lon) waypoints: drops every point that
+    lies within `tolerance_m` metres of the straight leg replacing it, such as the collinear
+    points left by grid paths and sweep lines.
+
+    With a `planner`, every shortened leg must also pass `planner.can_travel_straight`, so a
+    simplification never cuts a corner out of the flight region or into the sensitive area;
+    a leg that fails is split at its furthest point as if it were out of tolerance. The first
+    and last points and the indices in `keep` (e.g. hover stops) are always kept.
+    Returns (compacted_path, kept_indices).
+    """
+    n = len(path)
+    if n < 3:
+        return list(path), list(range(n))
+    points = np.asarray(path, dtype=np.float64)
+    # Local equirectangular frame in metres, (x, y) = (east, north)
+    cos_lat = np.cos(np.radians(points[:, 0].mean()))
+    xy = np.column_stack((points[:, 1] * METERS_PER_DEGREE * cos_lat, points[:, 0] * METERS_PER_DEGREE))
+
+    kept = np.zeros(n, dtype=bool)
+    kept[[0, n - 1]] = True
+    kept[list(keep)] = True
+    anchors = np.flatnonzero(kept)
+    stack = list(zip(anchors[:-1].tolist(), anchors[1:].tolist()))
+    while stack:
+        i, j = stack.pop()
+        if j - i < 2:
+            continue
+        distances = cross_track_distances_m(xy[i + 1:j], xy[i], xy[j])
+        k = int(np.argmax(distances))
+        if distances[k] <= tolerance_m and (planner is None or planner.can_travel_straight(path[i], path[j])):
+            continue
+        split = i + 1 + k
+        kept[split] = True
+        stack.append((i, split))
+        stack.append((split, j))
+
+    indices = np.flatnonzero(kept).tolist()
+    return [path[k] for k in indices], indices
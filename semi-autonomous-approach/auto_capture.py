@@ -9,12 +9,14 @@ from mission import Mission, MissionStatus
 
 class AutoCapture:
 
-    def __init__(self, interval=1, save_dir="capture-images", pi_environ=True):
+    def __init__(self, interval=1, save_dir="capture-images", pi_environ=True, pipeline=None):
         """
-        Initializes the AutoCapture instance.
+        Initializes the AutoCapture instance. With a `StreamingPipeline`, frames are handed to it
+        in memory instead of being saved here.
         """
         self.interval = interval
         self.save_dir = save_dir
+        self.pipeline = pipeline
         self.counter = 0
         self.pi_environ = pi_environ
 
@@ -57,6 +59,12 @@ class AutoCapture:
             # Convert the image from RGB to BGR format for OpenCV
             frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
 
+            if self.pipeline is not None:
+                self.pipeline.submit(frame, lat[0], lon[0], yaw[0])
+                self.counter += 1
+                time.sleep(self.interval)
+                continue
+
             # Generate a unique image ID and construct the filename
             current_image_id = uuid.uuid4()
             filename = os.path.join(self.save_dir, f"{current_image_id}.png")
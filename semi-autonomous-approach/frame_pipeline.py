@@ -0,0 +1,294 @@
+import os
+import time
+import uuid
+import logging
+import threading
+from collections import deque
+from enum import Enum
+from typing import TYPE_CHECKING, Any, Optional
+import numpy as np
+import cv2 as cv
+from database import db
+from image import Image
+
+if TYPE_CHECKING:
+    # Only annotated here; importing it loads the detector's dependencies
+    from image_processor import ImageProcessor
+
+
+class DropPolicy(Enum):
+    BLOCK = 'Block'                 # the producer waits for room (backpressure), up to `block_timeout`
+    DROP_NEWEST = 'Drop newest'     # a full queue rejects the incoming item
+    DROP_OLDEST = 'Drop oldest'     # a full queue evicts its oldest item, so the freshest frames are kept
+
+
+class FrameQueue:
+    """
+    Bounded FIFO between two threads. What happens when it is full is set by its `DropPolicy`;
+    `put` returns the item that did not make it (or None), so the caller can route it elsewhere.
+    """
+
+    def __init__(self, maxsize: int, policy: DropPolicy = DropPolicy.BLOCK, block_timeout: Optional[float] = None):
+        self.maxsize = maxsize
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.items: deque = deque()
+        self.closed = False
+        self.max_depth = 0
+        self.dropped = 0
+        self._cond = threading.Condition()
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def put(self, item: Any, block: bool = True) -> Optional[Any]:
+        """Queues `item`; with `block` False, a full BLOCK queue rejects it at once instead of waiting."""
+        with self._cond:
+            rejected = None
+            if not self.closed and len(self.items) >= self.maxsize:
+                if self.policy == DropPolicy.DROP_OLDEST:
+                    rejected = self.items.popleft()
+                elif self.policy == DropPolicy.BLOCK and block:
+                    self._cond.wait_for(lambda: len(self.items) < self.maxsize or self.closed, self.block_timeout)
+            if self.closed or len(self.items) >= self.maxsize:
+                self.dropped += 1
+                return item
+            self.items.append(item)
+            self.max_depth = max(self.max_depth, len(self.items))
+            self._cond.notify_all()
+            if rejected is not None:
+                self.dropped += 1
+            return rejected
+
+    def get_batch(self, max_items: int, timeout: Optional[float] = None) -> list:
+        """Up to `max_items` items, oldest first; waits up to `timeout` for the first. Empty on timeout or close."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.items or self.closed, timeout)
+            batch = [self.items.popleft() for _ in range(min(max_items, len(self.items)))]
+            if batch:
+                self._cond.notify_all()
+            return batch
+
+    def close(self) -> None:
+        """Wakes every waiting thread; later puts are rejected, queued items can still be taken."""
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+
+class Frame:
+    """A captured frame still in memory, with the (not yet saved) `Image` record holding its telemetry."""
+
+    def __init__(self, pixels: np.ndarray, record: Image):
+        self.pixels = pixels
+        self.record = record
+        self.captured_at = time.monotonic()
+
+
+class PipelineMetrics:
+    """Counters and recent capture-to-detection latencies of a `StreamingPipeline`; thread-safe."""
+
+    def __init__(self, window: int = 1000):
+        self.captured = 0
+        self.dropped = 0
+        self.processed = 0
+        self.persisted = 0
+        self.lost = 0
+        self.latencies: deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def count(self, **increments: int) -> None:
+        with self._lock:
+            for name, value in increments.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def add_latencies(self, latencies: list[float]) -> None:
+        with self._lock:
+            self.latencies.extend(latencies)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            latencies = np.array(self.latencies) * 1e3
+            snapshot = {name: getattr(self, name) for name in ('captured', 'dropped', 'processed', 'persisted', 'lost')}
+        if len(latencies):
+            snapshot.update(latency_p50_ms=float(np.percentile(latencies, 50)),
+                            latency_p95_ms=float(np.percentile(latencies, 95)),
+                            latency_max_ms=float(latencies.max()))
+        return snapshot
+
+
+class StreamingPipeline:
+    """
+    Streams captured frames through memory into an `ImageProcessor`, instead of writing PNGs
+    for the processor to find and read back.
+
+    `submit` (called by the capture thread) puts a frame and its telemetry on a bounded queue;
+    the inference thread takes them `batch_size` at a time, undistorts them into buffers it
+    reuses and runs the detector. The PNG and the `Image` record, with its detections, are
+    written afterwards by a persistence thread, off the hot path. When inference falls behind,
+    the frame queue applies its `policy`; frames dropped from it are still persisted, as
+    unprocessed images, and the inference thread works through them from the database, one
+    batch (`ImageProcessor.process_next_batch`) per idle tick. If persistence
+    itself falls behind, it pushes back on inference for up to `persist_timeout` seconds before
+    giving a frame up as lost. With the BLOCK policy, capture waits up to `block_timeout`
+    seconds for room in the frame queue instead.
+
+    Queue depths, drop counts and capture-to-detection latency are in `metrics` and are
+    logged every `metrics_interval` seconds.
+    """
+
+    def __init__(self, processor: "ImageProcessor", save_dir: str = "capture-images", queue_size: int = 8,
+                 policy: DropPolicy = DropPolicy.DROP_OLDEST, batch_size: int = 4, persist_queue_size: int = 64,
+                 block_timeout: float = 1.0, persist_timeout: float = 5.0, idle_timeout: float = 5.0,
+                 metrics_interval: float = 10.0):
+        self.processor = processor
+        self.save_dir = save_dir
+        self.batch_size = batch_size
+        self.idle_timeout = idle_timeout
+        self.metrics_interval = metrics_interval
+        self.frames = FrameQueue(queue_size, policy, block_timeout)
+        self.to_persist = FrameQueue(persist_queue_size, DropPolicy.BLOCK, block_timeout=persist_timeout)
+        self.metrics = PipelineMetrics()
+        self._buffers: list[np.ndarray] = []
+        self._threads: list[threading.Thread] = []
+        os.makedirs(self.save_dir, exist_ok=True)
+
+    def start(self) -> None:
+        self._threads = [threading.Thread(target=self.inference_loop, daemon=True),
+                         threading.Thread(target=self.persistence_loop, daemon=True)]
+        for thread in self._threads:
+            thread.start()
+        logging.info(f"Streaming pipeline started ({self.frames.policy.value} at {self.frames.maxsize} frames)")
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stops taking frames; the queued ones are still processed and persisted."""
+        self.frames.close()
+        self._threads[0].join(timeout)
+        self.to_persist.close()
+        self._threads[1].join(timeout)
+
+    def submit(self, pixels: np.ndarray, lat: float, lon: float, yaw: float) -> bool:
+        """Queues a BGR frame captured at (lat, lon, yaw); returns False if the queue dropped a frame."""
+        image_id = str(uuid.uuid4())
+        record = Image(id=image_id, path=os.path.join(self.save_dir, f"{image_id}.png"),
+                       mission=self.processor.mission, lat=lat, lon=lon, yaw=yaw)
+        self.metrics.count(captured=1)
+        dropped = self.frames.put(Frame(pixels, record))
+        if dropped is None:
+            return True
+        # Not lost: persisted unprocessed, for the database path to pick up later. The capture
+        # thread never waits for persistence
+        self.metrics.count(dropped=1)
+        self._persist(dropped, block=False)
+        return False
+
+    def _persist(self, frame: Frame, block: bool = True) -> None:
+        if self.to_persist.put(frame, block) is not None:
+            self.metrics.count(lost=1)
+            logging.warning(f"Persistence queue full; frame {frame.record.id} was lost")
+
+    def _undistort(self, frames: list[Frame]) -> list[np.ndarray]:
+        """Undistorts a batch into per-slot buffers, reused while the frame size stays the same."""
+        corrected = []
+        for k, frame in enumerate(frames):
+            if k == len(self._buffers) or self._buffers[k].shape != frame.pixels.shape:
+                self._buffers[k:k + 1] = [np.empty_like(frame.pixels)]
+            corrected.append(self.processor.undistortion.undistort(frame.pixels, self._buffers[k]))
+        return corrected
+
+    def inference_loop(self) -> None:
+        last_report = time.monotonic()
+        backlog = False
+        while True:
+            # While the database has a backlog, only check for live frames between its batches
+            frames = self.frames.get_batch(self.batch_size, timeout=0.0 if backlog else self.idle_timeout)
+            if frames:
+                records = [frame.record for frame in frames]
+                try:
+                    zebras = self.processor.detect(records, self._undistort(frames))
+                    detected_at = time.monotonic()
+                    for record in records:
+                        record.is_processed = True
+                    self.processor.add_zebras(zebras)
+                    self.metrics.count(processed=len(frames))
+                    self.metrics.add_latencies([detected_at - frame.captured_at for frame in frames])
+                except Exception:
+                    logging.exception("Inference failed; the batch is persisted for the database path")
+                for frame in frames:
+                    self._persist(frame)
+            elif self.frames.closed:
+                break
+            else:
+                # Idle: catch up on one batch of dropped frames (and any captured without the stream),
+                # then go back to the live queue
+                try:
+                    backlog = self.processor.process_next_batch(self.batch_size) > 0
+                except Exception:
+                    backlog = False
+                    logging.exception("Processing images from the database failed; they are retried later")
+
+            if time.monotonic() - last_report >= self.metrics_interval:
+                last_report = time.monotonic()
+                self.log_metrics()
+
+    def persistence_loop(self) -> None:
+        while True:
+            frames = self.to_persist.get_batch(self.to_persist.maxsize, timeout=self.idle_timeout)
+            if not frames:
+                if self.to_persist.closed:
+                    break
+                continue
+            persisted = []
+            try:
+                for frame in frames:
+                    if self._write(frame):
+                        persisted.append(frame.record)
+                persisted = self._save(persisted)
+            except Exception:
+                logging.exception(f"Persisting {len(frames)} frames failed; they are lost")
+                persisted = []
+            self.metrics.count(persisted=len(persisted), lost=len(frames) - len(persisted))
+
+    @staticmethod
+    def _write(frame: Frame) -> bool:
+        try:
+            if cv.imwrite(frame.record.path, frame.pixels):
+                return True
+            logging.error(f"Could not write {frame.record.path}")
+        except cv.error:
+            logging.exception(f"Could not write {frame.record.path}")
+        return False
+
+    @staticmethod
+    def _save(records: list[Image]) -> list[Image]:
+        """
+        Inserts the records in one transaction, or one at a time if that fails (e.g. the database
+        was locked by an image processor claiming images, or one record is rejected); returns
+        the records saved.
+        """
+        try:
+            with db.atomic():
+                for record in records:
+                    record.save(force_insert=True)
+            return records
+        except Exception:
+            logging.exception(f"Saving {len(records)} images failed; saving them one at a time")
+        saved = []
+        for record in records:
+            try:
+                record.save(force_insert=True)
+                saved.append(record)
+            except Exception:
+                logging.exception(f"Could not save image {record.id}")
+        return saved
+
+    def log_metrics(self) -> None:
+        snapshot = self.metrics.snapshot()
+        message = (f"Pipeline: queue {len(self.frames)}/{self.frames.maxsize} (max {self.frames.max_depth}), "
+                   f"persist queue {len(self.to_persist)}/{self.to_persist.maxsize}, "
+                   f"captured {snapshot['captured']}, processed {snapshot['processed']}, "
+                   f"dropped {snapshot['dropped']}, persisted {snapshot['persisted']}, lost {snapshot['lost']}")
+        if 'latency_p50_ms' in snapshot:
+            message += (f"; capture-to-detection p50 {snapshot['latency_p50_ms']:.0f} ms, "
+                        f"p95 {snapshot['latency_p95_ms']:.0f} ms")
+        logging.info(message)
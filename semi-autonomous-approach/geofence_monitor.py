@@ -0,0 +1,169 @@
+import math
+import logging
+from enum import Enum
+from typing import Callable, Optional, Sequence
+from shapely import prepare
+from shapely.geometry import Point, Polygon
+
+# Length of one degree of latitude on a spherical Earth, in metres
+METERS_PER_DEGREE = 111194.92664455873
+
+
+class FenceStatus(Enum):
+    INSIDE = 'Inside'
+    NEAR_BOUNDARY = 'Near boundary'
+    ABOVE_MAX_ALTITUDE = 'Above maximum altitude'
+    OUTSIDE_FLIGHT_REGION = 'Outside flight region'
+    IN_SENSITIVE_AREA = 'In sensitive area'
+
+
+# Statuses that are fence breaches (the others are normal flight)
+BREACHES = (FenceStatus.ABOVE_MAX_ALTITUDE, FenceStatus.OUTSIDE_FLIGHT_REGION, FenceStatus.IN_SENSITIVE_AREA)
+
+
+class GeofenceEvent:
+    """A change of the vehicle's `FenceStatus`, passed to the listeners of a `GeofenceMonitor`."""
+
+    def __init__(self, status: FenceStatus, previous: FenceStatus, lat: float, lon: float,
+                 alt: Optional[float], timestamp: Optional[float]):
+        self.status = status
+        self.previous = previous
+        self.lat = lat
+        self.lon = lon
+        self.alt = alt
+        self.timestamp = timestamp
+
+    @property
+    def is_breach(self) -> bool:
+        return self.status in BREACHES
+
+    def __repr__(self):
+        return (f"GeofenceEvent({self.previous.value} -> {self.status.value} at "
+                f"({self.lat:.7f}, {self.lon:.7f}), alt={self.alt})")
+
+
+class GeofenceMonitor:
+    """
+    Checks every position report against the Flight Region and the Sensitive Area, and calls
+    its listeners with a `GeofenceEvent` whenever the `FenceStatus` changes.
+
+    Positions within `warning_margin` meters of the Flight Region edge or of the Sensitive
+    Area are NEAR_BOUNDARY. The polygons are held in a local frame in meters and prepared
+    once. Each full check starts with bounding-box tests, which settle most positions without
+    touching the geometry, and records how far the position is from the nearest boundary: the
+    status cannot change until the vehicle has moved that far, so the following reports are
+    answered with one distance comparison. The monitor is meant to be fed from the telemetry
+    thread; listeners run on that thread and should return quickly.
+    """
+
+    def __init__(self, flight_region: Sequence[tuple[float, float]],
+                 sensitive_area: Optional[Sequence[tuple[float, float]]] = None,
+                 warning_margin: float = 10.0, max_altitude: Optional[float] = None):
+        self.lat0 = sum(lat for lat, _ in flight_region) / len(flight_region)
+        self.lon0 = sum(lon for _, lon in flight_region) / len(flight_region)
+        self.x_scale = METERS_PER_DEGREE * math.cos(math.radians(self.lat0))
+        self.max_altitude = max_altitude
+        self.listeners: list[Callable[[GeofenceEvent], None]] = []
+        self.status = FenceStatus.INSIDE
+        self.checks = 0
+        self.full_checks = 0
+
+        self.flight = self._local_polygon(flight_region)
+        self.flight_inner = self.flight.buffer(-warning_margin)
+        self.sensitive = self._local_polygon(sensitive_area) if sensitive_area else None
+        self.sensitive_outer = self.sensitive.buffer(warning_margin) if self.sensitive is not None else None
+        self._flight_edges = [g.boundary for g in (self.flight, self.flight_inner) if not g.is_empty]
+        self._sensitive_edges = [g.boundary for g in (self.sensitive, self.sensitive_outer) if g is not None]
+        for geometry in (self.flight, self.flight_inner, self.sensitive, self.sensitive_outer,
+                         *self._flight_edges, *self._sensitive_edges):
+            if geometry is not None:
+                prepare(geometry)
+        self._flight_box = self.flight.bounds
+        self._inner_box = self.flight_inner.bounds if not self.flight_inner.is_empty else None
+        self._sensitive_box = self.sensitive_outer.bounds if self.sensitive_outer is not None else None
+        # Position of the last full check and the squared distance within which its result holds
+        self._anchor = (math.inf, math.inf)
+        self._safe_radius_sq = -1.0
+        self._planar_status = FenceStatus.INSIDE
+
+    @classmethod
+    def from_artifact(cls, artifact: dict, **kwargs) -> "GeofenceMonitor":
+        """Monitor for the Flight Region and Sensitive Area of a mission artifact (see `mission_artifact`)."""
+        return cls([tuple(p) for p in artifact["flight_region"].tolist()],
+                   [tuple(p) for p in artifact["sensitive_area"].tolist()], **kwargs)
+
+    def _local_polygon(self, coords: Sequence[tuple[float, float]]) -> Polygon:
+        return Polygon([self._to_local(lat, lon) for lat, lon in coords]).buffer(0)
+
+    def _to_local(self, lat: float, lon: float) -> tuple[float, float]:
+        return (lon - self.lon0) * self.x_scale, (lat - self.lat0) * METERS_PER_DEGREE
+
+    def add_listener(self, callback: Callable[[GeofenceEvent], None]) -> None:
+        self.listeners.append(callback)
+
+    @staticmethod
+    def _in_box(x: float, y: float, box: Optional[tuple]) -> bool:
+        return box is not None and box[0] <= x <= box[2] and box[1] <= y <= box[3]
+
+    @staticmethod
+    def _box_distance(x: float, y: float, box: tuple) -> float:
+        return math.hypot(max(box[0] - x, 0.0, x - box[2]), max(box[1] - y, 0.0, y - box[3]))
+
+    def _classify(self, x: float, y: float) -> FenceStatus:
+        """Full check of a local position: returns its status and sets the radius within which it holds."""
+        self.full_checks += 1
+        point = Point(x, y)
+        # `radius` is a lower bound on the distance to every boundary that could change the status
+        near_sensitive = self._in_box(x, y, self._sensitive_box)
+        if near_sensitive:
+            radius = min(edge.distance(point) for edge in self._sensitive_edges)
+        elif self._sensitive_box is not None:
+            radius = self._box_distance(x, y, self._sensitive_box)
+        else:
+            radius = math.inf
+        in_flight_box = self._in_box(x, y, self._flight_box)
+        if in_flight_box:
+            radius = min(radius, *(edge.distance(point) for edge in self._flight_edges))
+        else:
+            radius = min(radius, self._box_distance(x, y, self._flight_box))
+        self._anchor = (x, y)
+        self._safe_radius_sq = radius * radius
+
+        if near_sensitive and self.sensitive.covers(point):
+            return FenceStatus.IN_SENSITIVE_AREA
+        if not (in_flight_box and self.flight.covers(point)):
+            return FenceStatus.OUTSIDE_FLIGHT_REGION
+        if near_sensitive and self.sensitive_outer.covers(point):
+            return FenceStatus.NEAR_BOUNDARY
+        if self._in_box(x, y, self._inner_box) and self.flight_inner.covers(point):
+            return FenceStatus.INSIDE
+        return FenceStatus.NEAR_BOUNDARY
+
+    def update(self, lat: float, lon: float, alt: Optional[float] = None,
+               timestamp: Optional[float] = None) -> FenceStatus:
+        """Checks one position (`alt` in meters above home) and returns the new `FenceStatus`."""
+        self.checks += 1
+        x, y = self._to_local(lat, lon)
+        dx, dy = x - self._anchor[0], y - self._anchor[1]
+        if dx * dx + dy * dy >= self._safe_radius_sq:
+            self._planar_status = self._classify(x, y)
+        status = self._planar_status
+        if (self.max_altitude is not None and alt is not None and alt > self.max_altitude
+                and status not in (FenceStatus.IN_SENSITIVE_AREA, FenceStatus.OUTSIDE_FLIGHT_REGION)):
+            status = FenceStatus.ABOVE_MAX_ALTITUDE
+
+        if status != self.status:
+            event = GeofenceEvent(status, self.status, lat, lon, alt, timestamp)
+            self.status = status
+            for callback in self.listeners:
+                try:
+                    callback(event)
+                except Exception:
+                    logging.exception(f"Geofence listener failed on {event}")
+        return status
+
+    def handle_message(self, msg) -> Optional[FenceStatus]:
+        """Feeds a MAVLink message to the monitor; only GLOBAL_POSITION_INT is used."""
+        if msg.get_type() != 'GLOBAL_POSITION_INT':
+            return None
+        return self.update(msg.lat / 1e7, msg.lon / 1e7, msg.relative_alt / 1000.0, msg.time_boot_ms / 1000.0)
@@ -1,8 +1,14 @@
-from peewee import CharField, FloatField, BooleanField, ForeignKeyField
+from datetime import datetime, timedelta
+from peewee import CharField, FloatField, BooleanField, ForeignKeyField, DateTimeField
+from playhouse.migrate import SqliteMigrator, migrate
 from custom_fields import PointListField
 from base_model import BaseModel
+from database import db
 from mission import Mission
 
+# A claim not completed within this many seconds (e.g. the processor crashed) may be claimed again
+CLAIM_TIMEOUT = 120.0
+
 
 class Image(BaseModel):
     path = CharField()
@@ -13,8 +19,67 @@ class Image(BaseModel):
     is_zebra = BooleanField(default=False)
     is_rhino = BooleanField(default=False)
     is_processed = BooleanField(default=False)
-    
+    # Set while an image processor works on the image (see `claim_next`)
+    claimed_at = DateTimeField(null=True)
+
     mission = ForeignKeyField(Mission, backref='images', on_delete='CASCADE')
-    
+
     class Meta:
         table_name = 'image'
+        # Work queue lookups: a mission's unprocessed images, oldest first
+        indexes = (
+            (('mission', 'is_processed', 'created_at'), False),
+        )
+
+    @classmethod
+    def migrate_schema(cls) -> None:
+        """Brings an `image` table created before the work queue up to date: adds `claimed_at` and the index."""
+        columns = {column.name for column in db.get_columns(cls._meta.table_name)}
+        if 'claimed_at' not in columns:
+            migrate(SqliteMigrator(db).add_column(cls._meta.table_name, 'claimed_at', cls.claimed_at))
+        cls._schema.create_indexes(safe=True)
+
+    @classmethod
+    def claim_next(cls, mission: Mission, limit: int = 16,
+                   claim_timeout: float = CLAIM_TIMEOUT) -> list["Image"]:
+        """
+        Atomically claims up to `limit` of the mission's oldest unprocessed images that nobody
+        else holds, and returns them oldest first. The lookup walks the (mission, is_processed,
+        created_at) index, so its cost depends on the new images only, not on the mission history.
+        Each claimed image must be passed to `complete` or `release`.
+        """
+        now = datetime.utcnow()
+        available = (
+            (cls.mission == mission) & (cls.is_processed == False) &
+            (cls.claimed_at.is_null() | (cls.claimed_at < now - timedelta(seconds=claim_timeout)))
+        )
+        # IMMEDIATE takes the write lock before reading, so two processors never claim the same image
+        with db.atomic('IMMEDIATE'):
+            ids = [row.id for row in cls.select(cls.id).where(available).order_by(cls.created_at).limit(limit)]
+            if not ids:
+                return []
+            cls.update(claimed_at=now).where(cls.id.in_(ids)).execute()
+            return list(cls.select().where(cls.id.in_(ids)).order_by(cls.created_at))
+
+    @classmethod
+    def complete(cls, images: list["Image"]) -> None:
+        """Saves the detection results of claimed images and marks them processed, in one transaction."""
+        now = datetime.utcnow()
+        with db.atomic():
+            for img in images:
+                img.is_processed = True
+                img.claimed_at = None
+                img.updated_at = now
+                img.save()
+
+    @classmethod
+    def release(cls, images: list["Image"]) -> None:
+        """Returns claimed images to the queue unprocessed, e.g. after a failed inference."""
+        cls.update(claimed_at=None).where(cls.id.in_([img.id for img in images])).execute()
+
+    @classmethod
+    def processed(cls, mission: Mission):
+        """Query of the mission's processed images, oldest first."""
+        return (cls.select()
+                .where((cls.mission == mission) & (cls.is_processed == True))
+                .order_by(cls.created_at))
@@ -3,12 +3,12 @@ from ultralytics.engine.results import Results
 from mission import Mission, MissionStatus
 from image import Image
 from database import db
-from glob import glob
+from undistortion import engine_for
 import numpy as np
 import cv2 as cv
 import logging
 import math
-import os
+from typing import Optional
 
 
 class ImageProcessor:
@@ -43,56 +43,84 @@ class ImageProcessor:
                 })
                 self.obj_centres.append(((u + d) / 2.0, (l + r) / 2.0))
 
-    def __init__(self, model_path: str, visible_ground_dims: tuple[float, float]):
+    def __init__(self, model_path: str, visible_ground_dims: tuple[float, float],
+                 calibration_path: str = "./yolo_model/calibration.npz"):
         self.model = YOLO(model_path)
         self.ground_width, self.ground_length = visible_ground_dims
+        # Calibration is loaded once; the undistortion maps are built on the first image of each size
+        self.undistortion = engine_for(calibration_path)
         self.mission: Mission = Mission.get(Mission.status == MissionStatus.ACTIVE)
         logging.info("Instantiated ImageProcessor Successfully")
         # self.thread = None
 
-    def remove_distortion(self, cam_matrix: np.ndarray, dist_coeff: np.ndarray, img_samples_paths: list[str], save_corrected: bool = False) -> list[np.ndarray]:
+    def remove_distortion(self, img_samples_paths: list[str], save_corrected: bool = False) -> list[Optional[np.ndarray]]:
+        """Undistorted images read from `img_samples_paths`; None for a file that is missing or cannot be decoded."""
         img_samples = [cv.imread(im_path) for im_path in img_samples_paths]
-        img_undist = []
-
-        for img in img_samples:
-            height, width = img.shape[:2]
-            camMatrixNew, roi = cv.getOptimalNewCameraMatrix(cam_matrix, dist_coeff, (width, height), 1, (width, height))
-            img_undist.append(cv.undistort(img, cam_matrix, dist_coeff, None, camMatrixNew))
+        img_undist = [self.undistortion.undistort(img) if img is not None else None for img in img_samples]
 
         if save_corrected:
             for corrected, img_path in zip(img_undist, img_samples_paths):
+                if corrected is None:
+                    continue
                 cv.imwrite(filename=img_path.removesuffix('.png') + '-corrected.png', img=corrected)
 
         logging.info(f"Removed distortion from {len(img_samples)} images")
         return img_undist
 
-    def process_and_save_images(self, dir_abs_path: str) -> None:
-        # Gather unprocessed image objects and their paths
-        unprocessed_images = []
-        unprocessed_image_paths = []
-
-        for img_path in glob(os.path.join(dir_abs_path, "*.png")):
-            relative_path = os.path.relpath(img_path, os.getcwd())
-            relative_path = os.path.normpath(relative_path)
-            image_id = relative_path.split(os.sep)[-1].removesuffix('.png')
-
-            img: Image = Image.select().where(
-                (Image.id == image_id) & (Image.is_processed == False)
-            ).first()
-            if not img:
-                continue
-
-            unprocessed_images.append(img)
-            unprocessed_image_paths.append(img.path)
-
-        if not unprocessed_image_paths:
+    def process_and_save_images(self, batch_size: int = 16) -> int:
+        """
+        Claims the mission's unprocessed images from the work queue `batch_size` at a time and
+        processes them until none are left. Returns the number of images processed.
+        """
+        n_processed = 0
+        while True:
+            n_batch = self.process_next_batch(batch_size)
+            if n_batch == 0:
+                break
+            n_processed += n_batch
+
+        if n_processed == 0:
             logging.info('No unprocessed images found. Exiting `ImageProcessor.process_and_save_images`')
-            return
-
-        camera_parameters = np.load("./yolo_model/calibration.npz")
-        camera_matrix, dist_coeff = camera_parameters['camMatrix'], camera_parameters['distCoeff']
-
-        corrected_images = self.remove_distortion(camera_matrix, dist_coeff, unprocessed_image_paths)
+        return n_processed
+
+    def process_next_batch(self, batch_size: int = 16) -> int:
+        """Claims and processes one batch of up to `batch_size` images; returns how many were claimed."""
+        unprocessed_images = Image.claim_next(self.mission, batch_size)
+        if not unprocessed_images:
+            return 0
+        try:
+            self.process_batch(unprocessed_images)
+        except Exception:
+            # Hand the batch back so the next cycle retries it
+            Image.release(unprocessed_images)
+            raise
+        return len(unprocessed_images)
+
+    def process_batch(self, unprocessed_images: list[Image]) -> None:
+        """Runs the detector on claimed images, saves their results and marks them processed."""
+        corrected_images = self.remove_distortion([img.path for img in unprocessed_images])
+        # A missing or corrupt file would fail every retry; it is marked processed without detections
+        unreadable = [img for img, corrected in zip(unprocessed_images, corrected_images) if corrected is None]
+        if unreadable:
+            logging.warning(f"{len(unreadable)} image files are missing or unreadable; "
+                            f"marking them processed without detections")
+            Image.complete(unreadable)
+            unprocessed_images = [img for img, corrected in zip(unprocessed_images, corrected_images)
+                                  if corrected is not None]
+            corrected_images = [corrected for corrected in corrected_images if corrected is not None]
+            if not unprocessed_images:
+                return
+
+        total_zebra_count = self.detect(unprocessed_images, corrected_images)
+        Image.complete(unprocessed_images)
+        self.add_zebras(total_zebra_count)
+
+    def detect(self, unprocessed_images: list[Image], corrected_images: list[np.ndarray]) -> int:
+        """
+        Runs the detector on the undistorted frames of `unprocessed_images` and stores the
+        detections on the records, without saving them; a rhino is reported to the mission
+        straight away. Returns the number of zebras found.
+        """
         results: list[Results] = self.model(corrected_images)
         logging.info("Calculated predictions for the sampled images")
 
@@ -100,7 +128,7 @@ class ImageProcessor:
 
         # Process each image result and update the corresponding image record
         for index, result in enumerate(results):
-            image_result = ImageProcessor.ImageResults(result, unprocessed_image_paths[index])
+            image_result = ImageProcessor.ImageResults(result, unprocessed_images[index].path)
             logging.info(f"Processing image #{index+1}: {image_result.filepath}")
 
             # Retrieve the image object from our collected list
@@ -128,7 +156,7 @@ class ImageProcessor:
             rhino_image = None
 
             if image_result.n_animals == 0:
-                logging.info(f"No animals found in image: {unprocessed_image_paths[index]}")
+                logging.info(f"No animals found in image: {image_result.filepath}")
             else:
                 # Process each detected animal using a separate loop variable 'j'
                 for j in range(image_result.n_animals):
@@ -163,23 +191,24 @@ class ImageProcessor:
             if is_rhino:
                 logging.info(f"Rhino found at ({rhino_lat:.5f}, {rhino_lon:.5f}) in image {rhino_image}")
                 logging.info(f"{rhino_lat:.5f};{rhino_lon:.5f};50")
-                self.mission.update(
+                Mission.update(
                     rhino_lat=rhino_lat,
                     rhino_lon=rhino_lon,
                     rhino_image=rhino_image
-                ).execute()
+                ).where(Mission.id == self.mission.id).execute()
 
             # Update the image record with detection results and mark it as processed
             img.is_zebra = is_zebra
             img.is_rhino = is_rhino
             img.zebra_locations = zebra_locations
-            img.is_processed = True
-            img.save()
 
+        return total_zebra_count
+
+    def add_zebras(self, count: int) -> None:
         # Update the mission with the cumulative zebra count
-        self.mission.update(
-            zebras_count=self.mission.zebras_count + total_zebra_count
-        ).where(Mission.status == MissionStatus.ACTIVE).execute()
+        Mission.update(
+            zebras_count=Mission.zebras_count + count
+        ).where(Mission.id == self.mission.id).execute()
 
 if __name__ == '__main__':
 
@@ -195,8 +224,6 @@ if __name__ == '__main__':
     processor = ImageProcessor(
         './yolo_model/best.pt', visible_ground_dims=(43.665521, 33.360636))
 
-    processor.process_and_save_images(
-        os.path.abspath("./yolo_model")
-    )
+    processor.process_and_save_images()
 
     db.close()
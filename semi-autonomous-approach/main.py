@@ -1,24 +1,47 @@
+import sys
 import time
-import os
 import logging
 from pymavlink import mavutil
 from database import db
 from mission import Mission
+from mission_artifact import load_mission_artifact, mission_fields
 from image import Image
 from typing import NoReturn
 from image_processor import ImageProcessor
 from auto_capture import AutoCapture
+from frame_pipeline import StreamingPipeline, DropPolicy
+from geofence_monitor import GeofenceMonitor, GeofenceEvent
 from threading import Thread
 
 PI_ENVIRON = False
+# Stream frames from the camera to the detector in memory (see frame_pipeline.py) instead of
+# through PNG files polled every 5 s
+STREAMING = True
+
+# Mission compiled on the ground by planner/main.py (also named `MISSION_ARTIFACT` there); another path
+# can be given as the first command-line argument. The ground footprint of a frame and the capture
+# interval are read from it, as planned from the survey settings (`SURVEY` in planner/main.py)
+MISSION_ARTIFACT = "mission.npz"
+
+# Used only when there is no artifact: the footprint (m) of a frame at 25 m and one capture per second
+DEFAULT_GROUND_DIMS = (21.832760, 16.680318)
+DEFAULT_CAPTURE_INTERVAL = 1.0
+
+# Distance (m) from the Flight Region edge or the Sensitive Area that raises a geofence warning,
+# and the fence ceiling (m above home); keep the ceiling in sync with `set_geofence` in planner/main.py
+GEOFENCE_MARGIN = 10.0
+GEOFENCE_MAX_ALTITUDE = 50.0
 
 
 def init_db() -> None:
     db.connect()
     db.create_tables([Mission, Image], safe=True)
+    Image.migrate_schema()
 
 
-def create_mission() -> Mission:
+def create_mission(artifact: dict = None) -> Mission:
+    if artifact is not None:
+        return Mission.create(name="Fenswood Mission", **mission_fields(artifact))
     mission = Mission.create(
         name="Fenswood Mission",
         altitude=50,
@@ -44,15 +67,25 @@ def live_feed():
         streamer.start()
 
 
-def update_position(master, lat, lon, yaw):
+def on_geofence_event(event: GeofenceEvent) -> None:
+    if event.is_breach:
+        logging.critical(f"Geofence breach: {event.status.value} at ({event.lat}, {event.lon}), alt {event.alt} m")
+    else:
+        logging.warning(f"Geofence status: {event.previous.value} -> {event.status.value}")
+
+
+def update_position(master, lat, lon, yaw, geofence_monitor: GeofenceMonitor = None):
     """
     Continuously listen for GLOBAL_POSITION_INT messages and update the position.
+    Every position is also checked by the `geofence_monitor`, if any.
     """
     while True:
         msg = master.recv_match(blocking=True)
         if msg is None:
             continue
         if msg.get_type() == 'GLOBAL_POSITION_INT':
+            if geofence_monitor is not None:
+                geofence_monitor.handle_message(msg)
             lat[0] = msg.lat / 1e7
             lon[0] = msg.lon / 1e7
             yaw_val = msg.hdg / 100.0 if msg.hdg != 65535 else 0.0
@@ -66,7 +99,7 @@ def process_images_loop(processor: ImageProcessor):
     Continuously process unprocessed images in the background.
     """
     while True:
-        processor.process_and_save_images(os.path.abspath("./capture-images"))
+        processor.process_and_save_images()
         time.sleep(5)  # Adjust processing interval as needed
 
 
@@ -76,7 +109,11 @@ def main() -> NoReturn:
         format='%(asctime)s - %(levelname)s - %(message)s',
     )
     init_db()
-    create_mission()
+    artifact_path = sys.argv[1] if len(sys.argv) > 1 else MISSION_ARTIFACT
+    artifact = load_mission_artifact(artifact_path)
+    if artifact is None:
+        logging.warning(f"No mission artifact at '{artifact_path}'; using the built-in survey settings")
+    create_mission(artifact)
     master = connect_vehicle()
     live_feed()
 
@@ -85,20 +122,34 @@ def main() -> NoReturn:
     lon = [0.0]
     yaw = [0.0]
 
-    # Instantiate auto capture and image processor
-    auto_capture = AutoCapture(
-        interval=1, save_dir="capture-images", pi_environ=PI_ENVIRON)
-    # Other heights:
-    # > 25 meters: (21.832760, 16.680318)
-    # > 30 meters: (26.199312, 20.016382)
-    # > 35 meters: (30.565865, 23.352445)
-    # > 50 meters: (43.665521, 33.360636)
+    # Instantiate auto capture and image processor, with the ground footprint and capture
+    # interval the mission was planned for
+    if artifact is not None:
+        ground_dims = tuple(artifact["meta"]["ground_dims"])
+        capture_interval = artifact["meta"]["capture_interval"]
+    else:
+        ground_dims, capture_interval = DEFAULT_GROUND_DIMS, DEFAULT_CAPTURE_INTERVAL
+    logging.info(
+        f"Ground footprint {ground_dims[0]:.2f}x{ground_dims[1]:.2f} m; capturing every {capture_interval:.2f} s")
     image_processor = ImageProcessor(
-        './yolo_model/best.pt', visible_ground_dims=(21.832760, 16.680318))
+        './yolo_model/best.pt', visible_ground_dims=ground_dims)
+    pipeline = None
+    if STREAMING:
+        # Keep the freshest frames when inference falls behind; the dropped ones are processed from disk later
+        pipeline = StreamingPipeline(image_processor, save_dir="capture-images", policy=DropPolicy.DROP_OLDEST)
+    auto_capture = AutoCapture(
+        interval=capture_interval, save_dir="capture-images", pi_environ=PI_ENVIRON, pipeline=pipeline)
+
+    # Geofence breach monitor, fed by the telemetry thread (needs the mission's polygons)
+    geofence_monitor = None
+    if artifact is not None:
+        geofence_monitor = GeofenceMonitor.from_artifact(
+            artifact, warning_margin=GEOFENCE_MARGIN, max_altitude=GEOFENCE_MAX_ALTITUDE)
+        geofence_monitor.add_listener(on_geofence_event)
 
     # Start telemetry thread to update position data
     telemetry_thread = Thread(target=update_position, args=(
-        master, lat, lon, yaw), daemon=True)
+        master, lat, lon, yaw, geofence_monitor), daemon=True)
     telemetry_thread.start()
 
     # Start auto capture thread to capture images using the latest telemetry data
@@ -106,10 +157,14 @@ def main() -> NoReturn:
                             args=(lat, lon, yaw), daemon=True)
     capture_thread.start()
 
-    # Start image processing thread to process captured images in the background
-    processing_thread = Thread(
-        target=process_images_loop, args=(image_processor,), daemon=True)
-    processing_thread.start()
+    # Start image processing in the background: the streaming pipeline's inference and persistence
+    # threads, or the thread that polls for captured images
+    if pipeline is not None:
+        pipeline.start()
+    else:
+        processing_thread = Thread(
+            target=process_images_loop, args=(image_processor,), daemon=True)
+        processing_thread.start()
 
     # Keep the main thread alive
     while True:
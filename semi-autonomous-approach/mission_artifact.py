@@ -0,0 +1,50 @@
+import json
+import os
+from typing import Optional
+import numpy as np
+
+# Must match ARTIFACT_VERSION in planner/mission_compiler.py, which writes the artifact
+ARTIFACT_VERSION = 1
+ARTIFACT_ARRAYS = ("takeoff", "flight_region", "sensitive_area", "survey_area", "path_to_survey",
+                   "coverage_path", "path_to_take_off", "processing_spots", "mission_path")
+
+
+def load_mission_artifact(path: str) -> Optional[dict]:
+    """
+    Loads a mission artifact compiled by `planner/mission_compiler.py`: a dict of (N, 2) arrays
+    of (lat, lon) points plus the planning settings under 'meta'. Returns None if the file is
+    missing or was written by another artifact version.
+    """
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        meta = json.loads(str(data["meta"]))
+        if meta.get("version") != ARTIFACT_VERSION:
+            return None
+        artifact = {name: data[name] for name in ARTIFACT_ARRAYS}
+    artifact["meta"] = meta
+    return artifact
+
+
+def to_points(coords: np.ndarray) -> list[dict]:
+    """Converts an (N, 2) array of (lat, lon) into the list of dicts stored by `PointListField`."""
+    return [{'lat': lat, 'lon': lon} for lat, lon in coords.tolist()]
+
+
+def mission_fields(artifact: dict) -> dict:
+    """Returns the `Mission` field values held by an artifact, ready for `Mission.create`."""
+    coverage = artifact["coverage_path"]
+    takeoff_lat, takeoff_lon = artifact["takeoff"][0].tolist()
+    return {
+        'altitude': artifact["meta"]["altitude"],
+        'takeoff_location_lat': takeoff_lat,
+        'takeoff_location_lon': takeoff_lon,
+        'flight_region': to_points(artifact["flight_region"]),
+        'sensitive_area': to_points(artifact["sensitive_area"]),
+        'survey_area': to_points(artifact["survey_area"]),
+        'path_to_survey': to_points(artifact["path_to_survey"]),
+        'path_to_take_off': to_points(artifact["path_to_take_off"]),
+        'survey_area_start': to_points(coverage[:1])[0] if len(coverage) else None,
+        'survey_area_end': to_points(coverage[-1:])[0] if len(coverage) else None,
+        'processing_spots': to_points(artifact["processing_spots"]),
+    }
@@ -1,36 +1,16 @@
-import json
 import logging
 from geopy import distance
 from image import Image
+from mission import Mission, MissionStatus
 from database import db
-from glob import glob
-import os
 
-def remove_duplicates(dir_abs_path: str) ->  list[dict[str, float]]:
+def remove_duplicates(mission: Mission) -> list[dict[str, float]]:
 
     zebra_locations = []
-    total_zebras = 0
-
-    for img_path in glob(os.path.join(dir_abs_path, "*.png")):
-        # Convert the absolute path to a relative path from the current working directory.
-        relative_path = os.path.relpath(img_path, os.getcwd())
-        # Normalize the relative path to ensure a consistent format.
-        relative_path = os.path.normpath(relative_path)
-
-        image_id = relative_path.split(os.sep)[-1].removesuffix('.png')
-
-        img: Image = Image.select().where(
-            (Image.id == image_id) & (Image.is_processed == True)
-        ).first()
-
-        if img is None:
-            continue
-
-        if img.is_processed:
-            continue
-
-        for loc in json.loads(img.zebra_locations):
 
+    # Only the processed images that contain zebras, via the work queue index
+    for img in Image.processed(mission).where(Image.is_zebra == True):
+        for loc in img.zebra_locations:
             zebra_locations.append((loc['lat'], loc['lon']))
 
     is_duplicate = [False for _ in range(len(zebra_locations))]
@@ -44,7 +24,7 @@ def remove_duplicates(dir_abs_path: str) ->  list[dict[str, float]]:
             if is_duplicate[i]:
                 continue
 
-            if distance(zebra_locations[i], zebra_locations[j]).meters < THRESHOLD_DUPLICATE:
+            if distance.distance(zebra_locations[i], zebra_locations[j]).meters < THRESHOLD_DUPLICATE:
                 is_duplicate[j] = True
 
     zebra_locations_filtered = [
@@ -70,4 +50,4 @@ if __name__ == "__main__":
 
     db.connect()
 
-    zebras = remove_duplicates("./capture-images")
\ No newline at end of file
+    zebras = remove_duplicates(Mission.get(Mission.status == MissionStatus.ACTIVE))
\ No newline at end of file
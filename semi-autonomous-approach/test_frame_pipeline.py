@@ -0,0 +1,77 @@
+import os
+import threading
+import time
+import numpy as np
+import pytest
+
+from database import db
+from mission import Mission
+from image import Image
+from frame_pipeline import Frame, StreamingPipeline
+
+
+class FakeProcessor:
+    """The parts of an `ImageProcessor` the persistence thread uses."""
+
+    def __init__(self, mission):
+        self.mission = mission
+
+
+@pytest.fixture
+def pipeline(tmp_path):
+    db.init(str(tmp_path / "test.db"))
+    db.create_tables([Mission, Image])
+    mission = Mission.create(name="Test Mission", altitude=25)
+    pipeline = StreamingPipeline(FakeProcessor(mission), save_dir=str(tmp_path / "images"), idle_timeout=0.05)
+    yield pipeline
+    db.close()
+
+
+def make_frame(pipeline):
+    record = Image(mission=pipeline.processor.mission, lat=51.42, lon=-2.67, yaw=0.0)
+    record.path = os.path.join(pipeline.save_dir, f"{record.id}.png")
+    return Frame(np.zeros((8, 8, 3), dtype=np.uint8), record)
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_persistence_thread_survives_failing_saves(pipeline, monkeypatch):
+    def failing_save(self, *args, **kwargs):
+        raise RuntimeError("database is locked")
+
+    thread = threading.Thread(target=pipeline.persistence_loop, daemon=True)
+    thread.start()
+
+    monkeypatch.setattr(Image, "save", failing_save)
+    pipeline.to_persist.put(make_frame(pipeline))
+    assert wait_for(lambda: pipeline.metrics.lost == 1)
+    assert thread.is_alive()
+
+    monkeypatch.undo()
+    pipeline.to_persist.put(make_frame(pipeline))
+    assert wait_for(lambda: pipeline.metrics.persisted == 1)
+    assert Image.select().count() == 1
+
+    pipeline.to_persist.close()
+    thread.join(timeout=5.0)
+    assert not thread.is_alive()
+
+
+def test_unwritable_frame_is_lost_without_stopping_the_thread(pipeline):
+    thread = threading.Thread(target=pipeline.persistence_loop, daemon=True)
+    thread.start()
+
+    bad = make_frame(pipeline)
+    bad.record.path = bad.record.path[:-len(".png")] + ".unknown-extension"
+    pipeline.to_persist.put(bad)
+    pipeline.to_persist.put(make_frame(pipeline))
+    assert wait_for(lambda: pipeline.metrics.lost == 1 and pipeline.metrics.persisted == 1)
+    assert thread.is_alive()
+
+    pipeline.to_persist.close()
+    thread.join(timeout=5.0)